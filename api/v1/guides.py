@@ -1,21 +1,30 @@
-from flask import Blueprint, jsonify, make_response, request, g
+import traceback
 
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    request,
+    g,
+    stream_with_context,
+)
 
-from models import guide
-from utils import protected
 
-guides_bp = Blueprint("guides", __name__)
+from errors import InternalServerError
+from models import guide, job
+from utils import idempotent, protected
 
+guides_bp = Blueprint("guides", __name__)
 
-@guides_bp.route("/guides", methods=["POST"])
-@protected
-def create():
-    data = request.get_json()
 
-    guide_info = {
+def _guide_info(data: dict) -> dict:
+    return {
         "title": data.get("title", ""),
         "temperature": data.get("temperature", 2.0),
         "model": data.get("model", ""),
+        "use_cache": data.get("use_cache", True) is not False,
         "inputs": {
             "topic": data.get("topic", ""),
             "knowledge": data.get("knowledge", ""),
@@ -24,22 +33,123 @@ def create():
         },
     }
 
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+@guides_bp.route("/guides", methods=["POST"])
+@protected
+@idempotent
+def create():
+    data = request.get_json()
+
+    guide_info = _guide_info(data)
+
+    # RFC 7240: o cliente aceita receber um job em vez de esperar a geração
+    if "respond-async" in request.headers.get("Prefer", ""):
+        new_job = job.enqueue(owner=g.username, **guide_info)
+
+        response = make_response(
+            jsonify({"message": "Geração do guia agendada.", "data": new_job}),
+            202,
+        )
+        response.headers["Location"] = f"/api/v1/guides/jobs/{new_job['id']}"
+
+        return response
+
     study_guide: dict = guide.generate_with_metadata(
         owner=g.username,
         title=guide_info["title"],
         inputs=guide_info["inputs"],
         model=guide_info["model"],
         temperature=guide_info["temperature"],
+        use_cache=guide_info["use_cache"],
     )
 
-    guide.save(study_guide)
+    saved_guide = guide.save(study_guide)
 
-    return make_response(
+    response = make_response(
         jsonify(
-            {"message": "Guia de estudos gerado com sucesso.", "data": study_guide}
+            {"message": "Guia de estudos gerado com sucesso.", "data": saved_guide}
         ),
         201,
     )
+    response.headers["Location"] = f"/api/v1/guides/{saved_guide['id']}"
+
+    return response
+
+
+@guides_bp.route("/guides/stream", methods=["POST"])
+@protected
+def create_stream():
+    data = request.get_json()
+
+    # valida as entradas antes de abrir o stream: erros aqui respondem JSON normal
+    events = guide.generate_stream(owner=g.username, **_guide_info(data))
+
+    def stream():
+        try:
+            for event, payload in events:
+                yield _sse(event, payload)
+        except Exception as error:
+            traceback.print_exc()
+
+            if not hasattr(error, "toDict"):
+                error = InternalServerError()
+
+            yield _sse("error", error.toDict())
+
+    response = Response(stream_with_context(stream()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+
+    return response
+
+
+@guides_bp.route("/guides/jobs/<string:job_id>", methods=["GET"])
+@protected
+def get_job(job_id: str):
+    guide_job = job.find_by_id(job_id, g.username)
+
+    return make_response(
+        {"message": "Job de geração recuperado com sucesso.", "data": guide_job},
+        200,
+    )
+
+
+@guides_bp.route("/guides/<string:guide_id>/days/<int:day>", methods=["PATCH"])
+@protected
+def update_day(guide_id: str, day: int):
+    data = request.get_json()
+
+    progress = guide.update_progress(
+        guide_id, [{"day": day, "completed": data.get("completed")}], g.username
+    )
+
+    return make_response(
+        {
+            "message": "O progresso do guia foi atualizado com sucesso!",
+            "data": {"day": day, "completed": data.get("completed"), **progress},
+        },
+        200,
+    )
+
+
+@guides_bp.route("/guides/<string:guide_id>/days", methods=["PATCH"])
+@protected
+def update_days(guide_id: str):
+    data = request.get_json()
+
+    progress = guide.update_progress(guide_id, data.get("days", ""), g.username)
+
+    return make_response(
+        {
+            "message": "O progresso do guia foi atualizado com sucesso!",
+            "data": progress,
+        },
+        200,
+    )
 
 
 @guides_bp.route("/guides/<string:guide_id>", methods=["DELETE"])
@@ -63,10 +173,19 @@ def get_by_id(guide_id: str):
 @guides_bp.route("/my-guides", methods=["GET"])
 @protected
 def get_my_guides():
-    user_guides: list[dict] = guide.find_all_by_username(g.username)
+    page = guide.find_all_by_username(
+        g.username,
+        limit=request.args.get("limit"),
+        after=request.args.get("after"),
+    )
 
     return make_response(
-        {"message": "Guias recuperados com sucesso.", "data": user_guides}, 200
+        {
+            "message": "Guias recuperados com sucesso.",
+            "data": page["guides"],
+            "pagination": {"next": page["next"]},
+        },
+        200,
     )
 
 
@@ -0,0 +1,35 @@
+from flask import Blueprint, Response, jsonify, make_response
+
+import metrics
+from models import llm
+from utils import protected
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+@protected
+def get_metrics() -> Response:
+    return make_response(
+        jsonify(
+            {
+                "message": "Métricas do worker recuperadas com sucesso.",
+                "data": metrics.snapshot(),
+            }
+        ),
+        200,
+    )
+
+
+@metrics_bp.route("/metrics/models", methods=["GET"])
+@protected
+def get_model_metrics() -> Response:
+    return make_response(
+        jsonify(
+            {
+                "message": "Métricas dos modelos recuperadas com sucesso.",
+                "data": llm.model_stats(),
+            }
+        ),
+        200,
+    )
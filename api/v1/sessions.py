@@ -51,6 +51,8 @@ def create() -> Response:
 
 @session_bp.route("/sessions", methods=["DELETE"])
 def delete() -> Response:
+    session.revoke(request.cookies.get("session_id", ""))
+
     response = make_response(jsonify({"message": "Sessão encerrada com sucesso."}), 200)
     response.delete_cookie("session_id", path="/")
 
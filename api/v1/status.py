@@ -1,6 +1,6 @@
 from flask import Blueprint, Response, jsonify, make_response
 
-from models import status
+from models import certificates, llm, scheduler, status
 
 status_bp = Blueprint("status", __name__)
 
@@ -15,7 +15,12 @@ def get_status() -> Response:
                 "message": "API está online."
                 if api_status == "Online"
                 else "API está offline.",
-                "data": {"status": api_status},
+                "data": {
+                    "status": api_status,
+                    "session_certificates": certificates.store.stats(),
+                    "llm_circuits": llm.breakers(),
+                    "llm_schedulers": scheduler.schedulers(),
+                },
             }
         ),
         200 if api_status == "Online" else 503,
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """Cache LRU limitado em tamanho, com tempo de vida (TTL) por entrada.
+
+    Seguro para uso entre threads do mesmo processo (cada worker do gunicorn
+    possui a sua própria instância).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor da chave ou `default` se ausente/expirado."""
+        with self._lock:
+            item = self._data.get(key)
+
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at <= monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Armazena o valor, removendo a entrada menos usada se o cache estiver cheio.
+
+        Args:
+            key (Hashable): chave da entrada.
+            value (Any): valor armazenado.
+            ttl (float | None): tempo de vida em segundos (default é o TTL do cache).
+        """
+        ttl = self.ttl if ttl is None else ttl
+
+        if ttl <= 0:
+            self.pop(key)
+            return
+
+        with self._lock:
+            self._data[key] = (monotonic() + ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove a entrada da chave (se existir) e retorna o seu valor."""
+        with self._lock:
+            item = self._data.pop(key, None)
+
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -5,6 +5,7 @@ import { useState } from "react";
 import { useAuth } from "@/hooks/useAuth";
 import { ArrowLeft, RotateCcw, Sparkles } from "lucide-react";
 import { useMessage } from "@/hooks/useMessage";
+import { streamGuideRequest } from "@/services/guide";
 
 const VALIDATION_LIMITS = {
     TITLE_MIN: 3,
@@ -24,6 +25,7 @@ export default function GeneratePage() {
     const { logout } = useAuth();
 
     const [isGenerating, setIsGenerating] = useState(false);
+    const [generatedDays, setGeneratedDays] = useState(0);
 
     const [currentStep, setCurrentStep] = useState(1);
     const progressPercentage = (currentStep / 3) * 100;
@@ -181,29 +183,22 @@ export default function GeneratePage() {
         };
 
         try {
-            const response = await fetch("/api/v1/guides", {
-                method: "POST",
-                headers: {
-                    "Content-Type": "application/json",
-                },
-                credentials: "include",
-                body: JSON.stringify(guideInputs),
-            });
-
-            const body = await response.json();
-
-            if (response.ok) return router.push("/dashboard/my-guides");
-            else {
-                if (response.status === 401 && body.status === 401) {
-                    errorMessage(body.message);
-                    logout();
-                    return router.push("/login");
-                }
-                errorMessage(body.message);
-            }
+            setGeneratedDays(0);
+            const savedGuide = await streamGuideRequest(guideInputs, () =>
+                setGeneratedDays((days) => days + 1),
+            );
+
+            return router.push(`/dashboard/my-guides/guide?id=${savedGuide.id}`);
         } catch (error) {
+            if (error.status === 401) {
+                errorMessage(error.message);
+                logout();
+                return router.push("/login");
+            }
             errorMessage(
-                "Erro ao conectar com o servidor. Verifique sua conexão.",
+                error instanceof TypeError
+                    ? "Erro ao conectar com o servidor. Verifique sua conexão."
+                    : error.message,
             );
         } finally {
             setIsGenerating(false);
@@ -463,7 +458,9 @@ export default function GeneratePage() {
                                 {isGenerating ? (
                                     <>
                                         <div className="w-5 h-5 border-2 border-white border-t-transparent rounded-full animate-spin" />
-                                        Gerando...
+                                        {generatedDays > 0
+                                            ? `Gerando... (${generatedDays} de ${formData.days} dias)`
+                                            : "Gerando..."}
                                     </>
                                 ) : currentStep === 3 ? (
                                     <>
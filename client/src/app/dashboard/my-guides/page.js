@@ -16,9 +16,11 @@ import AuthGuard from "@/components/auth-guard";
 const ITEMS_PER_PAGE = 4;
 
 export default function MyGuidesPage() {
-    const { fetchGuides } = useGuideAPI();
+    const { fetchGuides, isLoading } = useGuideAPI();
     const [inProgressGuides, setInProgressGuides] = useState([]);
     const [completedGuides, setCompletedGuides] = useState([]);
+    // cursor da próxima página de guias (null quando não há mais)
+    const [nextCursor, setNextCursor] = useState(null);
 
     const [currentPage, setCurrentPage] = useState(1);
     const totalPages = Math.ceil(completedGuides.length / ITEMS_PER_PAGE);
@@ -29,25 +31,28 @@ export default function MyGuidesPage() {
         endIndex,
     );
 
-    useEffect(() => {
-        const loadGuides = async () => {
-            const result = await fetchGuides();
-            if (result.success) {
-                setInProgressGuides(result.data.inProgressGuides);
-                setCompletedGuides(result.data.completedGuides);
-            }
-        };
+    const loadGuides = async (after = null) => {
+        const result = await fetchGuides(after);
+        if (result.success) {
+            setInProgressGuides((guides) => [
+                ...(after ? guides : []),
+                ...result.data.inProgressGuides,
+            ]);
+            setCompletedGuides((guides) => [
+                ...(after ? guides : []),
+                ...result.data.completedGuides,
+            ]);
+            setNextCursor(result.data.next);
+        }
+    };
 
+    useEffect(() => {
         loadGuides();
     }, []);
 
     const getProgress = (guide) => {
-        const study_days = guide.daily_studies;
-
-        const completed =
-            study_days.filter((day) => day.completed === true).length || 0;
-
-        const total = study_days.length || 0;
+        const completed = guide.completed_days;
+        const total = guide.total_days;
 
         const progress = total > 0 ? Math.round((completed / total) * 100) : 0;
 
@@ -282,6 +287,18 @@ export default function MyGuidesPage() {
                         </>
                     )}
                 </section>
+
+                {nextCursor && (
+                    <div className="flex justify-center mt-12">
+                        <button
+                            onClick={() => loadGuides(nextCursor)}
+                            disabled={isLoading}
+                            className="bg-white border border-gray-300 text-gray-700 font-bold py-3 px-6 rounded-sm hover:bg-gray-100 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+                        >
+                            {isLoading ? "Carregando..." : "Carregar mais guias"}
+                        </button>
+                    </div>
+                )}
             </section>
         </AuthGuard>
     );
@@ -5,7 +5,7 @@ import {
     deleteGuideRequest,
     getGuidesRequest,
     getGuideByIdRequest,
-    patchGuideById,
+    patchGuideDays,
 } from "@/services/guide";
 
 export function useGuideAPI(guideId) {
@@ -14,12 +14,13 @@ export function useGuideAPI(guideId) {
     const [isSaving, setIsSaving] = useState(false);
     const [isDeleting, setIsDeleting] = useState(false);
 
-    const previousStudyDays = useRef("");
+    // dias como estão salvos no servidor; só as diferenças são enviadas
+    const savedStudyDays = useRef([]);
 
-    const fetchGuides = async () => {
+    const fetchGuides = async (after = null) => {
         setIsLoading(true);
         try {
-            const result = await getGuidesRequest();
+            const result = await getGuidesRequest(after);
             let inProgressGuides = [];
             let completedGuides = [];
 
@@ -36,7 +37,11 @@ export function useGuideAPI(guideId) {
             return {
                 success: true,
                 message: result.message,
-                data: { inProgressGuides, completedGuides },
+                data: {
+                    inProgressGuides,
+                    completedGuides,
+                    next: result.pagination.next,
+                },
             };
         } catch (error) {
             return {
@@ -52,6 +57,7 @@ export function useGuideAPI(guideId) {
         setIsLoading(true);
         try {
             const result = await getGuideByIdRequest(guideId);
+            savedStudyDays.current = result.data.daily_study;
             setGuide(result.data);
             return {
                 success: true,
@@ -99,17 +105,32 @@ export function useGuideAPI(guideId) {
     useEffect(() => {
         if (!guide) return;
 
-        const currentStudyDays = JSON.stringify(guide.daily_study);
-        if (currentStudyDays === previousStudyDays.current) return;
+        const studyDays = guide.daily_study;
+        const changedDays = studyDays
+            .map((study, index) => ({
+                day: index + 1,
+                completed: study.completed,
+            }))
+            .filter(
+                ({ day, completed }) =>
+                    savedStudyDays.current[day - 1]?.completed !== completed,
+            );
+
+        if (changedDays.length === 0) return;
 
         const timeoutId = setTimeout(async () => {
             setIsSaving(true);
 
             try {
-                const result = await patchGuideById(guideId, guide.daily_study);
-                previousStudyDays.current = currentStudyDays;
+                const result = await patchGuideDays(guideId, changedDays);
+                savedStudyDays.current = studyDays;
                 return { success: true, message: result.message };
             } catch (error) {
+                // o guia mudou em outra aba/dispositivo: recarrega o estado salvo
+                if (error.status === 409) {
+                    await fetchGuideById();
+                }
+
                 return {
                     success: false,
                     error:
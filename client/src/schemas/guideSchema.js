@@ -8,5 +8,6 @@ export const GuideSchema = z.object({
     created_at: z.string(),
     status: z.string(),
     completed_at: z.string().optional(),
-    daily_studies: z.array(z.any()).optional(),
+    completed_days: z.number(),
+    total_days: z.number(),
 });
@@ -12,8 +12,11 @@ export async function deleteGuideRequest(guideId) {
     return response.json();
 }
 
-export async function getGuidesRequest() {
-    const response = await fetch("/api/v1/my-guides", {
+export async function getGuidesRequest(after = null) {
+    const params = new URLSearchParams({ limit: "20" });
+    if (after) params.set("after", after);
+
+    const response = await fetch(`/api/v1/my-guides?${params}`, {
         method: "GET",
         credentials: "include",
     });
@@ -43,6 +46,27 @@ export async function getGuideByIdRequest(guideId) {
     return response.json();
 }
 
+export async function patchGuideDays(guideId, days) {
+    const response = await fetch(`/api/v1/guides/${guideId}/days`, {
+        method: "PATCH",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        credentials: "include",
+        body: JSON.stringify({ days }),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        const requestError = new Error(
+            error.message || "Erro ao salvar o progresso. Tente novamente.",
+        );
+        requestError.status = response.status;
+        throw requestError;
+    }
+    return response.json();
+}
+
 export async function patchGuideById(guideId, updated_daily_studies) {
     const response = await fetch(`/api/v1/guides/${guideId}`, {
         method: "PATCH",
@@ -57,9 +81,60 @@ export async function patchGuideById(guideId, updated_daily_studies) {
 
     if (!response.ok) {
         const error = await response.json();
-        throw new Error(
+        const requestError = new Error(
             error.message || "Erro ao salvar o guia. Tente novamente.",
         );
+        requestError.status = response.status;
+        throw requestError;
     }
     return response.json();
 }
+
+export async function streamGuideRequest(guideInputs, onDay) {
+    const response = await fetch("/api/v1/guides/stream", {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+        },
+        credentials: "include",
+        body: JSON.stringify(guideInputs),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw Object.assign(
+            new Error(error.message || "Erro ao gerar o guia. Tente novamente."),
+            { status: response.status },
+        );
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let separator;
+        while ((separator = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            // blocos sem "data:" (ex.: comentários ":" de keep-alive) são ignorados
+            const rawData = block.match(/^data: ?(.*)$/m)?.[1];
+            if (rawData === undefined) continue;
+
+            const event = block.match(/^event: ?(.*)$/m)?.[1];
+            const data = JSON.parse(rawData);
+
+            if (event === "day") onDay(data);
+            if (event === "done") return data;
+            if (event === "error") throw new Error(data.message);
+        }
+    }
+
+    throw new Error("A geração do guia foi interrompida. Tente novamente.");
+}
@@ -90,11 +90,13 @@ class ServiceError(Exception):
         self,
         message: str = "Um erro inesperado em serviço aconteceu.",
         action: str = "Entre em contado com o suporte.",
+        retry_after: int | None = None,
     ):
         self.name = "ServiceError"
         self.message = message
         self.action = action
         self.code = 503
+        self.retry_after = retry_after  # segundos, enviado no header Retry-After
 
         super().__init__(self.message)
 
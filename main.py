@@ -9,6 +9,7 @@ from api.v1.guides import guides_bp
 from api.v1.users import users_bp
 from api.v1.validations import validations_bp
 from api.v1.status import status_bp
+from api.v1.metrics import metrics_bp
 from utils import initialize_app
 
 from flask import Response, jsonify, make_response, send_from_directory, request
@@ -38,6 +39,7 @@ app.url_map.strict_slashes = False
 
 # Register blueprints
 app.register_blueprint(blueprint=status_bp, url_prefix="/api/v1")
+app.register_blueprint(blueprint=metrics_bp, url_prefix="/api/v1")
 app.register_blueprint(blueprint=user_bp, url_prefix="/api/v1")
 app.register_blueprint(blueprint=users_bp, url_prefix="/api/v1")
 app.register_blueprint(blueprint=session_bp, url_prefix="/api/v1")
@@ -84,7 +86,12 @@ def handle_api_error(error: Exception) -> Response:
         or isinstance(error, ConflictError)
         or isinstance(error, ForbiddenError)
     ):
-        return make_response(jsonify(error.toDict()), error.code)
+        response = make_response(jsonify(error.toDict()), error.code)
+
+        if getattr(error, "retry_after", None):
+            response.headers["Retry-After"] = str(error.retry_after)
+
+        return response
 
     error = InternalServerError()
     return make_response(jsonify(error.toDict()), 500)
@@ -0,0 +1,118 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable
+
+# Limites superiores (em ms) dos buckets dos histogramas de latência
+BUCKETS_MS = (
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    7500,
+    10000,
+    15000,
+    20000,
+    30000,
+    45000,
+    60000,
+    120000,
+)
+
+
+class Histogram:
+    """Histograma de latências com buckets fixos (em milissegundos)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # o último bucket é o +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value_ms: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+            self.count += 1
+            self.sum += value_ms
+
+    def percentile(self, q: float) -> float | None:
+        """Estimativa do percentil `q` (0 a 1) pelo limite superior do bucket."""
+        if not self.count:
+            return None
+
+        target = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(BUCKETS_MS, self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(bound)
+
+        return float(BUCKETS_MS[-1])
+
+    def snapshot(self) -> dict:
+        buckets = {str(bound): count for bound, count in zip(BUCKETS_MS, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "buckets": buckets,
+        }
+
+
+_lock = Lock()
+_counters: dict[str, int] = {}
+_histograms: dict[str, Histogram] = {}
+_gauges: dict[str, Callable[[], float]] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Incrementa o contador `name` deste worker."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def counter(name: str) -> int:
+    """Retorna o valor atual do contador `name`."""
+    return _counters.get(name, 0)
+
+
+def histogram(name: str) -> Histogram:
+    """Retorna (criando se necessário) o histograma `name`."""
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram()
+
+        return _histograms[name]
+
+
+def observe(name: str, value_ms: float) -> None:
+    """Registra uma latência (em ms) no histograma `name`."""
+    histogram(name).observe(value_ms)
+
+
+def gauge(name: str, read: Callable[[], float]) -> None:
+    """Registra uma função que informa o valor atual do medidor `name`."""
+    with _lock:
+        _gauges[name] = read
+
+
+def snapshot() -> dict:
+    """Retorna todas as métricas deste worker em um dicionário serializável."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+        gauges = dict(_gauges)
+
+    return {
+        "counters": counters,
+        "gauges": {name: read() for name, read in gauges.items()},
+        "histograms": {name: hist.snapshot() for name, hist in histograms.items()},
+    }
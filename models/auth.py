@@ -2,6 +2,7 @@ import os
 from dotenv import load_dotenv
 import requests
 from errors import UnauthorizedError, ServiceError, ValidationError
+from models import backend, http_client
 
 load_dotenv()
 
@@ -16,10 +17,15 @@ def authenticate(email: str, password: str) -> dict[str, str]:
             "Email ou senha inválidos.", "Verifique os dados e tente novamente."
         )
 
+    if backend.IN_MEMORY:
+        return backend.auth().sign_in_with_password(email, password)
+
     payload = {"email": email, "password": password, "returnSecureToken": True}
 
     try:
-        response = requests.post(url=FB_REST_API, json=payload, timeout=10)
+        response = http_client.request(
+            "firebase.sign_in", "POST", FB_REST_API, json=payload, timeout=10
+        )
         response.raise_for_status()
         return response.json()
     except requests.HTTPError as error:
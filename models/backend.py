@@ -0,0 +1,26 @@
+import os
+
+from dotenv import load_dotenv
+from firebase_admin import auth as firebase_auth
+from firebase_admin import firestore
+
+from models import memory
+
+load_dotenv()
+
+# "firebase" (padrão) ou "memory" (sem rede, para testes de carga locais)
+BACKEND = os.getenv("BACKEND", "firebase")
+IN_MEMORY = BACKEND == "memory"
+
+
+def db():
+    """Retorna o cliente do Firestore ou o banco em memória (BACKEND=memory)."""
+    return memory.db if IN_MEMORY else firestore.client()
+
+
+def auth():
+    """Retorna o módulo `firebase_admin.auth` ou a sua versão em memória.
+
+    As exceções continuam sendo as do `firebase_admin.auth` nos dois casos.
+    """
+    return memory.auth if IN_MEMORY else firebase_auth
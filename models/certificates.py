@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+from time import monotonic
+
+import requests
+from dotenv import load_dotenv
+
+from errors import ServiceError
+from models import http_client
+
+load_dotenv()
+
+# Certificados públicos usados pelo Firebase para assinar os cookies de sessão
+CERTS_URL = "https://www.googleapis.com/identitytoolkit/v3/relyingparty/publicKeys"
+
+# Fração da validade (max-age) após a qual os certificados são renovados
+REFRESH_AT = float(os.getenv("SESSION_CERTS_REFRESH_AT", "0.8"))
+RETRY_SECONDS = 30
+DEFAULT_MAX_AGE = 60 * 60  # 1 hora, caso o Google não envie Cache-Control
+
+
+class _CertificateStore:
+    """Mantém em memória os certificados de sessão do Firebase.
+
+    É preenchido na inicialização do worker e renovado por uma thread em
+    segundo plano antes de expirar, de forma que a verificação de um cookie
+    nunca precise esperar o download dos certificados.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._certs: dict[str, str] = {}
+        self._fetched_at: float | None = None
+        self._max_age: float = DEFAULT_MAX_AGE
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Carrega os certificados e inicia a thread de renovação (idempotente)."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        if self._fetched_at is None:
+            try:
+                self.refresh()
+            except ServiceError:
+                print(
+                    "🟡 Certificados de sessão indisponíveis, nova tentativa em breve."
+                )
+
+        self._thread = threading.Thread(
+            target=self._run, name="session-certificates", daemon=True
+        )
+        self._thread.start()
+
+    def get(self) -> dict[str, str]:
+        """Retorna os certificados atuais (`kid` -> certificado PEM).
+
+        Raises:
+            ServiceError: se os certificados nunca puderam ser carregados.
+        """
+        if not self._certs:
+            self.refresh()
+
+        return self._certs
+
+    def refresh(self, min_interval: float = 0) -> None:
+        """Baixa os certificados do Google e substitui os atuais.
+
+        Args:
+            min_interval (float): não baixa de novo se os certificados atuais
+                tiverem menos que `min_interval` segundos.
+
+        Raises:
+            ServiceError: se não for possível baixar os certificados.
+        """
+        with self._lock:
+            if (
+                self._fetched_at is not None
+                and monotonic() - self._fetched_at < min_interval
+            ):
+                return
+
+            try:
+                response = http_client.request(
+                    "google.session_certificates", "GET", self.url, timeout=10
+                )
+                response.raise_for_status()
+                certs = response.json()
+            except (requests.RequestException, ValueError) as error:
+                raise ServiceError(
+                    "Ocorreu um erro ao verificar o cookie: serviço de autenticação indisponível."
+                ) from error
+
+            self._certs = certs
+            self._fetched_at = monotonic()
+            self._max_age = _max_age(response.headers.get("Cache-Control", ""))
+
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Idade e validade (em segundos) dos certificados em memória."""
+        if self._fetched_at is None:
+            return {"loaded": False, "age_seconds": None, "expires_in_seconds": None}
+
+        age = monotonic() - self._fetched_at
+
+        return {
+            "loaded": True,
+            "age_seconds": int(age),
+            "expires_in_seconds": int(self._max_age - age),
+        }
+
+    def _run(self) -> None:
+        while True:
+            if self._fetched_at is None:
+                delay = RETRY_SECONDS
+            else:
+                age = monotonic() - self._fetched_at
+                delay = max(self._max_age * REFRESH_AT - age, 0)
+
+            # acorda antes do tempo se alguém renovou os certificados
+            self._wakeup.clear()
+            if self._wakeup.wait(timeout=delay):
+                continue
+
+            try:
+                self.refresh()
+            except ServiceError:
+                self._wakeup.wait(timeout=RETRY_SECONDS)
+
+    def _after_fork(self) -> None:
+        # threads não sobrevivem ao fork (ex.: gunicorn --preload)
+        was_started = self._thread is not None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        if was_started:
+            self.start()
+
+
+def _max_age(cache_control: str) -> float:
+    match = re.search(r"max-age=(\d+)", cache_control)
+
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+store = _CertificateStore(CERTS_URL)
+os.register_at_fork(after_in_child=store._after_fork)
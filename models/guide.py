@@ -1,13 +1,30 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import closing
+from copy import deepcopy
 from datetime import datetime, timezone
+from hashlib import sha256
+import json
+from math import ceil
 import os
-from typing import Any
+from time import perf_counter
+from typing import Any, Generator, Iterator
 import dotenv
-from google import genai
-from firebase_admin import firestore
 from firebase_admin.exceptions import FirebaseError
-from schemas import DailyStudySchema
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore import SERVER_TIMESTAMP
+import metrics
+from cache import TTLCache
+from singleflight import SingleFlight
+from schemas import (
+    DAILY_STUDIES,
+    DAY_OUTLINES,
+    DAYS_PROGRESS,
+    DailyStudySchema,
+    DayOutlineSchema,
+)
 
 from errors import (
+    ConflictError,
     ForbiddenError,
     InternalServerError,
     NotFoundError,
@@ -15,13 +32,11 @@ from errors import (
     UnauthorizedError,
     ValidationError,
 )
-from models import prompt
+from models import backend, llm, prompt, scheduler
 import google.genai.errors as genai_errors
 
-from utils import load_prompt
-from pydantic import TypeAdapter
+from utils import load_prompt, prompts
 from pydantic import ValidationError as PydValidationError
-from typing import List
 
 dotenv.load_dotenv()
 
@@ -30,9 +45,80 @@ try:
 except AttributeError as error:
     raise InternalServerError() from error
 
+# Modo "hedged": segundos (ex.: "8") ou "p90" (p90 observado de cada modelo).
+# Vazio desativa e mantém o fallback sequencial.
+HEDGE_DELAY = os.getenv("GEN_HEDGE_DELAY", "")
+HEDGE_DEFAULT_DELAY = float(os.getenv("GEN_HEDGE_DEFAULT_DELAY", "15"))
+HEDGE_MIN_SAMPLES = 10
+
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GEN_HEDGE_WORKERS", "8")),
+    thread_name_prefix="guide-hedge",
+)
+
+# Modo em partes: guias com mais de GEN_CHUNK_DAYS dias são gerados em faixas de
+# até GEN_CHUNK_DAYS dias, em paralelo, a partir de um esboço comum. 0 desativa.
+CHUNK_DAYS = int(os.getenv("GEN_CHUNK_DAYS", "0"))
+
+_chunk_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GEN_CHUNK_WORKERS", "4")),
+    thread_name_prefix="guide-chunk",
+)
+
+# Cache das gerações por entradas normalizadas, versão do prompt e modelo; 0 desativa
+GENERATION_CACHE_SECONDS = int(os.getenv("GEN_CACHE_SECONDS", "86400"))
+GENERATION_CACHE_SIZE = int(os.getenv("GEN_CACHE_SIZE", "256"))
+
+_generations = TTLCache(maxsize=GENERATION_CACHE_SIZE, ttl=GENERATION_CACHE_SECONDS)
+
+# Gerações idênticas e simultâneas do mesmo usuário (ex.: duplo clique em "Gerar"
+# ou retry do cliente) esperam a que já está em andamento e recebem o resultado dela
+_generations_in_flight = SingleFlight("guide.generations")
+
+# Tentativas de `update_progress` quando outra requisição altera o guia no meio tempo
+PROGRESS_RETRIES = 3
+# Campos lidos por `update_studies` para checar o dono e o status do guia
+OWNER_FIELDS = ["owner", "status"]
+# Campos lidos por `update_progress`: o `daily_study` não precisa ser lido
+PROGRESS_FIELDS = ["owner", "status", "completed_mask", "total_days"]
+
+# Paginação de `find_all_by_username` e campos lidos para a listagem
+MY_GUIDES_PAGE_SIZE = int(os.getenv("MY_GUIDES_PAGE_SIZE", "20"))
+MY_GUIDES_MAX_PAGE_SIZE = 100
+LIST_FIELDS = [
+    "title",
+    "inputs.topic",
+    "inputs.days",
+    "created_at",
+    "status",
+    "completed_at",
+    "completed_mask",
+    "total_days",
+]
+
+
+def update_studies(guide_id: str, new_studies: list, username: str) -> list[dict]:
+    """Atualiza o campo 'daily_study' e o status do guia em uma única escrita.
+
+    A escrita só é aplicada se o guia não mudou desde a leitura (precondição
+    em `update_time`), e a resposta é montada a partir da lista validada, sem
+    ler o guia de novo.
+
+    Args:
+        guide_id (str): o ID do guia.
+        new_studies (list): a nova lista de estudos (List[DailyStudySchema]).
+        username (str): o usuário que está atualizando o guia.
+
+    Returns:
+        list[dict]: a lista de estudos salva.
 
-def update_studies(guide_id: str, new_studies: list, username: str) -> dict:
-    """Atualiza o campo 'daily_study'."""
+    Raises:
+        ValidationError: se a lista for inválida.
+        UnauthorizedError: se o guia for de outro usuário.
+        NotFoundError: se o guia não existir.
+        ConflictError: se o guia foi alterado por outra requisição no meio tempo.
+        ServiceError: se o Firestore falhar.
+    """
 
     if not isinstance(new_studies, list):
         raise ValidationError(
@@ -41,14 +127,30 @@ def update_studies(guide_id: str, new_studies: list, username: str) -> dict:
         )
 
     try:
-        studies_list_adapter = TypeAdapter(List[DailyStudySchema])
-        studies_list_adapter.validate_python(new_studies)
-
-        guide_is_complete = all(study["completed"] for study in new_studies)
+        studies = [
+            study.model_dump() for study in DAILY_STUDIES.validate_python(new_studies)
+        ]
+
+        fields: dict[str, Any] = {
+            "daily_study": studies,
+            **_progress(studies),
+            "status": "studying",
+        }
+        if all(study["completed"] for study in studies):
+            fields.update(
+                {"status": "completed", "completed_at": datetime.now(timezone.utc)}
+            )
 
-        db = firestore.client()
+        db = backend.db()
         guide_ref = db.collection("users_guides").document(guide_id)
-        guide_snap = guide_ref.get()
+        # o `daily_study` é sobrescrito: só o dono, o status e o `update_time` são lidos
+        guide_snap = guide_ref.get(field_paths=OWNER_FIELDS)
+
+        if not guide_snap.exists or guide_snap.get("status") == "deleted":
+            raise NotFoundError(
+                "O guia não foi encontrado.",
+                "Verifique que o guia existe e tente novamente.",
+            )
 
         if guide_snap.get("owner") != username:
             raise UnauthorizedError(
@@ -56,19 +158,11 @@ def update_studies(guide_id: str, new_studies: list, username: str) -> dict:
                 "Acesse um guia de sua autoria e tente novamente.",
             )
 
-        if guide_is_complete:
-            guide_ref.update(
-                {"status": "completed", "completed_at": datetime.now(timezone.utc)}
-            )
-        else:
-            guide_ref.update({"status": "studying"})
-
-        guide_ref.update({"daily_study": new_studies})
-
-        new_guide_snap = guide_ref.get()
-        db_new_studies: list = new_guide_snap.get("daily_study")
+        guide_ref.update(
+            fields, option=db.write_option(last_update_time=guide_snap.update_time)
+        )
 
-        return db_new_studies
+        return studies
 
     except PydValidationError as error:
         raise ValidationError(
@@ -76,70 +170,252 @@ def update_studies(guide_id: str, new_studies: list, username: str) -> dict:
             "Verifique se o corpo da requisição é uma List[DailyStudySchema] e tente novamente.",
         ) from error
 
+    except FailedPrecondition as error:
+        metrics.increment("guide.update_studies.conflicts")
+        raise ConflictError(
+            "O guia foi alterado por outra requisição.",
+            "Recarregue o guia e tente novamente.",
+        ) from error
+
     except FirebaseError as error:
         raise ServiceError(
             "Ocorreu um erro ao recuperar os guias.", "Tente novamente mais tarde."
         ) from error
 
 
-def find_all_by_username(username: str, only_public: bool = False) -> list[dict]:
-    """Busca os guias de um usuário, ignora os guias que foram deletados.
+def update_progress(guide_id: str, days: list, username: str) -> dict:
+    """Marca dias do guia como concluídos (ou não) sem reescrever o 'daily_study'.
+
+    O progresso fica em `completed_mask` (bit `n - 1` = dia `n` concluído), ao
+    lado do `daily_study`: a leitura, a validação e a escrita não crescem com
+    o tamanho do guia. Se outra requisição alterar o guia no meio tempo, a
+    alteração é refeita sobre o estado novo (os dias recebem um valor, não
+    são invertidos, então repetir é seguro).
+
+    Args:
+        guide_id (str): o ID do guia.
+        days (list): lista de `{"day": int, "completed": bool}`.
+        username (str): o usuário que está atualizando o guia.
+
+    Returns:
+        dict: o status do guia e o número de dias concluídos e totais.
+
+    Raises:
+        ValidationError: se a lista ou algum dos dias for inválido.
+        UnauthorizedError: se o guia for de outro usuário.
+        NotFoundError: se o guia não existir.
+        ConflictError: se o guia continuar sendo alterado por outras requisições.
+        ServiceError: se o Firestore falhar.
+    """
+    try:
+        changes = DAYS_PROGRESS.validate_python(days)
+    except PydValidationError as error:
+        raise ValidationError(
+            "A lista de dias é inválida.",
+            'Envie uma lista de {"day": número do dia, "completed": true/false}.',
+        ) from error
+
+    if not changes:
+        raise ValidationError(
+            "A lista de dias está vazia.",
+            "Envie ao menos um dia e tente novamente.",
+        )
+
+    try:
+        db = backend.db()
+        guide_ref = db.collection("users_guides").document(guide_id)
+
+        for _ in range(PROGRESS_RETRIES):
+            guide_snap = guide_ref.get(field_paths=PROGRESS_FIELDS)
+
+            if not guide_snap.exists or guide_snap.get("status") == "deleted":
+                raise NotFoundError(
+                    "O guia não foi encontrado.",
+                    "Verifique que o guia existe e tente novamente.",
+                )
+
+            if guide_snap.get("owner") != username:
+                raise UnauthorizedError(
+                    "Você não tem acesso à esse guia.",
+                    "Acesse um guia de sua autoria e tente novamente.",
+                )
+
+            progress = guide_snap.to_dict()
+            if "completed_mask" not in progress:
+                # guia salvo antes do `completed_mask`: calcula a partir dos dias
+                daily_study = guide_ref.get(field_paths=["daily_study"]).get(
+                    "daily_study"
+                )
+                progress.update(_progress(daily_study))
+
+            mask, total_days = progress["completed_mask"], progress["total_days"]
+            for change in changes:
+                if change.day > total_days:
+                    raise ValidationError(
+                        f"O guia não tem o dia {change.day}.",
+                        f"Envie dias entre 1 e {total_days} e tente novamente.",
+                    )
+
+                bit = 1 << (change.day - 1)
+                mask = mask | bit if change.completed else mask & ~bit
+
+            fields: dict[str, Any] = {
+                "completed_mask": mask,
+                "total_days": total_days,
+                "status": "studying",
+            }
+            if mask == (1 << total_days) - 1:
+                fields.update(
+                    {"status": "completed", "completed_at": datetime.now(timezone.utc)}
+                )
+
+            try:
+                guide_ref.update(
+                    fields,
+                    option=db.write_option(last_update_time=guide_snap.update_time),
+                )
+            except FailedPrecondition:
+                metrics.increment("guide.update_progress.conflicts")
+                continue
+
+            return {
+                "status": fields["status"],
+                "completed_days": mask.bit_count(),
+                "total_days": total_days,
+            }
+
+    except FirebaseError as error:
+        raise ServiceError(
+            "Não foi possível atualizar o progresso do guia.",
+            "Tente novamente mais tarde.",
+        ) from error
+
+    raise ConflictError(
+        "O guia foi alterado por outra requisição.",
+        "Recarregue o guia e tente novamente.",
+    )
+
+
+def _progress(daily_study: list[dict]) -> dict:
+    """Progresso compacto do guia, gravado ao lado do `daily_study`."""
+    return {
+        "completed_mask": sum(
+            1 << index for index, study in enumerate(daily_study) if study["completed"]
+        ),
+        "total_days": len(daily_study),
+    }
+
+
+def _with_progress(guide: dict) -> dict:
+    """Aplica o `completed_mask` nos dias do `daily_study` e remove os campos internos.
+
+    Guias salvos antes do `completed_mask` usam os `completed` de cada dia.
+    """
+    mask = guide.pop("completed_mask", None)
+    guide.pop("total_days", None)
+
+    if mask is not None:
+        for index, study in enumerate(guide.get("daily_study") or []):
+            study["completed"] = bool(mask >> index & 1)
+
+    return guide
+
+
+def find_all_by_username(
+    username: str,
+    only_public: bool = False,
+    limit: int | str | None = None,
+    after: str | None = None,
+) -> dict[str, Any]:
+    """Busca uma página dos guias de um usuário, dos mais novos para os mais antigos.
+
+    Ignora os guias que foram deletados. Só os campos da listagem são lidos
+    (projeção com `select()`), e o progresso vem do `completed_mask`, sem o
+    conteúdo dos dias.
 
     Args:
         username (str): nome do usuário proprietário dos guias
         only_public (bool):
             True: busca apenas os guias que o usuário marcou como 'is_public: true'.
             False: busca totod os guias do usuário.
+        limit (int | str | None): tamanho da página (padrão MY_GUIDES_PAGE_SIZE).
+        after (str | None): cursor da página, o ID do último guia da página anterior.
 
     Returns:
-        list[dict]: uma lista contendo todos os metadados dos guias encontrados.
+        dict: `guides`, os metadados dos guias da página, e `next`, o cursor da
+            próxima página (None se esta for a última).
 
     Raises:
+        ValidationError: se o `limit` ou o cursor forem inválidos.
         ServiceError: se o serviço do Firebase falhar.
 
     """
+    limit = _page_size(limit)
+
     try:
-        db = firestore.client()
+        db = backend.db()
+        guides_ref = db.collection("users_guides")
 
-        guides_snapshots = list()
+        # `in` no lugar de `!= deleted`: permite ordenar por `created_at`
+        query = guides_ref.where("owner", "==", username).where(
+            "status", "in", ["studying", "completed"]
+        )
         if only_public:
-            guides_snapshots = (
-                db.collection("users_guides")
-                .where("owner", "==", username)
-                .where("is_public", "==", True)
-                .where("status", "!=", "deleted")
-                .get()
-            )
-        else:
-            guides_snapshots = (
-                db.collection("users_guides")
-                .where("owner", "==", username)
-                .where("status", "!=", "deleted")
-                .get()
-            )
+            query = query.where("is_public", "==", True)
+
+        query = query.order_by("created_at", direction="DESCENDING").select(LIST_FIELDS)
+
+        if after:
+            cursor = guides_ref.document(after).get(field_paths=["owner", "created_at"])
+            if not cursor.exists or cursor.get("owner") != username:
+                raise ValidationError(
+                    "O cursor da página é inválido.",
+                    "Recomece a listagem sem o parâmetro 'after'.",
+                )
+            query = query.start_after(cursor)
+
+        # um guia a mais para saber se existe uma próxima página
+        guides_snapshots = query.limit(limit + 1).get()
 
         guides_metadata = list()
-        for guide in guides_snapshots:
+        for guide in guides_snapshots[:limit]:
+            fields = guide.to_dict()
+            if "completed_mask" not in fields:
+                # guia salvo antes do `completed_mask`: calcula a partir dos dias
+                fields.update(
+                    _progress(
+                        guide.reference.get(field_paths=["daily_study"]).get(
+                            "daily_study"
+                        )
+                    )
+                )
+
             guides_metadata.append(
                 {
                     "id": guide.id,
-                    "title": guide.get("title"),
-                    "topic": guide.get("inputs.topic"),
-                    "days": guide.get("inputs.days"),
-                    "daily_studies": guide.get("daily_study"),
-                    "created_at": guide.get("created_at"),
-                    "status": guide.get("status"),
+                    "title": fields["title"],
+                    "topic": fields["inputs"]["topic"],
+                    "days": fields["inputs"]["days"],
+                    "completed_days": fields["completed_mask"].bit_count(),
+                    "total_days": fields["total_days"],
+                    "created_at": fields["created_at"],
+                    "status": fields["status"],
                 }
             )
 
-            if guide.get("status") == "completed":
+            if fields["status"] == "completed":
                 guides_metadata[-1].update(
                     {
-                        "completed_at": guide.get("completed_at"),
+                        "completed_at": fields.get("completed_at"),
                     }
                 )
 
-        return guides_metadata
+        has_next = len(guides_snapshots) > limit
+
+        return {
+            "guides": guides_metadata,
+            "next": guides_metadata[-1]["id"] if has_next else None,
+        }
 
     except FirebaseError as error:
         raise ServiceError(
@@ -147,6 +423,24 @@ def find_all_by_username(username: str, only_public: bool = False) -> list[dict]
         ) from error
 
 
+def _page_size(limit: int | str | None) -> int:
+    if limit is None or limit == "":
+        return MY_GUIDES_PAGE_SIZE
+
+    try:
+        page_size = int(limit)
+    except (TypeError, ValueError):
+        page_size = 0
+
+    if not 1 <= page_size <= MY_GUIDES_MAX_PAGE_SIZE:
+        raise ValidationError(
+            f"O 'limit' precisa ser um número entre 1 e {MY_GUIDES_MAX_PAGE_SIZE}.",
+            "Verifique o parâmetro e tente novamente.",
+        )
+
+    return page_size
+
+
 def delete(guide_id: str, username: str) -> None:
     """Realiza o SOFT DELETE do guia no banco de dados.
 
@@ -169,7 +463,7 @@ def delete(guide_id: str, username: str) -> None:
         )
 
     try:
-        db = firestore.client()
+        db = backend.db()
         guide_ref = db.collection("users_guides").document(guide_id)
         guide_snap = guide_ref.get()
 
@@ -205,11 +499,11 @@ def find_by_id(guide_id: str) -> dict[str, Any]:
         ServiceError: se o Firebase não conseguir recuperar o guia;
     """
     try:
-        db = firestore.client()
+        db = backend.db()
         guide_snapshot = db.collection("users_guides").document(guide_id).get()
 
         if guide_snapshot.exists and guide_snapshot.get("status") != "deleted":
-            return guide_snapshot.to_dict()
+            return _with_progress(guide_snapshot.to_dict())
         else:
             raise NotFoundError(
                 "O guia não foi encontrado.",
@@ -225,24 +519,45 @@ def find_by_id(guide_id: str) -> dict[str, Any]:
 def save(guide_info: dict) -> dict[str, Any]:
     """Persiste o guia gerado no banco de dados.
 
+    O guia retornado é montado a partir do que foi escrito, sem ler o documento
+    de novo: o `created_at` é o horário do servidor, vindo do resultado da
+    escrita. O tempo da escrita é acrescentado em
+    `guide_info["generation"]["save_ms"]` (e no guia retornado), mas não no
+    documento salvo.
+
     Args:
         guide_info (dict): guia gerado através de guide.build().
 
     Returns:
-        str: ID do documento salvo no Firestore.
+        dict: o guia salvo, com o seu `id`.
     """
     try:
-        db = firestore.client()
+        db = backend.db()
         guides_collection_ref = db.collection("users_guides")
         guide_doc_ref = guides_collection_ref.document()
-        guide_doc_ref.set(
+
+        start = perf_counter()
+        write_result = guide_doc_ref.set(
             {
                 **guide_info,
+                **_progress(guide_info["daily_study"]),
                 "status": "studying",
+                "created_at": SERVER_TIMESTAMP,
             }
         )
+        save_ms = round((perf_counter() - start) * 1000, 1)
+        metrics.observe("guide.save.latency_ms", save_ms)
 
-        return {"id": guide_doc_ref.id, **guide_doc_ref.get().to_dict()}
+        # o tempo do save só é conhecido depois da escrita: vai só na resposta
+        if guide_info.get("generation") is not None:
+            guide_info["generation"]["save_ms"] = save_ms
+
+        return {
+            "id": guide_doc_ref.id,
+            **guide_info,
+            "status": "studying",
+            "created_at": write_result.update_time,
+        }
 
     except FirebaseError as error:
         raise ServiceError(
@@ -257,26 +572,31 @@ def generate_with_model(
 ) -> list[DailyStudySchema]:
     """Gera um guia de estudos a partir de um prompt."""
 
-    client = genai.Client()
+    client = llm.client()
 
-    try:
-        system_instruction = load_prompt("generate_guide.md")
-        response = client.models.generate_content(
-            model=model,
-            contents=user_prompt,
-            config={
-                "system_instruction": system_instruction,
-                "response_mime_type": "application/json",
-                "response_schema": list[DailyStudySchema],
-                "temperature": temperature,
-            },
-        )
+    with llm.admission(model, "generate"):
+        start = perf_counter()
+        try:
+            system_instruction = load_prompt("generate_guide.md")
+            response = client.models.generate_content(
+                model=model,
+                contents=user_prompt,
+                config={
+                    "system_instruction": system_instruction,
+                    "response_mime_type": "application/json",
+                    "response_schema": DAILY_STUDIES.response_schema,
+                    "temperature": temperature,
+                },
+            )
+            studies = DAILY_STUDIES.validate_json(response.text)
+            llm.record_attempt(model, "generate", start, usage=response.usage_metadata)
 
-        return response.parsed
-    except Exception as error:
-        raise ServiceError(
-            "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
-        ) from error
+            return studies
+        except Exception as error:
+            llm.record_attempt(model, "generate", start, error)
+            raise ServiceError(
+                "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+            ) from error
 
 
 def generate_with_fallback(
@@ -284,6 +604,8 @@ def generate_with_fallback(
 ) -> list[DailyStudySchema]:
     """Gera um guia de estudos a partir de um prompt usando fallback de modelos.
 
+    Com GEN_HEDGE_DELAY definido, usa o modo "hedged" (veja `_generate_hedged`).
+
     Args:
         user_prompt (str): prompt do usuário com as informações do guia.
 
@@ -292,40 +614,343 @@ def generate_with_fallback(
 
     """
 
-    client = genai.Client()
+    system_instruction = load_prompt("generate_guide.md")
+
+    if HEDGE_DELAY:
+        return _generate_hedged(user_prompt, system_instruction)
 
+    rejected: scheduler.Rejected | None = None
     for model_name in GEN_MODELS:
+        if not llm.breaker(model_name).allow():
+            llm.record_skip(model_name, "generate")
+            continue
+
         try:
-            system_instruction = load_prompt("generate_guide.md")
-            response = client.models.generate_content(
+            daily_study = _generate(model_name, user_prompt, system_instruction)
+
+            return daily_study, model_name  # type: ignore
+
+        except scheduler.Rejected as error:
+            rejected = error
+            continue
+
+        except genai_errors.ServerError as error:
+            if error.code == 503:
+                continue
+
+        except genai_errors.ClientError as error:
+            if error.code == 429:
+                continue
+
+        except Exception as error:
+            raise error
+
+    # todos os modelos disponíveis estavam saturados: o cliente recebe o Retry-After
+    if rejected:
+        raise rejected
+
+    raise ServiceError(
+        "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+    )
+
+
+def _generate(
+    model_name: str, user_prompt: str, system_instruction: str
+) -> list[DailyStudySchema]:
+    """Chama um modelo de GEN_MODELS e registra a sua latência nas métricas."""
+    with llm.admission(model_name, "generate"):
+        start = perf_counter()
+        try:
+            response = llm.client().models.generate_content(
                 model=model_name,
                 contents=user_prompt,
                 config={
                     "system_instruction": system_instruction,
                     "response_mime_type": "application/json",
-                    "response_schema": list[DailyStudySchema],
+                    "response_schema": DAILY_STUDIES.response_schema,
                     "temperature": 2,
                 },
             )
+            studies = DAILY_STUDIES.validate_json(response.text)
+        except Exception as error:
+            llm.record_attempt(model_name, "generate", start, error)
+            raise
 
-            return response.parsed, model_name  # type: ignore
+    llm.record_attempt(model_name, "generate", start, usage=response.usage_metadata)
 
-        except genai_errors.ServerError as error:
-            if error.code == 503:
-                continue
+    return studies
+
+
+def _hedge_delay(model_name: str) -> float:
+    """Segundos a esperar pelo modelo antes de disparar o próximo em paralelo."""
+    if HEDGE_DELAY != "p90":
+        return float(HEDGE_DELAY)
+
+    latencies = metrics.histogram(f"llm.generate.{model_name}.latency_ms")
+    if latencies.count < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+
+    return latencies.percentile(0.9) / 1000
+
+
+def _generate_hedged(
+    user_prompt: str, system_instruction: str
+) -> tuple[list[DailyStudySchema], str]:
+    """Gera o guia disparando os modelos de GEN_MODELS de forma escalonada.
+
+    Cada modelo recebe `_hedge_delay()` segundos para responder; depois disso o
+    próximo da lista é iniciado em paralelo (ou imediatamente, se o atual
+    falhar). A primeira lista de estudos válida vence e as demais chamadas são
+    canceladas (ou, se já estiverem rodando, têm o resultado descartado).
+    """
+    models = iter(GEN_MODELS)
+    pending: dict[Future, str] = {}
+    last_error: Exception | None = None
+
+    def start_next() -> bool:
+        model_name = next(models, None)
+        while model_name is not None and not llm.breaker(model_name).allow():
+            llm.record_skip(model_name, "generate")
+            model_name = next(models, None)
+
+        if model_name is None:
+            return False
+
+        future = _hedge_executor.submit(
+            llm.propagate(_generate), model_name, user_prompt, system_instruction
+        )
+        pending[future] = model_name
+        return True
+
+    start_next()
+    try:
+        while pending:
+            newest_model = list(pending.values())[-1]
+            done, _ = wait(
+                pending, timeout=_hedge_delay(newest_model), return_when=FIRST_COMPLETED
+            )
+
+            if not done:
+                if start_next():
+                    metrics.increment("llm.hedge.launched")
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                model_name = pending.pop(future)
+
+                try:
+                    daily_study = future.result()
+                except Exception as error:
+                    last_error = error
+                    daily_study = None
+
+                if daily_study:
+                    metrics.increment(f"llm.hedge.wins.{model_name}")
+                    return daily_study, model_name
+
+                # falhou ou respondeu algo inválido: o próximo começa na hora
+                start_next()
+    finally:
+        for future, model_name in pending.items():
+            # a chamada nem começou: o `allow()` de `start_next` é devolvido
+            if future.cancel():
+                llm.breaker(model_name).release()
+
+    if last_error and not isinstance(
+        last_error, (genai_errors.ServerError, genai_errors.ClientError)
+    ):
+        raise last_error
+
+    raise ServiceError(
+        "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+    )
 
-        except genai_errors.ClientError as error:
-            if error.code == 429:
-                continue
 
+def generate_chunked(
+    user_prompt: str, days: int, model: str = "", temperature: float = 2.0
+) -> tuple[list[DailyStudySchema], str]:
+    """Gera um guia longo em faixas de dias paralelas.
+
+    Primeiro um esboço curto (título de cada dia) é gerado; depois cada faixa
+    de até CHUNK_DAYS dias é gerada em paralelo com o esboço completo como
+    contexto, para manter a progressão entre as faixas. Por fim, as faixas são
+    validadas e unidas em um único `daily_study`. Um esboço ou faixa com os
+    dias errados é refeito uma vez; se continuar errado, o guia é gerado
+    inteiro a partir do prompt original.
+
+    Args:
+        user_prompt (str): prompt do usuário com as informações do guia.
+        days (int): número de dias do guia.
+        model (str): modelo específico (vazio usa o fallback de GEN_MODELS).
+        temperature (float): temperatura da geração (só com modelo específico).
+
+    Returns:
+        tuple[list[DailyStudySchema], str]: os dias do guia e o(s) modelo(s) usado(s).
+
+    Raises:
+        ServiceError: se nenhum modelo responder ou se nem a geração inteira
+            vier com os dias em sequência.
+    """
+    outline = _generate_outline(user_prompt, model)
+    if not _days_match(outline, 1, days):
+        # um esboço ou faixa com os dias errados é refeito uma vez
+        metrics.increment("guide.chunk_retries")
+        outline = _generate_outline(user_prompt, model)
+
+    if not _days_match(outline, 1, days):
+        return _generate_unchunked(user_prompt, days, model, temperature)
+
+    def generate_range(first_day: int, last_day: int):
+        chunk_prompt = prompt.format_chunk(user_prompt, outline, first_day, last_day)
+
+        for attempt in range(2):
+            if attempt:
+                metrics.increment("guide.chunk_retries")
+
+            studies, model_name = _generate_whole(chunk_prompt, model, temperature)
+            if _days_match(studies, first_day, last_day):
+                return studies, model_name
+
+        return None
+
+    chunks = [
+        _chunk_executor.submit(llm.propagate(generate_range), first_day, last_day)
+        for first_day, last_day in _plan_chunks(days, CHUNK_DAYS)
+    ]
+    metrics.increment("guide.chunked_generations")
+
+    daily_study: list[DailyStudySchema] = []
+    models: list[str] = []
+    try:
+        for chunk in chunks:
+            result = chunk.result()
+            if result is None:
+                break
+
+            studies, model_name = result
+            daily_study.extend(studies)
+            if model_name not in models:
+                models.append(model_name)
+        else:
+            return daily_study, "|".join(models)
+    finally:
+        for chunk in chunks:
+            chunk.cancel()
+
+    return _generate_unchunked(user_prompt, days, model, temperature)
+
+
+def _generate_unchunked(
+    user_prompt: str, days: int, model: str, temperature: float
+) -> tuple[list[DailyStudySchema], str]:
+    """Último recurso da geração em faixas: o guia inteiro de uma vez."""
+    metrics.increment("guide.chunk_fallbacks")
+
+    daily_study, model_name = _generate_whole(user_prompt, model, temperature)
+    _check_days(daily_study, 1, days)
+
+    return daily_study, model_name
+
+
+def _generate_whole(
+    user_prompt: str, model: str, temperature: float
+) -> tuple[list[DailyStudySchema], str]:
+    """Gera com o modelo específico ou, se vazio, com o fallback de GEN_MODELS."""
+    if model:
+        return generate_with_model(user_prompt, model, temperature), model
+
+    return generate_with_fallback(user_prompt)  # type: ignore
+
+
+def _plan_chunks(days: int, chunk_days: int) -> list[tuple[int, int]]:
+    """Divide os dias em faixas de tamanhos equilibrados (ex.: 25 → 1–9, 10–17, 18–25)."""
+    count = ceil(days / chunk_days)
+    size, remainder = divmod(days, count)
+
+    ranges = []
+    first_day = 1
+    for index in range(count):
+        last_day = first_day + size - 1 + (1 if index < remainder else 0)
+        ranges.append((first_day, last_day))
+        first_day = last_day + 1
+
+    return ranges
+
+
+def _days_match(studies: list, first_day: int, last_day: int) -> bool:
+    return [study.day for study in studies or []] == list(
+        range(first_day, last_day + 1)
+    )
+
+
+def _check_days(studies: list, first_day: int, last_day: int) -> None:
+    if not _days_match(studies, first_day, last_day):
+        raise ServiceError(
+            f"O modelo não gerou os dias {first_day} a {last_day} em sequência.",
+            "Tente novamente em alguns instantes.",
+        )
+
+
+def _generate_outline(user_prompt: str, model: str = "") -> list[DayOutlineSchema]:
+    """Gera o esboço (número e título de cada dia) com o modelo ou o fallback."""
+    system_instruction = load_prompt("generate_outline.md")
+
+    rejected: scheduler.Rejected | None = None
+    for model_name in [model] if model else GEN_MODELS:
+        if not model and not llm.breaker(model_name).allow():
+            llm.record_skip(model_name, "outline")
+            continue
+
+        try:
+            with llm.admission(model_name, "outline"):
+                start = perf_counter()
+                response = llm.client().models.generate_content(
+                    model=model_name,
+                    contents=user_prompt,
+                    config={
+                        "system_instruction": system_instruction,
+                        "response_mime_type": "application/json",
+                        "response_schema": DAY_OUTLINES.response_schema,
+                        "temperature": 1,
+                    },
+                )
+            outline = DAY_OUTLINES.validate_json(response.text)
+        except scheduler.Rejected as error:
+            if model:
+                raise
+
+            rejected = error
+            continue
         except Exception as error:
-            raise error
+            llm.record_attempt(model_name, "outline", start, error)
+            if not model and llm.is_unavailable(error):
+                continue
+
+            raise ServiceError(
+                "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+            ) from error
+
+        llm.record_attempt(model_name, "outline", start, usage=response.usage_metadata)
+
+        return outline
+
+    if rejected:
+        raise rejected
 
     raise ServiceError(
         "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
     )
 
 
+def validate_title(title: str) -> None:
+    if not title:
+        raise ValidationError(
+            "O título não pode ser vazio.",
+            "Preencha o título do guia e tente novamente.",
+        )
+
+
 def generate_with_metadata(
     owner: str,
     title: str,
@@ -333,32 +958,395 @@ def generate_with_metadata(
     model: str = "",
     is_public: bool = False,
     temperature: float = 2.0,
+    use_cache: bool = True,
 ) -> dict:
-    if not title:
-        raise ValidationError(
-            "O título não pode ser vazio.",
-            "Preencha o título do guia e tente novamente.",
-        )
+    validate_title(title)
 
-    start_time = datetime.now()
+    start = perf_counter()
 
     user_prompt = prompt.make(inputs)
+    prompt_version = prompts.get("generate_guide.md").version
+    prompt_build_ms = (perf_counter() - start) * 1000
 
-    if model:
-        daily_study = generate_with_model(user_prompt, model, temperature)
-    else:
-        daily_study, model = generate_with_fallback(user_prompt)
+    cache_key = _generation_key(
+        user_prompt, prompt_version, model, temperature, _chunked(inputs["days"])
+    )
+    # `use_cache` na chave: quem pediu uma geração nova nunca recebe a do cache
+    generated = _generations_in_flight.do(
+        (owner, cache_key, use_cache),
+        _generate_study,
+        user_prompt,
+        inputs["days"],
+        cache_key,
+        model,
+        temperature,
+        use_cache,
+    )
+    # cada requisição agrupada monta o próprio guia a partir de uma cópia
+    daily_study, model, attempts, cache_hit = deepcopy(generated)
+
+    return _build(
+        owner=owner,
+        title=title,
+        inputs=inputs,
+        model=model,
+        prompt_version=prompt_version,
+        temperature=temperature,
+        generation=_generation_record(
+            start, prompt_build_ms, attempts, cache_hit=cache_hit
+        ),
+        daily_study=daily_study,
+        is_public=is_public,
+    )
+
+
+def _generate_study(
+    user_prompt: str,
+    days: int,
+    cache_key: str,
+    model: str,
+    temperature: float,
+    use_cache: bool,
+) -> tuple[list[dict], str, list[dict], bool]:
+    """Gera (ou busca no cache) o `daily_study` de um prompt.
+
+    Returns:
+        tuple: o `daily_study`, o(s) modelo(s) usado(s), as tentativas de
+            chamada aos modelos e se veio do cache.
+    """
+    with llm.track_attempts() as attempts:
+        if cached := use_cache and _cached_generation(cache_key):
+            daily_study, model = cached
+            return daily_study, model, attempts, True
+
+        if _chunked(days):
+            generated, model = generate_chunked(user_prompt, days, model, temperature)
+        else:
+            generated, model = _generate_whole(user_prompt, model, temperature)
+
+        daily_study = list(map(lambda study: study.model_dump(), generated))
+        _store_generation(cache_key, daily_study, model)
+
+    return daily_study, model, attempts, False
+
+
+def _generation_record(
+    start: float, prompt_build_ms: float, attempts: list[dict], cache_hit: bool
+) -> dict:
+    """Telemetria da geração: tempos em ms, tentativas por modelo e tokens."""
+    return {
+        "total_ms": round((perf_counter() - start) * 1000, 1),
+        "prompt_build_ms": round(prompt_build_ms, 1),
+        "cache_hit": cache_hit,
+        "attempts": list(attempts),
+        "input_tokens": sum(attempt["input_tokens"] or 0 for attempt in attempts),
+        "output_tokens": sum(attempt["output_tokens"] or 0 for attempt in attempts),
+    }
+
+
+def _chunked(days: int) -> bool:
+    """Se o guia é gerado em faixas de dias (veja `generate_chunked`)."""
+    return bool(CHUNK_DAYS) and days > CHUNK_DAYS
+
+
+def _generation_key(
+    user_prompt: str,
+    prompt_version: str,
+    model: str,
+    temperature: float,
+    chunked: bool = False,
+) -> str:
+    """Hash das entradas já normalizadas por `prompt.make()` e do que gera o guia.
+
+    Na geração em faixas, o tamanho das faixas e as versões dos prompts do
+    esboço e das faixas também mudam o guia gerado.
+    """
+    models = model or "|".join(GEN_MODELS)
+    key = [user_prompt, prompt_version, models, temperature]
+
+    if chunked:
+        key += [
+            CHUNK_DAYS,
+            prompts.get("generate_outline.md").version,
+            prompt.CHUNK_FORMAT_VERSION,
+        ]
+
+    return sha256(json.dumps(key).encode()).hexdigest()
+
+
+def _cached_generation(cache_key: str) -> tuple[list[dict], str] | None:
+    """Retorna uma cópia da geração em cache, com o progresso (`completed`) zerado."""
+    if GENERATION_CACHE_SECONDS <= 0:
+        return None
+
+    cached = _generations.get(cache_key)
+    if cached is None:
+        metrics.increment("guide.generation_cache.misses")
+        return None
+
+    metrics.increment("guide.generation_cache.hits")
+    daily_study, model = cached
+
+    return [{**deepcopy(study), "completed": False} for study in daily_study], model
+
+
+def _store_generation(cache_key: str, daily_study: list[dict], model: str) -> None:
+    if GENERATION_CACHE_SECONDS > 0:
+        _generations.set(cache_key, (deepcopy(daily_study), model))
 
-    finished_time = datetime.now()
 
+def _build(
+    owner: str,
+    title: str,
+    inputs: dict,
+    model: str,
+    prompt_version: str,
+    temperature: float,
+    generation: dict,
+    daily_study: list[dict],
+    is_public: bool,
+) -> dict:
     return {
         "owner": owner,
         "title": title,
         "inputs": inputs,
         "model": model,
+        "prompt_version": prompt_version,
         "temperature": temperature,
-        "generation_time_seconds": int((finished_time - start_time).total_seconds()),
-        "daily_study": list(map(lambda study: study.model_dump(), daily_study)),
+        "generation_time_seconds": int(generation["total_ms"] / 1000),
+        "generation": generation,
+        "daily_study": daily_study,
         "created_at": datetime.now(timezone.utc),
         "is_public": is_public,
     }
+
+
+def generate_stream(
+    owner: str,
+    title: str,
+    inputs: dict,
+    model: str = "",
+    is_public: bool = False,
+    temperature: float = 2.0,
+    use_cache: bool = True,
+) -> Iterator[tuple[str, dict]]:
+    """Gera o guia em streaming, entregando cada dia assim que ele fica pronto.
+
+    As entradas são validadas antes de retornar o iterador, então erros de
+    validação continuam sendo levantados na hora.
+
+    Args:
+        owner (str): nome do usuário dono do guia.
+        title (str): título do guia.
+        inputs (dict): entradas do usuário (topic, knowledge, focus_time, days).
+        model (str): modelo específico (vazio usa o fallback de GEN_MODELS).
+        is_public (bool): se o guia será público.
+        temperature (float): temperatura da geração.
+        use_cache (bool): se uma geração idêntica em cache pode ser reaproveitada.
+
+    Returns:
+        Iterator[tuple[str, dict]]: eventos ("day", dia validado) e, ao final,
+        ("done", guia salvo com o seu ID).
+
+    Raises:
+        ValidationError: se o título ou as entradas forem inválidos.
+    """
+    validate_title(title)
+    user_prompt = prompt.make(inputs)
+
+    return _stream(
+        owner=owner,
+        title=title,
+        inputs=inputs,
+        user_prompt=user_prompt,
+        model=model,
+        is_public=is_public,
+        temperature=temperature,
+        use_cache=use_cache,
+    )
+
+
+def _stream(
+    owner: str,
+    title: str,
+    inputs: dict,
+    user_prompt: str,
+    model: str,
+    is_public: bool,
+    temperature: float,
+    use_cache: bool,
+) -> Iterator[tuple[str, dict]]:
+    start = perf_counter()
+    prompt_version = prompts.get("generate_guide.md").version
+    attempts: list[dict] = []
+
+    cache_key = _generation_key(user_prompt, prompt_version, model, temperature)
+    if cached := use_cache and _cached_generation(cache_key):
+        daily_study, model_name = cached
+        for study in daily_study:
+            yield "day", study
+    else:
+        daily_study = []
+        model_name = yield from _stream_days(
+            user_prompt, model, temperature, daily_study, attempts
+        )
+        _store_generation(cache_key, daily_study, model_name)
+
+    study_guide = _build(
+        owner=owner,
+        title=title,
+        inputs=inputs,
+        model=model_name,
+        prompt_version=prompt_version,
+        temperature=temperature,
+        # o prompt do streaming é montado antes de abrir o stream
+        generation=_generation_record(start, 0.0, attempts, cache_hit=bool(cached)),
+        daily_study=daily_study,
+        is_public=is_public,
+    )
+
+    yield "done", save(study_guide)
+
+
+def _stream_days(
+    user_prompt: str,
+    model: str,
+    temperature: float,
+    daily_study: list[dict],
+    attempts: list[dict],
+) -> Generator[tuple[str, dict], None, str]:
+    """Envia os dias gerados (acumulando-os em `daily_study`) e retorna o modelo usado."""
+    system_instruction = load_prompt("generate_guide.md")
+
+    rejected: scheduler.Rejected | None = None
+    for model_name in [model] if model else GEN_MODELS:
+        if not model and not llm.breaker(model_name).allow():
+            llm.record_skip(model_name, "generate", attempts)
+            continue
+
+        try:
+            # `closing`: se o cliente desconectar, o stream do modelo é fechado na hora
+            with closing(
+                _generate_stream(
+                    model_name, user_prompt, system_instruction, temperature, attempts
+                )
+            ) as studies:
+                for study in studies:
+                    daily_study.append(study.model_dump())
+                    yield "day", daily_study[-1]
+
+            break
+
+        except scheduler.Rejected as error:
+            # a rejeição acontece antes de qualquer dia ser enviado
+            if model:
+                raise
+
+            rejected = error
+
+        except Exception as error:
+            # depois do primeiro dia enviado não dá mais para trocar de modelo
+            if model or daily_study or not llm.is_unavailable(error):
+                raise ServiceError(
+                    "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+                ) from error
+    else:
+        if rejected:
+            raise rejected
+
+        raise ServiceError(
+            "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
+        )
+
+    return model_name
+
+
+def _generate_stream(
+    model_name: str,
+    user_prompt: str,
+    system_instruction: str,
+    temperature: float,
+    attempts: list[dict],
+) -> Iterator[DailyStudySchema]:
+    """Chama a API de streaming do modelo e valida cada dia assim que ele fecha."""
+    parser = _DailyStudyParser()
+    days = 0
+    usage = None
+    recorded = False
+
+    with llm.admission(model_name, "generate"):
+        start = perf_counter()
+        try:
+            chunks = llm.client().models.generate_content_stream(
+                model=model_name,
+                contents=user_prompt,
+                config={
+                    "system_instruction": system_instruction,
+                    "response_mime_type": "application/json",
+                    "response_schema": DAILY_STUDIES.response_schema,
+                    "temperature": temperature,
+                },
+            )
+
+            for chunk in chunks:
+                usage = chunk.usage_metadata or usage
+                for study in parser.feed(chunk.text or ""):
+                    if not days:
+                        metrics.observe(
+                            f"llm.stream.{model_name}.first_day_ms",
+                            (perf_counter() - start) * 1000,
+                        )
+                    days += 1
+                    yield DailyStudySchema.model_validate(study)
+
+            if not days or not parser.finished:
+                raise ServiceError("O modelo não gerou um guia completo.")
+        except Exception as error:
+            llm.record_attempt(model_name, "generate", start, error, attempts=attempts)
+            recorded = True
+            raise
+        else:
+            llm.record_attempt(
+                model_name, "generate", start, usage=usage, attempts=attempts
+            )
+            recorded = True
+        finally:
+            # o cliente desconectou no meio do stream (GeneratorExit): a chamada
+            # não conta como sucesso nem falha, mas libera o teste do half_open
+            if not recorded:
+                llm.breaker(model_name).release()
+
+
+class _DailyStudyParser:
+    """Extrai os objetos de um array JSON que chega em pedaços.
+
+    Cada chamada de `feed()` devolve os objetos que ficaram completos com o
+    novo pedaço; o restante fica no buffer até o próximo.
+    """
+
+    def __init__(self):
+        self.finished = False
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> list[dict]:
+        self._buffer += text
+        objects = []
+
+        while not self.finished:
+            # descarta o "[" inicial, as vírgulas e os espaços entre os objetos
+            self._buffer = self._buffer.lstrip(" \t\r\n[,")
+
+            if self._buffer.startswith("]"):
+                self.finished = True
+                break
+
+            try:
+                study, end = self._decoder.raw_decode(self._buffer)
+            except json.JSONDecodeError:
+                break  # objeto incompleto: espera o próximo pedaço
+
+            objects.append(study)
+            self._buffer = self._buffer[end:]
+
+        return objects
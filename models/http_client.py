@@ -0,0 +1,118 @@
+import os
+import threading
+from time import perf_counter, sleep
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+# Fração das requisições que pode virar retentativa (evita tempestade de retries)
+RETRY_BUDGET_RATIO = float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.1"))
+RETRY_BUDGET_MIN = 10
+RETRY_STATUSES = {500, 502, 503, 504}
+BACKOFF_SECONDS = 0.1
+
+
+class _RetryBudget:
+    """Cada requisição deposita `ratio` fichas e cada retentativa gasta uma."""
+
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.capacity = minimum
+        self._tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_session_lock = threading.Lock()
+_budget = _RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN)
+
+
+def session() -> requests.Session:
+    """Retorna a sessão HTTP (com pool de conexões keep-alive) deste processo.
+
+    A sessão é recriada após um fork para que processos diferentes nunca
+    compartilhem o mesmo socket.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            new_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            new_session.mount("https://", adapter)
+            new_session.mount("http://", adapter)
+
+            _session = new_session
+            _session_pid = os.getpid()
+
+        return _session
+
+
+def request(name: str, method: str, url: str, **kwargs) -> requests.Response:
+    """Faz uma requisição pela sessão compartilhada, medindo a latência.
+
+    Respostas 5xx transitórias e falhas de conexão são repetidas até
+    MAX_RETRIES vezes, desde que haja saldo no orçamento de retentativas.
+
+    Args:
+        name (str): nome da chamada usado nas métricas (ex.: "firebase.sign_in").
+        method (str): método HTTP.
+        url (str): URL de destino.
+        **kwargs: argumentos repassados para `requests.Session.request`.
+
+    Returns:
+        requests.Response: a resposta da última tentativa.
+
+    Raises:
+        requests.RequestException: se a última tentativa falhar.
+    """
+    _budget.deposit()
+
+    attempt = 0
+    while True:
+        start = perf_counter()
+        try:
+            response = session().request(method, url, **kwargs)
+        except requests.ConnectionError:
+            metrics.increment(f"http.{name}.errors")
+            if attempt < MAX_RETRIES and _budget.withdraw():
+                attempt += 1
+                metrics.increment(f"http.{name}.retries")
+                sleep(BACKOFF_SECONDS * 2**attempt)
+                continue
+
+            raise
+        finally:
+            metrics.observe(f"http.{name}.latency_ms", (perf_counter() - start) * 1000)
+
+        if (
+            response.status_code in RETRY_STATUSES
+            and attempt < MAX_RETRIES
+            and _budget.withdraw()
+        ):
+            attempt += 1
+            metrics.increment(f"http.{name}.retries")
+            sleep(BACKOFF_SECONDS * 2**attempt)
+            continue
+
+        return response
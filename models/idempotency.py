@@ -0,0 +1,149 @@
+import json
+import os
+import traceback
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from typing import Any
+
+from dotenv import load_dotenv
+from google.api_core.exceptions import (
+    AlreadyExists,
+    FailedPrecondition,
+    GoogleAPICallError,
+)
+
+import metrics
+from errors import ConflictError, ServiceError, ValidationError
+from models import backend
+
+load_dotenv()
+
+# Por quanto tempo a resposta de uma chave concluída é reaproveitada
+KEY_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_SECONDS", "86400"))
+# Tempo que uma requisição "segura" a chave; se o worker morrer, a chave é liberada
+LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "300"))
+MAX_KEY_LENGTH = 255
+
+COLLECTION = "idempotency_keys"
+
+
+def begin(owner: str, key: str, payload: Any) -> dict | None:
+    """Reserva a `Idempotency-Key` para a requisição atual.
+
+    Args:
+        owner (str): o usuário que fez a requisição (chaves são por usuário).
+        key (str): o valor do header `Idempotency-Key`.
+        payload: o corpo da requisição; uma chave só vale para o mesmo corpo.
+
+    Returns:
+        dict | None: a resposta guardada (`status_code`, `body`, `location`) se
+            a chave já foi concluída, ou None se a requisição deve ser executada.
+
+    Raises:
+        ValidationError: se a chave for inválida ou já tiver sido usada com
+            outro corpo.
+        ConflictError: se a requisição original ainda estiver em andamento.
+        ServiceError: se o Firestore falhar.
+    """
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValidationError(
+            f"A Idempotency-Key precisa ter entre 1 e {MAX_KEY_LENGTH} caracteres.",
+            "Verifique o header e tente novamente.",
+        )
+
+    fingerprint = _fingerprint(payload)
+    key_ref = _reference(owner, key)
+    now = datetime.now(timezone.utc)
+    record = {
+        "owner": owner,
+        "fingerprint": fingerprint,
+        "status": "in_progress",
+        "response": None,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=LEASE_SECONDS),
+    }
+
+    try:
+        try:
+            key_ref.create(record)
+            metrics.increment("idempotency.started")
+            return None
+        except AlreadyExists:
+            pass
+
+        key_snap = key_ref.get()
+        stored = key_snap.to_dict()
+
+        if stored is not None and stored["fingerprint"] != fingerprint:
+            raise ValidationError(
+                "A Idempotency-Key já foi usada com outro corpo de requisição.",
+                "Use uma nova chave para uma nova requisição.",
+            )
+
+        # chave expirada (ou apagada no meio do caminho): a requisição assume a chave
+        if stored is None or stored["expires_at"] < now:
+            if stored is None:
+                key_ref.create(record)
+            else:
+                key_ref.update(
+                    record,
+                    option=backend.db().write_option(
+                        last_update_time=key_snap.update_time
+                    ),
+                )
+            metrics.increment("idempotency.started")
+            return None
+
+        if stored["status"] == "done":
+            metrics.increment("idempotency.replayed")
+            return stored["response"]
+    except (AlreadyExists, FailedPrecondition):
+        # outra requisição com a mesma chave assumiu a chave primeiro
+        pass
+    except GoogleAPICallError as error:
+        raise ServiceError(
+            "Não foi possível verificar a Idempotency-Key.",
+            "Tente novamente mais tarde.",
+        ) from error
+
+    metrics.increment("idempotency.in_progress")
+    raise ConflictError(
+        "Uma requisição com essa Idempotency-Key ainda está em andamento.",
+        "Aguarde alguns instantes e repita a requisição para receber o resultado.",
+    )
+
+
+def complete(
+    owner: str, key: str, status_code: int, body: str, location: str | None = None
+) -> None:
+    """Guarda a resposta da requisição, que passa a ser devolvida nas repetições."""
+    _reference(owner, key.strip()).update(
+        {
+            "status": "done",
+            "response": {
+                "status_code": status_code,
+                "body": body,
+                "location": location,
+            },
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=KEY_SECONDS),
+        }
+    )
+
+
+def release(owner: str, key: str) -> None:
+    """Libera a chave de uma requisição que falhou, para que possa ser repetida."""
+    try:
+        _reference(owner, key.strip()).delete()
+    except Exception:
+        # a chave fica presa só até o lease expirar
+        traceback.print_exc()
+
+
+def _reference(owner: str, key: str):
+    document_id = sha256(f"{owner}:{key}".encode()).hexdigest()
+    return backend.db().collection(COLLECTION).document(document_id)
+
+
+def _fingerprint(payload: Any) -> str:
+    return sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,391 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from dotenv import load_dotenv
+from google.api_core.exceptions import FailedPrecondition
+
+import metrics
+from errors import (
+    ForbiddenError,
+    InternalServerError,
+    NotFoundError,
+    ServiceError,
+)
+from models import backend, guide, prompt
+
+load_dotenv()
+
+WORKERS = int(os.getenv("GUIDE_JOBS_WORKERS", "2"))
+QUEUE_SIZE = int(os.getenv("GUIDE_JOBS_QUEUE_SIZE", "16"))
+# Tempo que um worker "segura" um job; se morrer, outro worker pode assumi-lo
+LEASE_SECONDS = int(os.getenv("GUIDE_JOBS_LEASE_SECONDS", "300"))
+# Tentativas de gravar o resultado (status "done"/"failed") de um job
+FINISH_ATTEMPTS = 2
+
+COLLECTION = "guide_jobs"
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="guide-job")
+_lock = threading.Lock()
+_queued = 0
+_running = 0
+# Processo que já retomou os jobs órfãos (veja `_recover_once`)
+_recovered_pid: int | None = None
+
+
+def _queued_count() -> int:
+    return _queued
+
+
+def _running_count() -> int:
+    return _running
+
+
+metrics.gauge("guide_jobs.queue_depth", _queued_count)
+metrics.gauge("guide_jobs.running", _running_count)
+
+
+def enqueue(
+    owner: str,
+    title: str,
+    inputs: dict,
+    model: str = "",
+    temperature: float = 2.0,
+    use_cache: bool = True,
+) -> dict[str, Any]:
+    """Agenda a geração de um guia e retorna o job criado.
+
+    As entradas são validadas antes de agendar, então erros de validação
+    continuam sendo respondidos na hora.
+
+    Args:
+        owner (str): nome do usuário dono do guia.
+        title (str): título do guia.
+        inputs (dict): entradas do usuário (topic, knowledge, focus_time, days).
+        model (str): modelo específico (vazio usa o fallback de modelos).
+        temperature (float): temperatura da geração.
+        use_cache (bool): se uma geração idêntica em cache pode ser reaproveitada.
+
+    Returns:
+        dict: o ID e o status do job.
+
+    Raises:
+        ValidationError: se o título ou as entradas forem inválidos.
+        ServiceError: se a fila de jobs deste worker estiver cheia.
+    """
+    global _queued
+
+    _recover_once()
+    guide.validate_title(title)
+    prompt.make(inputs)
+
+    with _lock:
+        if _queued >= QUEUE_SIZE:
+            raise ServiceError(
+                "A fila de geração de guias está cheia.",
+                "Tente novamente em alguns instantes.",
+            )
+        _queued += 1
+
+    try:
+        now = datetime.now(timezone.utc)
+        job_ref = backend.db().collection(COLLECTION).document()
+        job_ref.set(
+            {
+                "owner": owner,
+                "params": {
+                    "title": title,
+                    "inputs": inputs,
+                    "model": model,
+                    "temperature": temperature,
+                    "use_cache": use_cache,
+                },
+                "status": "queued",
+                "guide_id": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+            }
+        )
+    except Exception as error:
+        with _lock:
+            _queued -= 1
+        raise ServiceError(
+            "Não foi possível agendar a geração do guia.", "Tente novamente mais tarde."
+        ) from error
+
+    _executor.submit(_run, job_ref.id)
+
+    return {"id": job_ref.id, "status": "queued"}
+
+
+def find_by_id(job_id: str, username: str) -> dict[str, Any]:
+    """Busca um job de geração de guia.
+
+    Se o job ficou órfão (o worker que o segurava morreu), ele é reagendado
+    neste worker.
+
+    Args:
+        job_id (str): o ID do job.
+        username (str): o usuário que está consultando o job.
+
+    Returns:
+        dict: status do job e, quando concluído, o guia gerado.
+
+    Raises:
+        NotFoundError: se o job não existir.
+        ForbiddenError: se o job for de outro usuário.
+    """
+    _recover_once()
+    job_snap = backend.db().collection(COLLECTION).document(job_id).get()
+
+    if not job_snap.exists:
+        raise NotFoundError(
+            "O job não foi encontrado.", "Verifique o ID e tente novamente."
+        )
+
+    job = job_snap.to_dict()
+
+    if job["owner"] != username:
+        raise ForbiddenError(
+            "Você não tem permissão para acessar esse job.",
+            "Verifique se o job é de sua autoria e tente novamente.",
+        )
+
+    if _is_orphan(job):
+        _resubmit(job_snap)
+
+    return {
+        "id": job_id,
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "error": job["error"],
+        "guide": (
+            {"id": job["guide_id"], **guide.find_by_id(job["guide_id"])}
+            if job["status"] == "done"
+            else None
+        ),
+    }
+
+
+def _recover_once() -> None:
+    """Retoma os jobs órfãos na primeira vez que o processo usa a fila de jobs.
+
+    Roda no worker, e não no import do app: com `gunicorn --preload` o import
+    acontece no master, cujas threads do pool não passam para os workers.
+    """
+    global _recovered_pid
+
+    with _lock:
+        if _recovered_pid == os.getpid():
+            return
+        _recovered_pid = os.getpid()
+
+    _executor.submit(recover)
+
+
+def recover() -> None:
+    """Reagenda os jobs órfãos (ex.: de um worker reiniciado) neste worker."""
+    try:
+        jobs = (
+            backend.db()
+            .collection(COLLECTION)
+            .where("status", "in", ["queued", "running"])
+            .get()
+        )
+
+        for job_snap in jobs:
+            if _is_orphan(job_snap.to_dict()):
+                _resubmit(job_snap)
+    except Exception:
+        traceback.print_exc()
+        print("🟡 Não foi possível recuperar os jobs de geração de guias.")
+
+
+def _is_orphan(job: dict) -> bool:
+    return job["status"] in ("queued", "running") and job[
+        "lease_expires_at"
+    ] < datetime.now(timezone.utc)
+
+
+def _resubmit(job_snap) -> None:
+    global _queued
+
+    if _claim(job_snap, "queued") is None:
+        return
+
+    with _lock:
+        _queued += 1
+
+    metrics.increment("guide_jobs.recovered")
+    _executor.submit(_run, job_snap.id)
+
+
+def _claim(job_snap, status: str) -> datetime | None:
+    """Assume o job renovando o lease, desde que ninguém o tenha alterado antes.
+
+    Returns:
+        datetime | None: o `update_time` da escrita, ou None se outro worker
+            alterou o job primeiro.
+    """
+    db = backend.db()
+    now = datetime.now(timezone.utc)
+
+    try:
+        write_result = job_snap.reference.update(
+            {
+                "status": status,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=LEASE_SECONDS),
+            },
+            option=db.write_option(last_update_time=job_snap.update_time),
+        )
+        return write_result.update_time
+    except FailedPrecondition:
+        return None
+
+
+class _Lease:
+    """Lease de um job em execução, renovado em segundo plano.
+
+    Cada escrita usa como precondição o `update_time` da escrita anterior
+    deste worker: se outro worker assumiu o job (ex.: o lease expirou durante
+    uma pausa longa), a renovação para, `lost` fica True e `finish()` retorna
+    False.
+    """
+
+    def __init__(self, job_ref, update_time: datetime):
+        self.job_ref = job_ref
+        self.update_time = update_time
+        self.lost = False
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._renew, name="guide-job-lease", daemon=True
+        )
+        self._thread.start()
+
+    def _renew(self) -> None:
+        while not self._stopped.wait(LEASE_SECONDS / 3):
+            now = datetime.now(timezone.utc)
+            try:
+                self._write(
+                    {"lease_expires_at": now + timedelta(seconds=LEASE_SECONDS)}
+                )
+            except FailedPrecondition:
+                return
+            except Exception:
+                # tenta de novo no próximo ciclo, antes de o lease expirar
+                traceback.print_exc()
+                continue
+
+            metrics.increment("guide_jobs.lease_renewals")
+
+    def finish(self, fields: dict) -> bool:
+        """Para a renovação e grava o resultado do job (com uma nova tentativa).
+
+        Returns:
+            bool: False se outro worker assumiu o job ou se a escrita falhou;
+                nos dois casos o resultado não foi gravado.
+        """
+        self._stopped.set()
+        self._thread.join()
+
+        for attempt in range(FINISH_ATTEMPTS):
+            try:
+                self._write(fields)
+                return True
+            except FailedPrecondition:
+                # a tentativa anterior pode ter sido gravada apesar do erro
+                return attempt > 0 and self._written(fields)
+            except Exception:
+                traceback.print_exc()
+
+        return False
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _write(self, fields: dict) -> None:
+        with self._lock:
+            try:
+                write_result = self.job_ref.update(
+                    {**fields, "updated_at": datetime.now(timezone.utc)},
+                    option=backend.db().write_option(last_update_time=self.update_time),
+                )
+            except FailedPrecondition:
+                self.lost = True
+                self._stopped.set()
+                raise
+
+            self.update_time = write_result.update_time
+
+    def _written(self, fields: dict) -> bool:
+        try:
+            job = self.job_ref.get().to_dict() or {}
+        except Exception:
+            # na dúvida, o resultado é mantido: o job pode já apontar para ele
+            traceback.print_exc()
+            return True
+
+        written = all(job.get(key) == value for key, value in fields.items())
+        self.lost = not written
+        return written
+
+
+def _run(job_id: str) -> None:
+    global _queued, _running
+
+    with _lock:
+        _queued -= 1
+        _running += 1
+
+    job_ref = backend.db().collection(COLLECTION).document(job_id)
+    lease: _Lease | None = None
+
+    try:
+        job_snap = job_ref.get()
+        if job_snap.get("status") != "queued":
+            return
+
+        claimed_at = _claim(job_snap, "running")
+        if claimed_at is None:
+            return
+
+        lease = _Lease(job_ref, claimed_at)
+        job = job_snap.to_dict()
+        study_guide = guide.generate_with_metadata(owner=job["owner"], **job["params"])
+        saved_guide = guide.save(study_guide)
+
+        if not lease.finish({"status": "done", "guide_id": saved_guide["id"]}):
+            # outro worker assumiu o job no meio tempo (o guia dele é o que vale),
+            # ou o resultado não foi gravado e o job será refeito após o lease
+            guide.delete(saved_guide["id"], job["owner"])
+            metrics.increment(
+                "guide_jobs.superseded" if lease.lost else "guide_jobs.finish_failures"
+            )
+            return
+
+        metrics.increment("guide_jobs.done")
+    except Exception as error:
+        traceback.print_exc()
+
+        if not hasattr(error, "toDict"):
+            error = InternalServerError()
+
+        # sem lease o job não foi assumido por este worker e não é alterado
+        if lease is not None and lease.finish(
+            {"status": "failed", "error": error.toDict()}
+        ):
+            metrics.increment("guide_jobs.failed")
+    finally:
+        if lease is not None:
+            lease.stop()
+
+        with _lock:
+            _running -= 1
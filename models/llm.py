@@ -0,0 +1,361 @@
+import os
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from time import monotonic, perf_counter
+from typing import Any
+
+import google.genai.errors as genai_errors
+import httpx
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+import metrics
+from models import scheduler
+
+load_dotenv()
+
+TIMEOUT_MS = int(os.getenv("GEMINI_TIMEOUT_MS", "120000"))
+MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_SECONDS = float(os.getenv("GEMINI_KEEPALIVE_SECONDS", "60"))
+
+# Falhas seguidas que abrem o circuito de um modelo e tempo até testá-lo de novo
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+_client: genai.Client | None = None
+_client_pid: int | None = None
+_client_lock = threading.Lock()
+
+
+def client() -> genai.Client:
+    """Retorna o `genai.Client` compartilhado por todas as requisições do processo.
+
+    O pool de conexões HTTP do cliente fica aquecido entre as chamadas de
+    geração e validação. Após um fork (ex.: gunicorn --preload) o cliente é
+    recriado, para que dois processos nunca compartilhem o mesmo socket.
+    """
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = genai.Client(
+                http_options=types.HttpOptions(
+                    timeout=TIMEOUT_MS,
+                    client_args={
+                        "limits": httpx.Limits(
+                            max_connections=MAX_CONNECTIONS,
+                            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=KEEPALIVE_SECONDS,
+                        ),
+                        "event_hooks": {"request": [_trace_request]},
+                    },
+                )
+            )
+            _client_pid = os.getpid()
+            metrics.increment("llm.clients_created")
+
+        return _client
+
+
+def _reused_requests() -> int:
+    return metrics.counter("llm.http.requests") - metrics.counter(
+        "llm.http.connections_opened"
+    )
+
+
+metrics.gauge("llm.http.reused_requests", _reused_requests)
+
+
+def _trace_request(request: httpx.Request) -> None:
+    metrics.increment("llm.http.requests")
+    request.extensions["trace"] = _trace
+
+
+def _trace(event_name: str, info: dict) -> None:
+    # só é disparado quando o pool precisa abrir uma conexão nova;
+    # requisições - conexões novas = requisições que reaproveitaram uma conexão
+    if event_name == "connection.connect_tcp.complete":
+        metrics.increment("llm.http.connections_opened")
+
+
+class CircuitBreaker:
+    """Circuit breaker de um modelo: "closed", "open" ou "half_open".
+
+    Após BREAKER_FAILURES falhas seguidas o circuito abre e o modelo é pulado
+    sem ser chamado. Passado o cooldown, uma única chamada de teste é liberada
+    (half_open): se der certo o circuito fecha, se falhar abre de novo.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Informa se o modelo pode ser chamado agora."""
+        with self._lock:
+            if self.state == "open":
+                if monotonic() - self._opened_at < self.cooldown_seconds:
+                    return False
+                self.state = "half_open"
+
+            if self.state == "half_open":
+                if self._probing:
+                    return False
+                self._probing = True
+
+            return True
+
+    def release(self) -> None:
+        """Libera o teste do half_open quando a chamada nem chegou a ser feita."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                elapsed = monotonic() - self._opened_at
+                retry_in = round(max(self.cooldown_seconds - elapsed, 0), 1)
+
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in_seconds": retry_in,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(model_name: str) -> CircuitBreaker:
+    """Retorna o circuit breaker do modelo, compartilhado por todo o processo."""
+    with _breakers_lock:
+        if model_name not in _breakers:
+            _breakers[model_name] = CircuitBreaker(
+                BREAKER_FAILURES, BREAKER_COOLDOWN_SECONDS
+            )
+
+        return _breakers[model_name]
+
+
+def breakers() -> dict[str, dict]:
+    """Estado atual dos circuit breakers de todos os modelos já chamados."""
+    with _breakers_lock:
+        registry = dict(_breakers)
+
+    return {name: circuit.snapshot() for name, circuit in registry.items()}
+
+
+@contextmanager
+def admission(model_name: str, operation: str) -> Iterator[None]:
+    """Segura uma vaga do modelo no scheduler (veja `models/scheduler.py`).
+
+    Raises:
+        scheduler.Rejected: se o modelo estiver saturado. O teste do circuit
+            breaker, se havia um, fica livre para a próxima chamada.
+    """
+    rejected = True
+    try:
+        with scheduler.slot(model_name, operation):
+            rejected = False
+            yield
+    finally:
+        if rejected:
+            breaker(model_name).release()
+
+
+def is_unavailable(error: Exception) -> bool:
+    """Erros que indicam modelo indisponível (5xx, cota excedida, timeout ou
+    falha de conexão)."""
+    return isinstance(error, (genai_errors.ServerError, httpx.TransportError)) or (
+        isinstance(error, genai_errors.ClientError) and error.code == 429
+    )
+
+
+def record_result(model_name: str, error: Exception | None = None) -> None:
+    """Registra no circuit breaker do modelo o resultado de uma chamada.
+
+    Só conta como sucesso a chamada em que o modelo respondeu. Outros erros
+    (ex.: resposta fora do schema) não dizem nada sobre a saúde do modelo e
+    apenas liberam o teste do half_open.
+    """
+    if error is None:
+        breaker(model_name).record_success()
+    elif is_unavailable(error):
+        breaker(model_name).record_failure()
+    else:
+        breaker(model_name).release()
+
+
+# Tentativas de chamada aos modelos da geração em andamento (veja `track_attempts`)
+_attempts: ContextVar[list[dict] | None] = ContextVar("llm_attempts", default=None)
+
+_seen: set[tuple[str, str]] = set()
+_seen_lock = threading.Lock()
+
+
+@contextmanager
+def track_attempts() -> Iterator[list[dict]]:
+    """Coleta as tentativas de chamada aos modelos feitas dentro do bloco.
+
+    Chamadas feitas em outras threads só são coletadas se a função submetida
+    ao executor for embrulhada com `propagate()`.
+    """
+    attempts: list[dict] = []
+    token = _attempts.set(attempts)
+    try:
+        yield attempts
+    finally:
+        _attempts.reset(token)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Embrulha `fn` para rodar em outra thread com o contexto da atual."""
+    return partial(copy_context().run, fn)
+
+
+def record_attempt(
+    model_name: str,
+    operation: str,
+    start: float,
+    error: Exception | None = None,
+    usage: Any = None,
+    attempts: list[dict] | None = None,
+) -> None:
+    """Registra uma chamada a um modelo: circuit breaker, métricas e tentativas.
+
+    Args:
+        model_name (str): o modelo chamado.
+        operation (str): "generate", "outline" ou "validate".
+        start (float): `perf_counter()` do início da chamada.
+        error (Exception | None): o erro da chamada, se ela falhou.
+        usage: o `usage_metadata` da resposta, com a contagem de tokens.
+        attempts (list[dict] | None): onde registrar a tentativa; por padrão, a
+            lista aberta por `track_attempts()`, se houver.
+    """
+    elapsed_ms = (perf_counter() - start) * 1000
+    input_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = None
+    if usage is not None:
+        output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (
+            getattr(usage, "thoughts_token_count", None) or 0
+        )
+
+    record_result(model_name, error)
+
+    with _seen_lock:
+        _seen.add((model_name, operation))
+
+    if error is None:
+        metrics.increment(f"llm.{operation}.{model_name}.successes")
+        metrics.observe(f"llm.{operation}.{model_name}.latency_ms", elapsed_ms)
+    else:
+        metrics.increment(f"llm.{operation}.{model_name}.failures")
+
+    metrics.increment(f"llm.{model_name}.input_tokens", input_tokens or 0)
+    metrics.increment(f"llm.{model_name}.output_tokens", output_tokens or 0)
+
+    if attempts is None:
+        attempts = _attempts.get()
+
+    if attempts is not None:
+        attempts.append(
+            {
+                "model": model_name,
+                "operation": operation,
+                "status": "failed" if error else "ok",
+                "duration_ms": round(elapsed_ms, 1),
+                "error_code": _error_code(error),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+            }
+        )
+
+
+def record_skip(
+    model_name: str, operation: str, attempts: list[dict] | None = None
+) -> None:
+    """Registra um modelo pulado por estar com o circuito aberto."""
+    metrics.increment(f"llm.breaker.skipped.{model_name}")
+
+    if attempts is None:
+        attempts = _attempts.get()
+
+    if attempts is not None:
+        attempts.append(
+            {
+                "model": model_name,
+                "operation": operation,
+                "status": "skipped",
+                "duration_ms": 0.0,
+                "error_code": None,
+                "input_tokens": None,
+                "output_tokens": None,
+            }
+        )
+
+
+def _error_code(error: Exception | None) -> int | str | None:
+    if error is None:
+        return None
+
+    return getattr(error, "code", None) or type(error).__name__
+
+
+def model_stats() -> dict[str, dict]:
+    """Visão agregada, por modelo, das latências, sucessos e tokens deste worker."""
+    with _seen_lock:
+        seen = sorted(_seen)
+
+    stats: dict[str, dict] = {}
+    for model_name, operation in seen:
+        latencies = metrics.histogram(f"llm.{operation}.{model_name}.latency_ms")
+        successes = metrics.counter(f"llm.{operation}.{model_name}.successes")
+        failures = metrics.counter(f"llm.{operation}.{model_name}.failures")
+        attempts = successes + failures
+
+        model_stats = stats.setdefault(
+            model_name,
+            {
+                "input_tokens": metrics.counter(f"llm.{model_name}.input_tokens"),
+                "output_tokens": metrics.counter(f"llm.{model_name}.output_tokens"),
+                "operations": {},
+            },
+        )
+        model_stats["operations"][operation] = {
+            "attempts": attempts,
+            "successes": successes,
+            "failures": failures,
+            "success_rate": round(successes / attempts, 4) if attempts else None,
+            "avg_ms": latencies.snapshot()["avg_ms"],
+            "p50_ms": latencies.percentile(0.5),
+            "p90_ms": latencies.percentile(0.9),
+        }
+
+    return stats
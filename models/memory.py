@@ -0,0 +1,652 @@
+"""Implementação em memória do Firestore e do Firebase Auth.
+
+Cobre apenas as operações que a aplicação usa, com a mesma interface do SDK,
+para rodar a API (ex.: sob geradores de carga) sem rede e sem um projeto do
+Firebase. É ativada com `BACKEND=memory` (veja `models/backend.py`).
+"""
+
+import copy
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
+
+from firebase_admin import auth as firebase_auth
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+from google.cloud.firestore_v1.transforms import Sentinel
+
+from errors import UnauthorizedError
+
+PROJECT_ID = "orienta-memory"
+ISSUER_PREFIX = "https://session.firebase.google.com/"
+# Validade de um ID token, como no Firebase
+ID_TOKEN_SECONDS = 3600
+# Tamanho a partir do qual os tokens e cookies vencidos são descartados
+PRUNE_AT = 1024
+
+_MISSING = object()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _get_nested(data: dict, field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+
+    return value
+
+
+def _set_nested(data: dict, field_path: str, value: Any) -> None:
+    *parents, last = field_path.split(".")
+    for part in parents:
+        data = data.setdefault(part, {})
+
+    data[last] = value
+
+
+def _project(data: dict, field_paths: list[str]) -> dict:
+    """Mantém só os campos pedidos, como `get(field_paths=...)`/`select()`."""
+    projected: dict = {}
+    for field_path in field_paths:
+        value = _get_nested(data, field_path)
+        if value is not _MISSING:
+            _set_nested(projected, field_path, copy.deepcopy(value))
+
+    return projected
+
+
+def _resolve(value: Any, now: datetime) -> Any:
+    """Troca sentinelas (ex.: SERVER_TIMESTAMP) pelo valor que o servidor gravaria."""
+    if isinstance(value, Sentinel):
+        return now
+    if isinstance(value, dict):
+        return {key: _resolve(item, now) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, now) for item in value]
+
+    return copy.deepcopy(value)
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if op == "!=":
+        return value is not _MISSING and value != expected
+    if value is _MISSING:
+        return False
+
+    try:
+        return {
+            "==": lambda: value == expected,
+            "<": lambda: value < expected,
+            "<=": lambda: value <= expected,
+            ">": lambda: value > expected,
+            ">=": lambda: value >= expected,
+            "in": lambda: value in expected,
+            "not-in": lambda: value not in expected,
+            "array-contains": lambda: expected in value,
+        }[op]()
+    except TypeError:
+        return False
+
+
+# --- Firestore ---------------------------------------------------------------
+
+
+class _Document:
+    def __init__(self, data: dict, now: datetime):
+        self.data = data
+        self.create_time = now
+        self.update_time = now
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class DocumentSnapshot:
+    def __init__(
+        self,
+        reference: "DocumentReference",
+        document: _Document | None,
+        field_paths: list[str] | None = None,
+    ):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = document is not None
+        self._data = None
+        if document is not None:
+            self._data = (
+                _project(document.data, field_paths)
+                if field_paths is not None
+                else copy.deepcopy(document.data)
+            )
+        self.create_time = document.create_time if document else None
+        self.update_time = document.update_time if document else None
+
+    def get(self, field_path: str) -> Any:
+        if not self.exists:
+            return None
+
+        value = _get_nested(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+
+        return copy.deepcopy(value)
+
+    def to_dict(self) -> dict | None:
+        return copy.deepcopy(self._data)
+
+
+class DocumentReference:
+    def __init__(self, db: "MemoryFirestore", collection: str, document_id: str):
+        self._db = db
+        self._collection = collection
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._collection}/{self.id}"
+
+    def get(self, field_paths: list[str] | None = None) -> DocumentSnapshot:
+        with self._db.lock:
+            return DocumentSnapshot(
+                self, self._db.documents(self._collection).get(self.id), field_paths
+            )
+
+    def create(self, data: dict) -> WriteResult:
+        batch = self._db.batch()
+        batch.create(self, data)
+        return batch.commit()[0]
+
+    def set(self, data: dict, merge: bool = False) -> WriteResult:
+        batch = self._db.batch()
+        batch.set(self, data, merge=merge)
+        return batch.commit()[0]
+
+    def update(self, data: dict, option: "WriteOption | None" = None) -> WriteResult:
+        batch = self._db.batch()
+        batch.update(self, data, option=option)
+        return batch.commit()[0]
+
+    def delete(self, option: "WriteOption | None" = None) -> WriteResult:
+        batch = self._db.batch()
+        batch.delete(self, option=option)
+        return batch.commit()[0]
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, collection: "CollectionReference"):
+        self._collection = collection
+        self._filters: list[tuple[str, str, Any]] = []
+        self._orders: list[tuple[str, str]] = []
+        self._field_paths: list[str] | None = None
+        self._start_after: DocumentSnapshot | dict | None = None
+        self._limit: int | None = None
+
+    def _copy(self) -> "Query":
+        query = Query(self._collection)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        query._field_paths = self._field_paths
+        query._start_after = self._start_after
+        query._limit = self._limit
+        return query
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        query = self._copy()
+
+        if filter is not None:
+            field_path, op_string, value = (
+                filter.field_path,
+                filter.op_string,
+                filter.value,
+            )
+
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        query = self._copy()
+        query._orders.append((field_path, direction))
+        return query
+
+    def select(self, field_paths: list[str]) -> "Query":
+        query = self._copy()
+        query._field_paths = list(field_paths)
+        return query
+
+    def start_after(self, document_fields_or_snapshot) -> "Query":
+        query = self._copy()
+        query._start_after = document_fields_or_snapshot
+        return query
+
+    def limit(self, count: int) -> "Query":
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def _sort_key(self, document_id: str, data: dict) -> tuple:
+        # como no Firestore, o ID do documento desempata, na direção da última ordem
+        return tuple(_get_nested(data, field) for field, _ in self._orders) + (
+            document_id,
+        )
+
+    def _after_cursor(self, document_id: str, data: dict) -> bool:
+        cursor = self._start_after
+        if isinstance(cursor, DocumentSnapshot):
+            cursor_key = self._sort_key(cursor.id, cursor._data or {})
+        else:
+            cursor_key = tuple(cursor[field] for field, _ in self._orders)
+
+        key = self._sort_key(document_id, data)[: len(cursor_key)]
+        for value, cursor_value, direction in zip(
+            key,
+            cursor_key,
+            [direction for _, direction in self._orders]
+            + [self._orders[-1][1] if self._orders else self.ASCENDING],
+        ):
+            if value == cursor_value:
+                continue
+
+            ascending = direction == self.ASCENDING
+            return value > cursor_value if ascending else value < cursor_value
+
+        return False
+
+    def get(self) -> list[DocumentSnapshot]:
+        db = self._collection._db
+        name = self._collection.id
+
+        with db.lock:
+            matches = [
+                (document_id, document)
+                for document_id, document in db.documents(name).items()
+                if all(
+                    _matches(_get_nested(document.data, field), op, value)
+                    for field, op, value in self._filters
+                )
+                # o Firestore não devolve documentos sem os campos ordenados
+                and all(
+                    _get_nested(document.data, field) is not _MISSING
+                    for field, _ in self._orders
+                )
+            ]
+
+            # ordenação estável: aplica da última para a primeira ordem
+            directions = [direction for _, direction in self._orders] + [
+                self._orders[-1][1] if self._orders else self.ASCENDING
+            ]
+            for position in reversed(range(len(directions))):
+                matches.sort(
+                    key=lambda match: self._sort_key(match[0], match[1].data)[position],
+                    reverse=directions[position] == self.DESCENDING,
+                )
+
+            if self._start_after is not None:
+                matches = [
+                    (document_id, document)
+                    for document_id, document in matches
+                    if self._after_cursor(document_id, document.data)
+                ]
+
+            if self._limit is not None:
+                matches = matches[: self._limit]
+
+            results = [
+                DocumentSnapshot(
+                    DocumentReference(db, name, document_id),
+                    document,
+                    self._field_paths,
+                )
+                for document_id, document in matches
+            ]
+
+        return results
+
+    def stream(self):
+        return iter(self.get())
+
+
+class CollectionReference(Query):
+    def __init__(self, db: "MemoryFirestore", name: str):
+        self._db = db
+        self.id = name
+        super().__init__(self)
+
+    def document(self, document_id: str | None = None) -> DocumentReference:
+        return DocumentReference(
+            self._db, self.id, document_id or secrets.token_hex(10)
+        )
+
+    def add(self, data: dict, document_id: str | None = None):
+        reference = self.document(document_id)
+        result = reference.create(data)
+        return result.update_time, reference
+
+    def list_documents(self) -> list[DocumentReference]:
+        with self._db.lock:
+            return [
+                self.document(document_id)
+                for document_id in self._db.documents(self.id)
+            ]
+
+
+class WriteOption:
+    """Pré-condição de escrita (equivalente ao `LastUpdateOption` do SDK)."""
+
+    def __init__(self, last_update_time: datetime):
+        self.last_update_time = last_update_time
+
+
+class WriteBatch:
+    """Aplica todas as escritas de uma vez, ou nenhuma se alguma falhar."""
+
+    def __init__(self, db: "MemoryFirestore"):
+        self._db = db
+        self._writes: list[tuple] = []
+
+    def create(self, reference: DocumentReference, data: dict) -> None:
+        self._writes.append(("create", reference, data, False, None))
+
+    def set(
+        self, reference: DocumentReference, data: dict, merge: bool = False
+    ) -> None:
+        self._writes.append(("set", reference, data, merge, None))
+
+    def update(
+        self,
+        reference: DocumentReference,
+        data: dict,
+        option: WriteOption | None = None,
+    ) -> None:
+        self._writes.append(("update", reference, data, False, option))
+
+    def delete(
+        self, reference: DocumentReference, option: WriteOption | None = None
+    ) -> None:
+        self._writes.append(("delete", reference, None, False, option))
+
+    def commit(self) -> list[WriteResult]:
+        db = self._db
+
+        with db.lock:
+            for kind, reference, _, _, option in self._writes:
+                current = db.documents(reference._collection).get(reference.id)
+
+                if kind == "create" and current is not None:
+                    raise AlreadyExists(f"Document already exists: {reference.path}")
+                if kind == "update" and current is None:
+                    raise NotFound(f"No document to update: {reference.path}")
+                if option is not None and (
+                    current is None or current.update_time != option.last_update_time
+                ):
+                    raise FailedPrecondition(
+                        f"The document was modified: {reference.path}"
+                    )
+
+            now = db.next_write_time()
+
+            for kind, reference, data, merge, _ in self._writes:
+                documents = db.documents(reference._collection)
+                current = documents.get(reference.id)
+
+                if kind == "delete":
+                    documents.pop(reference.id, None)
+                elif current is None or (kind in ("create", "set") and not merge):
+                    documents[reference.id] = _Document(_resolve(data, now), now)
+                    if current is not None:
+                        documents[reference.id].create_time = current.create_time
+                else:
+                    for field_path, value in data.items():
+                        if kind == "update":
+                            _set_nested(current.data, field_path, _resolve(value, now))
+                        else:
+                            current.data[field_path] = _resolve(value, now)
+                    current.update_time = now
+
+        return [WriteResult(now) for _ in self._writes]
+
+
+class MemoryFirestore:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._collections: dict[str, dict[str, _Document]] = {}
+        self._last_write_time = _now()
+
+    def next_write_time(self) -> datetime:
+        """Horário de escrita sempre crescente, como o `update_time` do Firestore."""
+        with self.lock:
+            self._last_write_time = max(
+                _now(), self._last_write_time + timedelta(microseconds=1)
+            )
+            return self._last_write_time
+
+    def write_option(self, last_update_time: datetime) -> WriteOption:
+        return WriteOption(last_update_time)
+
+    def documents(self, collection: str) -> dict[str, _Document]:
+        return self._collections.setdefault(collection, {})
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def reset(self) -> None:
+        with self.lock:
+            self._collections.clear()
+
+
+# --- Firebase Auth -----------------------------------------------------------
+
+
+class _UserRecord(SimpleNamespace):
+    pass
+
+
+class _ListUsersPage:
+    def __init__(self, users: list[_UserRecord]):
+        self.users = users
+
+    def iterate_all(self):
+        return iter(self.users)
+
+
+class MemoryAuth:
+    """Contas, ID tokens e cookies de sessão (opacos) guardados em memória."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users: dict[str, _UserRecord] = {}
+        self._passwords: dict[str, str] = {}
+        self._id_tokens: dict[str, tuple[str, int]] = {}
+        self._cookies: dict[str, dict] = {}
+        self._prune_at = PRUNE_AT
+
+    def create_user(self, *, email: str, password: str, display_name: str):
+        if not email or "@" not in email:
+            raise ValueError(f"Invalid email: {email}")
+        if not password or len(password) < 6:
+            raise ValueError("Password must be a string at least 6 characters long.")
+
+        with self._lock:
+            if any(user.email == email for user in self._users.values()):
+                raise firebase_auth.EmailAlreadyExistsError(
+                    "The user with the provided email already exists.", None, None
+                )
+
+            uid = secrets.token_urlsafe(21)
+            self._users[uid] = _UserRecord(
+                uid=uid,
+                email=email,
+                display_name=display_name,
+                disabled=False,
+                tokens_valid_after_timestamp=0,
+                user_metadata=SimpleNamespace(
+                    creation_timestamp=int(_now().timestamp()) * 1000
+                ),
+            )
+            self._passwords[uid] = password
+
+            return copy.copy(self._users[uid])
+
+    def get_user(self, uid: str):
+        with self._lock:
+            if uid not in self._users:
+                raise firebase_auth.UserNotFoundError(
+                    f"No user record found for {uid}."
+                )
+
+            return copy.copy(self._users[uid])
+
+    def delete_user(self, uid: str) -> None:
+        with self._lock:
+            if self._users.pop(uid, None) is None:
+                raise firebase_auth.UserNotFoundError(
+                    f"No user record found for {uid}."
+                )
+            self._passwords.pop(uid, None)
+
+    def delete_users(self, uids: list[str]) -> None:
+        with self._lock:
+            for uid in uids:
+                self._users.pop(uid, None)
+                self._passwords.pop(uid, None)
+
+    def list_users(self) -> _ListUsersPage:
+        with self._lock:
+            return _ListUsersPage([copy.copy(user) for user in self._users.values()])
+
+    def revoke_refresh_tokens(self, uid: str) -> None:
+        with self._lock:
+            self._users[uid].tokens_valid_after_timestamp = (
+                int(_now().timestamp()) * 1000
+            )
+
+    def sign_in_with_password(self, email: str, password: str) -> dict[str, str]:
+        """Equivalente ao `accounts:signInWithPassword` da REST API do Firebase."""
+        with self._lock:
+            user = next(
+                (user for user in self._users.values() if user.email == email), None
+            )
+
+            if user is None or self._passwords[user.uid] != password:
+                raise UnauthorizedError(
+                    "Email ou senha errados.",
+                    "Verifique os dados e tente novamente.",
+                )
+
+            id_token = secrets.token_urlsafe(32)
+            self._id_tokens[id_token] = (user.uid, int(_now().timestamp()))
+            self._prune()
+
+        return {
+            "idToken": id_token,
+            "localId": user.uid,
+            "displayName": user.display_name,
+            "email": user.email,
+        }
+
+    def create_session_cookie(self, id_token: str, expires_in) -> str:
+        if isinstance(expires_in, timedelta):
+            expires_in = int(expires_in.total_seconds())
+
+        with self._lock:
+            # o ID token só serve para criar o cookie: depois é descartado
+            uid, auth_time = self._id_tokens.pop(id_token, (None, 0))
+            if uid is None or auth_time + ID_TOKEN_SECONDS <= _now().timestamp():
+                raise firebase_auth.InvalidIdTokenError("Invalid ID token.")
+
+            user = self._users[uid]
+            issued_at = int(_now().timestamp())
+
+            cookie = secrets.token_urlsafe(32)
+            self._cookies[cookie] = {
+                "iss": ISSUER_PREFIX + PROJECT_ID,
+                "aud": PROJECT_ID,
+                "auth_time": auth_time,
+                "sub": uid,
+                "uid": uid,
+                "user_id": uid,
+                "name": user.display_name,
+                "email": user.email,
+                "iat": issued_at,
+                "exp": issued_at + expires_in,
+            }
+            self._prune()
+
+        return cookie
+
+    def _prune(self) -> None:
+        """Descarta ID tokens vencidos e cookies vencidos ou revogados.
+
+        Só percorre tudo quando o total dobra desde a última vez, para que o
+        custo por login continue constante. Deve ser chamada com o lock.
+        """
+        if len(self._id_tokens) + len(self._cookies) < self._prune_at:
+            return
+
+        now = _now().timestamp()
+        for id_token, (_, auth_time) in list(self._id_tokens.items()):
+            if auth_time + ID_TOKEN_SECONDS <= now:
+                del self._id_tokens[id_token]
+
+        for cookie, claims in list(self._cookies.items()):
+            user = self._users.get(claims["uid"])
+            if (
+                claims["exp"] <= now
+                or user is None
+                or claims["iat"] * 1000 < user.tokens_valid_after_timestamp
+            ):
+                del self._cookies[cookie]
+
+        self._prune_at = max(PRUNE_AT, 2 * (len(self._id_tokens) + len(self._cookies)))
+
+    def verify_session_cookie(self, cookie: str, check_revoked: bool = False) -> dict:
+        with self._lock:
+            claims = self._cookies.get(cookie)
+
+        if claims is None:
+            raise firebase_auth.InvalidSessionCookieError("Invalid session cookie.")
+
+        if claims["exp"] <= _now().timestamp():
+            raise firebase_auth.ExpiredSessionCookieError("Token expired.", cause=None)
+
+        if check_revoked:
+            user = self.get_user(claims["uid"])
+            if user.disabled:
+                raise firebase_auth.UserDisabledError("The user record is disabled.")
+            if claims["iat"] * 1000 < user.tokens_valid_after_timestamp:
+                raise firebase_auth.RevokedSessionCookieError(
+                    "The Firebase session cookie has been revoked."
+                )
+
+        return dict(claims)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._passwords.clear()
+            self._id_tokens.clear()
+            self._cookies.clear()
+            self._prune_at = PRUNE_AT
+
+
+db = MemoryFirestore()
+auth = MemoryAuth()
+
+
+def reset() -> None:
+    """Apaga todos os documentos e contas em memória."""
+    db.reset()
+    auth.reset()
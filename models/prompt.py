@@ -1,10 +1,16 @@
 import os
+import traceback
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from time import perf_counter
 from dotenv import load_dotenv
 from errors import InternalServerError, ServiceError, ValidationError
-from google import genai
-from pydantic import BaseModel, Field
 import google.genai.errors as genai_errors
-from utils import load_prompt
+import metrics
+from cache import TTLCache
+from models import backend, llm, scheduler
+from schemas import TOPIC_VERDICT, TopicVerdictSchema
+from utils import load_prompt, prompts
 
 load_dotenv()
 try:
@@ -12,6 +18,16 @@ try:
 except AttributeError as error:
     raise InternalServerError() from error
 
+# Vereditos de relevância: os válidos raramente mudam, os inválidos podem ser
+# um falso negativo do modelo e por isso expiram antes
+VERDICT_VALID_SECONDS = int(os.getenv("TOPIC_VERDICT_VALID_SECONDS", "604800"))
+VERDICT_INVALID_SECONDS = int(os.getenv("TOPIC_VERDICT_INVALID_SECONDS", "3600"))
+VERDICT_CACHE_SIZE = int(os.getenv("TOPIC_VERDICT_CACHE_SIZE", "4096"))
+
+VERDICTS_COLLECTION = "topic_verdicts"
+
+_verdicts = TTLCache(maxsize=VERDICT_CACHE_SIZE, ttl=VERDICT_VALID_SECONDS)
+
 
 def process(user_input: dict) -> dict:
     """Limpa os dados de entrada removendo espaços.
@@ -63,64 +79,142 @@ def validate_topic(topic):
         )
 
 
-def validate_relevance(topic):
-    class ValidationResult(BaseModel):
-        class VerifyDetails(BaseModel):
-            is_relevant: bool = Field(
-                description="Indica se o texto é relevante para um plano de estudos."
-            )
-            is_bad_language: bool = Field(
-                description="Indica se o texto contém linguagem ofensiva."
-            )
-            is_gibberish: bool = Field(
-                description="Indica se o texto é aleatório e sem sentido."
-            )
+def validate_relevance(topic) -> TopicVerdictSchema:
+    verdict_key = _verdict_key(topic)
+    if verdict := _cached_verdict(verdict_key):
+        if verdict["is_valid"] is False:
+            raise ValidationError(message=verdict["motive"])
 
-        is_valid: bool = Field(
-            description="O veredito final: true se todas as verificações passarem, senão false."
-        )
+        return TOPIC_VERDICT.validate_python(verdict)
 
-        motive: str = Field(
-            description="Uma justificativa clara caso a entrada seja inválida. Se for válida, retorna 'N/A'."
-        )
-
-    client = genai.Client()
+    client = llm.client()
     system_instruction = load_prompt("topic_validation.md")
 
+    rejected: scheduler.Rejected | None = None
     for model_name in VALIDATION_MODELS:
+        if not llm.breaker(model_name).allow():
+            llm.record_skip(model_name, "validate")
+            continue
+
+        recorded = False
         try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=topic,
-                config={
-                    "response_mime_type": "application/json",
-                    "system_instruction": system_instruction,
-                    "temperature": 0,  # respostas mais consistentes, menos criatividade
-                    "response_schema": ValidationResult,
-                },
+            # faixa "interactive": não espera atrás das gerações de guias
+            with llm.admission(model_name, "validate"):
+                start = perf_counter()
+                response = client.models.generate_content(
+                    model=model_name,
+                    contents=topic,
+                    config={
+                        "response_mime_type": "application/json",
+                        "system_instruction": system_instruction,
+                        "temperature": 0,  # respostas mais consistentes, menos criatividade
+                        "response_schema": TOPIC_VERDICT.response_schema,
+                    },
+                )
+            result: TopicVerdictSchema = TOPIC_VERDICT.validate_json(response.text)
+            llm.record_attempt(
+                model_name, "validate", start, usage=response.usage_metadata
             )
-            result: ValidationResult = response.parsed  # type: ignore
+            recorded = True
+            _store_verdict(verdict_key, result.model_dump())
 
             if result.is_valid is False:
                 raise ValidationError(message=result.motive)
 
             return result
+        except scheduler.Rejected as error:
+            rejected = error
+            continue
+
         except genai_errors.ServerError as error:
+            llm.record_attempt(model_name, "validate", start, error)
+            recorded = True
             if error.code == 503:
                 continue
 
         except genai_errors.ClientError as error:
+            llm.record_attempt(model_name, "validate", start, error)
+            recorded = True
             if error.code == 429:
                 continue
 
         except Exception as error:
             raise error
 
+        finally:
+            # a chamada não contou como sucesso nem falha (ex.: JSON inválido):
+            # o teste do half_open, se era este, fica livre para a próxima
+            if not recorded:
+                llm.breaker(model_name).release()
+
+    if rejected:
+        raise rejected
+
     raise ServiceError(
         "O modelo não consegiu gerar o conteúdo, a cota foi excedida ou seu acesso o modelo negado."
     )
 
 
+def _verdict_key(topic: str) -> str:
+    """Hash do tópico sem diferenças de maiúsculas e espaços, e da versão do prompt."""
+    normalized_topic = " ".join(topic.split()).casefold()
+    prompt_version = prompts.get("topic_validation.md").version
+
+    return sha256(f"{prompt_version}:{normalized_topic}".encode()).hexdigest()
+
+
+def _cached_verdict(verdict_key: str) -> dict | None:
+    """Busca o veredito no cache do worker e, se ausente, no Firestore."""
+    if verdict := _verdicts.get(verdict_key):
+        metrics.increment("topic_verdict_cache.hits")
+        return verdict
+
+    try:
+        verdict_snap = (
+            backend.db().collection(VERDICTS_COLLECTION).document(verdict_key).get()
+        )
+    except Exception:
+        traceback.print_exc()
+        verdict_snap = None
+
+    if verdict_snap is not None and verdict_snap.exists:
+        expires_at = verdict_snap.get("expires_at")
+        ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+
+        if ttl > 0:
+            verdict = {
+                "is_valid": verdict_snap.get("is_valid"),
+                "motive": verdict_snap.get("motive"),
+            }
+            _verdicts.set(verdict_key, verdict, ttl=ttl)
+            metrics.increment("topic_verdict_cache.store_hits")
+            return verdict
+
+    metrics.increment("topic_verdict_cache.misses")
+    return None
+
+
+def _store_verdict(verdict_key: str, verdict: dict) -> None:
+    ttl = VERDICT_VALID_SECONDS if verdict["is_valid"] else VERDICT_INVALID_SECONDS
+    if ttl <= 0:
+        return
+
+    _verdicts.set(verdict_key, verdict, ttl=ttl)
+
+    try:
+        now = datetime.now(timezone.utc)
+        backend.db().collection(VERDICTS_COLLECTION).document(verdict_key).set(
+            {
+                **verdict,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl),
+            }
+        )
+    except Exception:
+        # o cache do Firestore é só uma otimização: o veredito continua valendo
+        traceback.print_exc()
+
+
 def validate_focus_time(focus_time) -> None:
     if not isinstance(focus_time, int):
         raise ValidationError("O tempo de foco (minutos) deve ser um número inteiro.")
@@ -178,6 +272,31 @@ def format(user_input: dict) -> str:
     """
 
 
+# Entra na chave do cache de gerações: mude ao alterar o texto de format_chunk()
+CHUNK_FORMAT_VERSION = "1"
+
+
+def format_chunk(user_prompt: str, outline: list, first_day: int, last_day: int) -> str:
+    """Acrescenta ao prompt o esboço do guia e a faixa de dias a ser gerada.
+
+    Args:
+        user_prompt (str): prompt gerado por make().
+        outline (list[DayOutlineSchema]): título de cada dia do guia.
+        first_day (int): primeiro dia da faixa.
+        last_day (int): último dia da faixa.
+    """
+    outline_lines = "\n".join(f"        Dia {day.day}: {day.title}" for day in outline)
+
+    return f"""{user_prompt}
+    <OUTLINE>
+{outline_lines}
+    </OUTLINE>
+    <DAY_RANGE>
+        Gere somente os dias {first_day} a {last_day} do guia, seguindo o OUTLINE acima e numerando os dias de {first_day} a {last_day}.
+    </DAY_RANGE>
+    """
+
+
 def make(user_input: dict) -> str:
     """Realiza a orquestração entre os métodos process(), os métodos de validação e o format().
 
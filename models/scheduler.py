@@ -0,0 +1,222 @@
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from math import ceil
+from time import monotonic, perf_counter
+
+from dotenv import load_dotenv
+
+import metrics
+from errors import ServiceError
+
+load_dotenv()
+
+# Limites padrão de cada modelo, por worker
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "0"))  # 0 = sem limite
+# Vagas de cada modelo que só as validações (faixa "interactive") podem usar
+INTERACTIVE_RESERVED = int(os.getenv("LLM_INTERACTIVE_RESERVED", "2"))
+QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+# Limites por modelo: "modelo:concorrência:chamadas_por_minuto|..."
+MODEL_LIMITS = os.getenv("LLM_MODEL_LIMITS", "")
+
+# A cota do token bucket acumula no máximo BURST_SECONDS de chamadas
+BURST_SECONDS = 10
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Operações de `llm.record_attempt` e a faixa de prioridade de cada uma
+LANES = {"validate": INTERACTIVE, "generate": BATCH, "outline": BATCH}
+
+
+class Rejected(ServiceError):
+    """O modelo está saturado: a fila encheu ou a espera passou do limite."""
+
+    def __init__(self, model_name: str, retry_after: float):
+        super().__init__(
+            "Muitas chamadas ao modelo em andamento.",
+            "Tente novamente em alguns segundos.",
+            retry_after=retry_after,
+        )
+        self.model_name = model_name
+
+
+class ModelScheduler:
+    """Controle de admissão das chamadas a um modelo.
+
+    Limita as chamadas simultâneas e, com `rate_per_minute`, a vazão (token
+    bucket). As chamadas esperam em duas faixas: "interactive" (validações,
+    rápidas) passa na frente de "batch" (gerações, longas) e tem
+    `reserved` vagas que as gerações nunca ocupam. Com a fila cheia, ou após
+    `timeout` segundos de espera, a chamada é rejeitada com `Rejected`.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        concurrency: int,
+        rate_per_minute: float = 0,
+        reserved: int = 0,
+        queue_size: int = 32,
+        timeout: float = 10,
+    ):
+        self.model_name = model_name
+        self.concurrency = max(concurrency, 1)
+        self.reserved = min(max(reserved, 0), self.concurrency - 1)
+        self.rate = rate_per_minute / 60
+        self.capacity = max(self.rate * BURST_SECONDS, 1)
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = {INTERACTIVE: 0, BATCH: 0}
+        self._tokens = self.capacity
+        self._refilled_at = monotonic()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, lane: str) -> Iterator[None]:
+        """Segura uma vaga do modelo enquanto o bloco executa."""
+        start = perf_counter()
+
+        with self._cond:
+            if not self._can_start(lane):
+                if self.waiting[lane] >= self.queue_size:
+                    raise self._reject(lane)
+
+                self.waiting[lane] += 1
+                deadline = monotonic() + self.timeout
+                try:
+                    while not self._can_start(lane):
+                        remaining = deadline - monotonic()
+                        if remaining <= 0:
+                            raise self._reject(lane)
+
+                        self._cond.wait(min(remaining, self._token_wait() or remaining))
+                finally:
+                    self.waiting[lane] -= 1
+                    self._cond.notify_all()
+
+            self.running += 1
+            if self.rate:
+                self._tokens -= 1
+
+        metrics.observe(
+            f"llm.scheduler.{lane}.wait_ms", (perf_counter() - start) * 1000
+        )
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running -= 1
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            self._refill()
+            return {
+                "running": self.running,
+                "waiting": dict(self.waiting),
+                "concurrency": self.concurrency,
+                "tokens": round(self._tokens, 2) if self.rate else None,
+            }
+
+    def _can_start(self, lane: str) -> bool:
+        limit = self.concurrency
+        if lane == BATCH:
+            # as gerações não usam as vagas reservadas nem passam na frente
+            # de validações que já estão esperando
+            limit -= self.reserved
+            if self.waiting[INTERACTIVE]:
+                return False
+
+        if self.running >= limit:
+            return False
+
+        if self.rate:
+            self._refill()
+            return self._tokens >= 1
+
+        return True
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._refilled_at) * self.rate
+        )
+        self._refilled_at = now
+
+    def _token_wait(self) -> float | None:
+        """Segundos até o token bucket ter uma chamada disponível."""
+        if not self.rate or self._tokens >= 1:
+            return None
+
+        return (1 - self._tokens) / self.rate
+
+    def _reject(self, lane: str) -> Rejected:
+        metrics.increment(f"llm.scheduler.rejected.{self.model_name}.{lane}")
+
+        queued = sum(self.waiting.values()) + 1
+        if self.rate:
+            retry_after = queued / self.rate
+        else:
+            # aproxima pelo tempo médio de uma geração do modelo
+            latencies = metrics.histogram(f"llm.generate.{self.model_name}.latency_ms")
+            average_seconds = (
+                latencies.sum / latencies.count / 1000 if latencies.count else 5
+            )
+            retry_after = average_seconds * queued / self.concurrency
+
+        return Rejected(self.model_name, retry_after=max(ceil(retry_after), 1))
+
+
+def _parse_limits(model_limits: str) -> dict[str, tuple[int, float]]:
+    limits = {}
+    for entry in filter(None, model_limits.split("|")):
+        model_name, concurrency, rate_per_minute = entry.split(":")
+        limits[model_name] = (int(concurrency), float(rate_per_minute))
+
+    return limits
+
+
+_limits = _parse_limits(MODEL_LIMITS)
+_schedulers: dict[str, ModelScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def scheduler(model_name: str) -> ModelScheduler:
+    """Retorna o scheduler do modelo, compartilhado por todo o processo."""
+    with _schedulers_lock:
+        if model_name not in _schedulers:
+            concurrency, rate_per_minute = _limits.get(
+                model_name, (MAX_CONCURRENCY, RATE_PER_MINUTE)
+            )
+            _schedulers[model_name] = ModelScheduler(
+                model_name,
+                concurrency=concurrency,
+                rate_per_minute=rate_per_minute,
+                reserved=INTERACTIVE_RESERVED,
+                queue_size=QUEUE_SIZE,
+                timeout=QUEUE_TIMEOUT_SECONDS,
+            )
+
+        return _schedulers[model_name]
+
+
+def slot(model_name: str, operation: str):
+    """Segura uma vaga do modelo, na faixa de prioridade da operação.
+
+    Raises:
+        Rejected: se a fila do modelo estiver cheia ou a espera estourar.
+    """
+    return scheduler(model_name).slot(LANES.get(operation, BATCH))
+
+
+def schedulers() -> dict[str, dict]:
+    """Estado atual dos schedulers de todos os modelos já chamados."""
+    with _schedulers_lock:
+        registry = dict(_schedulers)
+
+    return {name: model.snapshot() for name, model in registry.items()}
@@ -1,9 +1,35 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+from time import time
+from dotenv import load_dotenv
+import firebase_admin
 from firebase_admin import auth, exceptions
+from google.api_core.exceptions import GoogleAPICallError
+from google.auth import jwt
 
+from cache import TTLCache
 from errors import UnauthorizedError, ValidationError, ServiceError
+from models import backend, certificates
+from singleflight import SingleFlight
+
+load_dotenv()
 
 DURATION_IN_SECONDS = 14 * 24 * 60 * 60  # 14 dias
+ISSUER_PREFIX = "https://session.firebase.google.com/"
+
+# Intervalo máximo (em segundos) em que um cookie já verificado é aceito sem
+# consultar o Firebase novamente para checar se a sessão foi revogada.
+REVOCATION_CHECK_SECONDS = int(os.getenv("SESSION_REVOCATION_CHECK_SECONDS", "300"))
+CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+
+# Cookies encerrados por `DELETE /sessions` (ID: SHA-256 do cookie), até expirarem
+REVOKED_COLLECTION = "revoked_sessions"
+
+_verified_cookies = TTLCache(maxsize=CACHE_SIZE, ttl=REVOCATION_CHECK_SECONDS)
+
+# Requisições simultâneas do mesmo usuário compartilham a consulta de revogação
+_revocation_checks = SingleFlight("session.revocation_checks")
 
 
 def create(
@@ -31,7 +57,7 @@ def create(
         raise ValidationError("Duração da sessão é tem que ser menor que 14 dias.")
 
     try:
-        return auth.create_session_cookie(id_token=token, expires_in=duration)
+        return backend.auth().create_session_cookie(id_token=token, expires_in=duration)
     except (
         auth.InvalidIdTokenError,
         auth.ExpiredIdTokenError,
@@ -55,6 +81,9 @@ def verify_cookie(
 ) -> dict:
     """Verifica se o cookie de sessão é válido.
 
+    Cookies já verificados ficam em cache por até REVOCATION_CHECK_SECONDS (ou
+    até expirarem), evitando uma ida ao Firebase a cada requisição protegida.
+
     Args:
         cookie (str): o cookie de sessão que se quer verificar.
 
@@ -71,21 +100,141 @@ def verify_cookie(
             "Ocorreu um erro ao validar o cookie: o cookie não pode ser vázio."
         )
 
+    cookie_hash = _hash(cookie)
+    if claims := _verified_cookies.get(cookie_hash):
+        return claims
+
     try:
-        return auth.verify_session_cookie(cookie, check_revoked=True)
-    except (auth.ExpiredSessionCookieError, auth.RevokedSessionCookieError) as error:
+        claims = _decode(cookie)
+
+        if _revoked_session(cookie_hash).get().exists:
+            raise UnauthorizedError(
+                "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada."
+            )
+
+        user = _revocation_checks.do(
+            claims["uid"], backend.auth().get_user, claims["uid"]
+        )
+        if user.disabled or claims["iat"] * 1000 < user.tokens_valid_after_timestamp:
+            raise UnauthorizedError(
+                "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada."
+            )
+    except auth.UserNotFoundError as error:
         raise UnauthorizedError(
             "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada."
         ) from error
-    except auth.InvalidSessionCookieError as error:
+    except (exceptions.FirebaseError, GoogleAPICallError) as error:
+        raise ServiceError(
+            "Ocorreu um erro de comunicação com o serviço de verificação."
+        ) from error
+
+    # a entrada nunca sobrevive ao próprio cookie
+    ttl = min(REVOCATION_CHECK_SECONDS, claims.get("exp", 0) - time())
+    _verified_cookies.set(cookie_hash, claims, ttl=ttl)
+
+    return claims
+
+
+def revoke(cookie: str) -> None:
+    """Encerra a sessão do cookie (logout).
+
+    O cookie sai do cache deste worker e é registrado em `revoked_sessions`
+    até expirar. Os demais workers deixam de aceitá-lo na próxima checagem de
+    revogação (em até REVOCATION_CHECK_SECONDS).
+
+    Args:
+        cookie (str): o cookie de sessão que não deve mais ser aceito.
+
+    Raises:
+        ServiceError: se não for possível registrar a revogação.
+    """
+    if not cookie:
+        return
+
+    cookie_hash = _hash(cookie)
+    _verified_cookies.pop(cookie_hash)
+
+    try:
+        claims = _decode(cookie)
+    except UnauthorizedError:
+        return  # cookie expirado ou inválido: não há o que revogar
+
+    try:
+        _revoked_session(cookie_hash).set(
+            {
+                "uid": claims["uid"],
+                # um TTL do Firestore nesse campo limpa as revogações vencidas
+                "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc),
+            }
+        )
+    except GoogleAPICallError as error:
+        raise ServiceError(
+            "Não foi possível encerrar a sessão.", "Tente novamente mais tarde."
+        ) from error
+
+
+def _revoked_session(cookie_hash: str):
+    return backend.db().collection(REVOKED_COLLECTION).document(cookie_hash)
+
+
+def _decode(cookie: str) -> dict:
+    """Verifica localmente assinatura, validade, audiência e emissor do cookie.
+
+    Usa os certificados mantidos em memória por `models.certificates`, então
+    nenhuma verificação espera o download dos certificados do Google.
+
+    Raises:
+        UnauthorizedError: se o cookie estiver expirado ou não for válido.
+        ServiceError: se os certificados de sessão estiverem indisponíveis.
+    """
+    if backend.IN_MEMORY:
+        return _decode_in_memory(cookie)
+
+    project_id = firebase_admin.get_app().project_id
+
+    try:
+        certs = certificates.store.get()
+
+        if jwt.decode_header(cookie).get("kid") not in certs:
+            # o Google pode ter rotacionado as chaves antes da renovação agendada
+            certificates.store.refresh(min_interval=60)
+            certs = certificates.store.get()
+
+        claims = jwt.decode(cookie, certs=certs, audience=project_id)
+    except ValueError as error:
+        if "Token expired" in str(error):
+            raise UnauthorizedError(
+                "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada."
+            ) from error
+
         raise UnauthorizedError(
             "Ocorreu um erro ao validar o cookie de sessão. O cookie não é um cookie de sessão do Firebase válido."
         ) from error
-    except auth.CertificateFetchError as error:
-        raise ServiceError(
-            "Ocorreu um erro ao verificar o cookie: serviço de autenticação indisponível."
+
+    if claims.get("iss") != ISSUER_PREFIX + project_id or not claims.get("sub"):
+        raise UnauthorizedError(
+            "Ocorreu um erro ao validar o cookie de sessão. O cookie não é um cookie de sessão do Firebase válido."
+        )
+
+    claims["uid"] = claims["sub"]
+
+    return claims
+
+
+def _decode_in_memory(cookie: str) -> dict:
+    """Cookies do backend em memória são opacos e verificados pelo próprio backend."""
+    try:
+        return backend.auth().verify_session_cookie(cookie)
+    except auth.ExpiredSessionCookieError as error:
+        raise UnauthorizedError(
+            "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada."
         ) from error
-    except Exception as error:
-        raise ServiceError(
-            "Ocorreu um erro de comunicação com o serviço de verificação."
+    except auth.InvalidSessionCookieError as error:
+        raise UnauthorizedError(
+            "Ocorreu um erro ao validar o cookie de sessão. O cookie não é um cookie de sessão do Firebase válido."
         ) from error
+
+
+def _hash(cookie: str) -> str:
+    """O cookie nunca é usado diretamente como chave para não mantê-lo em memória."""
+    return hashlib.sha256(cookie.encode("utf-8")).hexdigest()
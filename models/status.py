@@ -1,9 +1,9 @@
-from firebase_admin import firestore
+from models import backend
 
 
 def check() -> str | None:
     try:
-        db = firestore.client()
+        db = backend.db()
         doc_ref = db.collection("_internal_status").document("health_check")
         doc_ref.get()
 
@@ -1,14 +1,32 @@
+import os
 from typing import cast
 import traceback
-from firebase_admin import auth, exceptions, firestore
+from dotenv import load_dotenv
+from firebase_admin import auth, exceptions
 from firebase_admin.auth import UserRecord
+from google.api_core.exceptions import AlreadyExists
 from google.cloud.firestore_v1.base_query import FieldFilter
+import metrics
+from cache import TTLCache
 from errors import ConflictError, NotFoundError, ServiceError, ValidationError
+from models import backend
+
+load_dotenv()
+
+PROFILE_CACHE_SECONDS = int(os.getenv("USER_PROFILE_CACHE_SECONDS", "600"))
+PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "1024"))
+# Consulta `users` por `username` quando o nome não tem reserva em `usernames`.
+# Desligue (USERNAME_LEGACY_LOOKUP=0) depois de rodar `scripts/backfill_usernames.py`.
+LEGACY_LOOKUP = os.getenv("USERNAME_LEGACY_LOOKUP", "1") == "1"
+
+_profiles = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_SECONDS)
 
 
 def find_by_username(username: str):
     """Busca os dados de um usuário no banco de dados.
 
+    Os perfis encontrados ficam em cache neste worker por PROFILE_CACHE_SECONDS.
+
     Args:
         username (str): o nome do usuário que se quer os dados.
 
@@ -21,30 +39,126 @@ def find_by_username(username: str):
 
     validate_username(username)
 
-    db = firestore.client()
+    if profile := _profiles.get(username):
+        metrics.increment("user.profile_cache.hits")
+        return dict(profile)
+
+    metrics.increment("user.profile_cache.misses")
+
+    db = backend.db()
+    reservation = db.collection("usernames").document(_reservation_id(username)).get()
+
+    if reservation.exists:
+        user = db.collection("users").document(reservation.get("uid")).get()
+    else:
+        user = _find_legacy(username)
+
+    if user and user.exists:
+        profile = _to_profile(user)
+        _profiles.set(username, profile)
+
+        return dict(profile)
+    else:
+        raise NotFoundError(
+            "O usuário não foi encontrado.",
+            "Verifique se o nome foi digitado corretamente e tente de novo.",
+        )
+
+
+def _find_legacy(username: str):
+    """Usuários criados antes do índice `usernames` só são encontrados por consulta."""
+    if not LEGACY_LOOKUP:
+        return None
 
+    metrics.increment("user.legacy_lookups")
     results = (
-        db.collection("users")
+        backend.db()
+        .collection("users")
         .where(filter=FieldFilter("username", "==", username))
         .limit(1)
         .get()
     )
 
-    if results and results[0].exists:
-        user = results[0]
+    return results[0] if results else None
 
-        return {
-            "username": user.get("username"),
-            "uid": user.get("uid"),
-            "email": user.get("email"),
-            "created_at": user.get("created_at"),
-        }
-    else:
+
+def backfill_reservations() -> dict[str, int]:
+    """Grava a reserva em `usernames` dos usuários criados antes do índice.
+
+    Pode ser rodada mais de uma vez: reservas existentes são mantidas.
+
+    Returns:
+        dict[str, int]: quantas reservas foram criadas (`created`), quantas já
+            existiam (`existing`) e quantos nomes estão reservados para outro
+            usuário (`conflicts`).
+    """
+    db = backend.db()
+    counts = {"created": 0, "existing": 0, "conflicts": 0}
+
+    for profile in db.collection("users").select(["username"]).stream():
+        username = profile.get("username")
+        reservation_ref = db.collection("usernames").document(_reservation_id(username))
+
+        try:
+            reservation_ref.create({"uid": profile.id})
+            counts["created"] += 1
+        except AlreadyExists:
+            if reservation_ref.get().get("uid") == profile.id:
+                counts["existing"] += 1
+            else:
+                print(f"⚠️ O nome {username!r} já está reservado para outro usuário.")
+                counts["conflicts"] += 1
+
+    return counts
+
+
+def _reservation_id(username: str) -> str:
+    """ID do documento de reserva do nome em `usernames`.
+
+    O Firestore não aceita '/' em IDs nem IDs que comecem com '__', e nomes de
+    usuários antigos podem ter os dois. '%', '/' e o '_' inicial são trocados
+    pelo código percentual, de forma que nomes diferentes nunca colidem.
+    """
+    escaped = username.replace("%", "%25").replace("/", "%2F")
+
+    if escaped.startswith("_"):
+        escaped = "%5F" + escaped[1:]
+
+    return escaped
+
+
+def find_by_uid(uid: str):
+    """Busca os dados de um usuário pelo seu UID (ID do documento em `users`).
+
+    Args:
+        uid (str): o UID do usuário no Firebase Auth.
+
+    Returns:
+        dict[str, str]: os dados do usuário consultado.
+
+    Raises:
+        NotFoundError: se o usuário procurado não for encontrado.
+    """
+    db = backend.db()
+    user = db.collection("users").document(uid).get()
+
+    if not user.exists:
         raise NotFoundError(
             "O usuário não foi encontrado.",
             "Verifique se o nome foi digitado corretamente e tente de novo.",
         )
 
+    return _to_profile(user)
+
+
+def _to_profile(user) -> dict[str, str]:
+    return {
+        "username": user.get("username"),
+        "uid": user.get("uid"),
+        "email": user.get("email"),
+        "created_at": user.get("created_at"),
+    }
+
 
 def find_by_email(username: str):
     """Busca os dados de um usuário no banco de dados.
@@ -106,24 +220,33 @@ def create(*, username: str, email: str, password: str) -> dict[str, str]:
                 action="Verifique o e-mail e tente novamente.",
             )
 
+    def validate_characters(username: str) -> None:
+        # só vale para nomes novos: usuários antigos podem ter esses caracteres
+        if "/" in username or username.startswith("__"):
+            raise ValidationError(
+                "O nome de usuário inserido não é válido.",
+                "O nome de usuário não pode conter '/' nem começar com '__'.",
+            )
+
     validate_username(username)
+    validate_characters(username)
     validate_password(password)
     validate_email(email)
 
     try:
-        db = firestore.client()
+        db = backend.db()
 
-        if (
-            db.collection("users")
-            .where(filter=FieldFilter("username", "==", username))
-            .get()
-        ):
+        reservation_ref = db.collection("usernames").document(_reservation_id(username))
+
+        # evita criar a conta no Auth quando o nome já está reservado (ou
+        # pertence a um usuário criado antes do índice `usernames`)
+        if reservation_ref.get().exists or _find_legacy(username):
             raise ConflictError(
                 "O nome de usuário fornecido já está sendo utilizado.",
                 "Insira outro nome de usuário e tente novamente.",
             )
 
-        created_user: UserRecord = auth.create_user(
+        created_user: UserRecord = backend.auth().create_user(
             email=email,
             password=password,
             display_name=username,
@@ -136,7 +259,27 @@ def create(*, username: str, email: str, password: str) -> dict[str, str]:
             "created_at": str(created_user.user_metadata.creation_timestamp),
         }
 
-        db.collection("users").document().set(created_user_data)
+        # reserva do nome e perfil são gravados juntos; `create` falha se o
+        # nome foi reservado por outra requisição depois da verificação acima
+        batch = db.batch()
+        batch.create(reservation_ref, {"uid": created_user.uid})
+        batch.set(db.collection("users").document(created_user.uid), created_user_data)
+
+        try:
+            batch.commit()
+        except AlreadyExists as error:
+            _delete_auth_user(created_user.uid)
+            raise ConflictError(
+                "O nome de usuário fornecido já está sendo utilizado.",
+                "Insira outro nome de usuário e tente novamente.",
+            ) from error
+        except Exception as error:
+            # sem o perfil, a conta no Auth ficaria órfã e com o e-mail preso
+            traceback.print_exc()
+            _delete_auth_user(created_user.uid)
+            raise ServiceError("Não foi possível criar o usuário.") from error
+
+        _profiles.pop(username)
     except auth.EmailAlreadyExistsError as error:
         raise ConflictError(
             "O e-mail fornecido já está sendo utilizado.",
@@ -151,3 +294,12 @@ def create(*, username: str, email: str, password: str) -> dict[str, str]:
         raise ServiceError("Não foi possível criar o usuário.") from error
 
     return created_user_data
+
+
+def _delete_auth_user(uid: str) -> None:
+    """Desfaz a criação da conta no Auth quando o perfil não pôde ser gravado."""
+    try:
+        backend.auth().delete_user(uid)
+    except Exception:
+        traceback.print_exc()
+        metrics.increment("user.orphaned_auth_users")
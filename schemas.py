@@ -1,6 +1,9 @@
 # Schemas used for LLM Output Formats
 
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Any
+
+from google.genai import types
+from pydantic import BaseModel, Field, ConfigDict, StrictBool, TypeAdapter
 
 
 class DailyStudySchema(BaseModel):
@@ -54,3 +57,93 @@ class DailyStudySchema(BaseModel):
         },
     )
     completed: bool = False
+
+
+class DayOutlineSchema(BaseModel):
+    """
+    Represents one day of the guide outline used to
+    generate long guides in parallel day ranges.
+    """
+
+    day: int = Field(..., description="O número do dia no plano de estudos.")
+    title: str = Field(..., description="O título ou tema principal do dia.")
+
+
+class TopicVerdictSchema(BaseModel):
+    """
+    Represents the relevance verdict of a study topic.
+    """
+
+    is_valid: bool = Field(
+        description="O veredito final: true se todas as verificações passarem, senão false."
+    )
+
+    motive: str = Field(
+        description="Uma justificativa clara caso a entrada seja inválida. Se for válida, retorna 'N/A'."
+    )
+
+
+class DayProgressSchema(BaseModel):
+    """
+    Represents a completion change of one day of a guide.
+    """
+
+    day: int = Field(..., ge=1, description="O número do dia no plano de estudos.")
+    completed: StrictBool
+
+
+class CompiledSchema:
+    """
+    Validator and Gemini `response_schema` of a type, built once at import.
+
+    Passing a pydantic type as `response_schema` makes the SDK convert it to a
+    `types.Schema` (and, for `list[...]`, create a placeholder model twice) on
+    every call. The prebuilt `types.Schema` skips that work and the response
+    is validated by the prebuilt `TypeAdapter`.
+    """
+
+    def __init__(self, schema_type: Any):
+        self.adapter = TypeAdapter(schema_type)
+        self.response_schema = to_response_schema(self.adapter.json_schema())
+
+    def validate_json(self, text: str | bytes) -> Any:
+        return self.adapter.validate_json(text)
+
+    def validate_python(self, data: Any) -> Any:
+        return self.adapter.validate_python(data)
+
+
+def to_response_schema(json_schema: dict) -> types.Schema:
+    """
+    Converts a pydantic JSON schema to a Gemini `types.Schema`.
+
+    Same result as the SDK's own conversion, using only the public
+    `types.Schema`: `$ref`s are inlined (Gemini doesn't resolve `$defs`) and
+    `property_ordering` keeps the declared field order in the response.
+    """
+    definitions = json_schema.get("$defs", {})
+
+    def inline(node: Any) -> Any:
+        if isinstance(node, list):
+            return [inline(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+
+        if "$ref" in node:
+            definition = definitions[node["$ref"].removeprefix("#/$defs/")]
+            node = {**definition, **{k: v for k, v in node.items() if k != "$ref"}}
+
+        node = {key: inline(value) for key, value in node.items() if key != "$defs"}
+        if "properties" in node:
+            node["propertyOrdering"] = list(node["properties"])
+
+        return node
+
+    return types.Schema.model_validate(inline(json_schema))
+
+
+# Registry: every schema used in LLM calls and request validation
+DAILY_STUDIES = CompiledSchema(list[DailyStudySchema])
+DAY_OUTLINES = CompiledSchema(list[DayOutlineSchema])
+TOPIC_VERDICT = CompiledSchema(TopicVerdictSchema)
+DAYS_PROGRESS = CompiledSchema(list[DayProgressSchema])
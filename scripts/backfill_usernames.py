@@ -0,0 +1,28 @@
+"""Cria as reservas em `usernames` dos usuários anteriores ao índice.
+
+Depois de rodar, a consulta de nomes sem reserva em `users` pode ser
+desligada com USERNAME_LEGACY_LOOKUP=0.
+
+Uso (na raiz do projeto):
+    python -m scripts.backfill_usernames
+"""
+
+import firebase_admin
+
+from models import backend, user
+
+
+def main() -> None:
+    if not backend.IN_MEMORY:
+        firebase_admin.initialize_app()
+
+    counts = user.backfill_reservations()
+
+    print(
+        f"✔ {counts['created']} reservas criadas, {counts['existing']} já existiam, "
+        f"{counts['conflicts']} nomes reservados para outro usuário."
+    )
+
+
+if __name__ == "__main__":
+    main()
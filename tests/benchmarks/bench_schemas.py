@@ -0,0 +1,95 @@
+"""Micro-benchmark do registro de schemas (`schemas.py`).
+
+Compara, por chamada, o custo de montar os validadores e o `response_schema`
+a cada requisição (como era feito antes) com o dos objetos pré-montados.
+A serialização do `types.Schema` pronto pelo SDK, igual nos dois casos, fica
+de fora.
+
+Uso (na raiz do projeto):
+    python -m tests.benchmarks.bench_schemas
+"""
+
+import json
+from timeit import repeat
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from schemas import DAILY_STUDIES, TOPIC_VERDICT, DailyStudySchema, to_response_schema
+
+NUMBER = 200
+
+STUDIES = [
+    {
+        "day": day,
+        "title": f"Dia {day}",
+        "Meta do Dia": "Meta",
+        "O Quê Pesquisar (Teoria)": ["Pesquisa 1", "Pesquisa 2"],
+        "Mão na Massa (Prática)": "Prática",
+        "Verificação de Aprendizado": "Verificação",
+        "completed": day % 2 == 0,
+    }
+    for day in range(1, 31)
+]
+STUDIES_JSON = json.dumps(STUDIES)
+VERDICT_JSON = json.dumps({"is_valid": True, "motive": "N/A"})
+
+
+def per_request_verdict():
+    # classes definidas dentro de `validate_relevance`, como antes
+    class ValidationResult(BaseModel):
+        is_valid: bool = Field(description="O veredito final.")
+        motive: str = Field(description="A justificativa.")
+
+    # conversão que o SDK fazia a cada chamada
+    to_response_schema(ValidationResult.model_json_schema())
+    return ValidationResult.model_validate_json(VERDICT_JSON)
+
+
+def prebuilt_verdict():
+    return TOPIC_VERDICT.validate_json(VERDICT_JSON)
+
+
+def per_request_update_studies():
+    return TypeAdapter(list[DailyStudySchema]).validate_python(STUDIES)
+
+
+def prebuilt_update_studies():
+    return DAILY_STUDIES.validate_python(STUDIES)
+
+
+def per_request_generation():
+    # o SDK converte `list[...]` e monta um modelo "Placeholder" para o parse
+    to_response_schema(TypeAdapter(list[DailyStudySchema]).json_schema())
+
+    class Placeholder(BaseModel):
+        placeholder: list[DailyStudySchema]
+
+    return Placeholder.model_validate(
+        {"placeholder": json.loads(STUDIES_JSON)}
+    ).placeholder
+
+
+def prebuilt_generation():
+    return DAILY_STUDIES.validate_json(STUDIES_JSON)
+
+
+def _microseconds(fn) -> float:
+    return min(repeat(fn, number=NUMBER, repeat=5)) / NUMBER * 1_000_000
+
+
+def main():
+    cases = [
+        ("validate_relevance", per_request_verdict, prebuilt_verdict),
+        ("update_studies", per_request_update_studies, prebuilt_update_studies),
+        ("generate (30 dias)", per_request_generation, prebuilt_generation),
+    ]
+
+    print(f"{'caso':<22}{'por requisição':>16}{'pré-montado':>14}{'ganho':>9}")
+    for name, per_request, prebuilt in cases:
+        before = _microseconds(per_request)
+        after = _microseconds(prebuilt)
+        print(f"{name:<22}{before:>13.1f} µs{after:>11.1f} µs{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
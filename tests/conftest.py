@@ -2,39 +2,39 @@ from time import sleep
 from dotenv import load_dotenv
 import pytest
 from firebase_admin.auth import ListUsersPage
-from firebase_admin import auth as fireauth
-from firebase_admin import firestore
 
 import requests
 
 from tests import orchestrator
 from main import app as flask_app
+from models import backend
 
 load_dotenv()
 
 ACCOUNTS_BATCH_SIZE = 100  # máximo permitido pelo Firebase
 GUIDES_BATCH_SIZE = 100
-DELAY_SECONDS = 0.5  # espera entre lotes para evitar rate limit
+# espera entre lotes para evitar rate limit (desnecessária com BACKEND=memory)
+DELAY_SECONDS = 0 if backend.IN_MEMORY else 0.5
 
 
 @pytest.fixture(scope="session", autouse=True)
 def clear_firebase_auth():
     print("🧹 Limpando usuários do Firebase Auth...")
 
-    users: ListUsersPage = fireauth.list_users()
+    users: ListUsersPage = backend.auth().list_users()
     batch = []
 
     for user_account in users.iterate_all():
         batch.append(user_account.uid)
 
         if len(batch) == ACCOUNTS_BATCH_SIZE:
-            fireauth.delete_users(batch)
+            backend.auth().delete_users(batch)
             print(f"  - Removidos {len(batch)} usuários.")
             batch.clear()
             sleep(DELAY_SECONDS)
 
     if batch:
-        fireauth.delete_users(batch)
+        backend.auth().delete_users(batch)
         print(f"  - Removidos {len(batch)} usuários (último lote).")
 
     print("✅ Limpeza concluída.")
@@ -53,10 +53,13 @@ def clear_users_guides_collection():
 def clear_users_collection():
     print("🧹 Limpando a coleção 'users' do Firestore...")
 
-    db = firestore.client()
+    db = backend.db()
     users_collection_ref = db.collection("users")
     batch = []
 
+    for username_ref in db.collection("usernames").list_documents():
+        username_ref.delete()
+
     for user_ref in users_collection_ref.list_documents():
         batch.append(user_ref.id)
         user_ref.delete()
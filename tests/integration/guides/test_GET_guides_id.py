@@ -15,6 +15,7 @@ def test_with_valid_id(auth_client):
         "data": {
             "title": new_guide["title"],
             "model": new_guide["model"],
+            "prompt_version": new_guide["prompt_version"],
             "is_public": False,
             "owner": response_body["data"]["owner"],
             "status": "studying",
@@ -23,6 +24,12 @@ def test_with_valid_id(auth_client):
                 "created_at"
             ],  # ? Seria melhor usar `new_guide["created_at"]` ?
             "generation_time_seconds": new_guide["generation_time_seconds"],
+            # o tempo do save não é persistido no documento
+            "generation": {
+                key: value
+                for key, value in new_guide["generation"].items()
+                if key != "save_ms"
+            },
             "inputs": {
                 "topic": new_guide["inputs"]["topic"],
                 "knowledge": new_guide["inputs"]["knowledge"],
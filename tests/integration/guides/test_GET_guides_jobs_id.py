@@ -0,0 +1,268 @@
+from time import monotonic, sleep
+
+import pytest
+from google.api_core.exceptions import DeadlineExceeded, ServiceUnavailable
+
+import metrics
+from models import backend, guide, job
+from schemas import DailyStudySchema
+from tests import orchestrator
+
+
+def wait_for_job(auth_client, job_id: str, timeout_seconds: int = 30) -> dict:
+    for _ in range(timeout_seconds * 10):
+        response_body = auth_client.get(f"/api/v1/guides/jobs/{job_id}").get_json()
+
+        if response_body["data"]["status"] in ("done", "failed"):
+            return response_body
+
+        sleep(0.1)
+
+    raise TimeoutError(f"O job {job_id} não terminou.")
+
+
+def fake_studies(days: int) -> list[DailyStudySchema]:
+    return [
+        DailyStudySchema(
+            day=day,
+            title=f"Dia {day}",
+            goal="Meta",
+            theoretical_research=["Pesquisa"],
+            practical_activity="Prática",
+            learning_verification="Verificação",
+        )
+        for day in range(1, days + 1)
+    ]
+
+
+def async_guide(title: str) -> dict:
+    return {
+        "title": title,
+        "topic": "Eu quero entender como funciona o escalonamento de processos.",
+        "knowledge": "zero",
+        "focus_time": 30,
+        "days": 3,
+        "model": "gemini-2.5-flash-lite",
+        "use_cache": False,
+    }
+
+
+@pytest.mark.vcr
+def test_with_async_generation(auth_client, new_user):
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json={
+            "title": "Async Guide",
+            "topic": "Eu quero entender o que são os workers que eu tenho que configurar, por exemplo, no gunicorn.",
+            "knowledge": "zero",
+            "focus_time": 60,
+            "days": 3,
+        },
+    )
+
+    assert response.status_code == 202
+
+    response_body = response.get_json()
+    job_id = response_body["data"]["id"]
+
+    assert response_body == {
+        "message": "Geração do guia agendada.",
+        "data": {"id": job_id, "status": "queued"},
+    }
+    assert response.headers["Location"] == f"/api/v1/guides/jobs/{job_id}"
+
+    job_body = wait_for_job(auth_client, job_id)
+
+    assert job_body["message"] == "Job de geração recuperado com sucesso."
+    assert job_body["data"]["status"] == "done"
+    assert job_body["data"]["error"] is None
+    assert job_body["data"]["guide"]["title"] == "Async Guide"
+    assert job_body["data"]["guide"]["owner"] == new_user["username"]
+
+    saved_guide = auth_client.get(f"/api/v1/guides/{job_body['data']['guide']['id']}")
+    assert saved_guide.status_code == 200
+
+
+def test_with_invalid_input(auth_client):
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json={
+            "title": "",
+            "topic": "Eu quero estudar sobre neurociência.",
+            "knowledge": "zero",
+            "focus_time": 60,
+            "days": 3,
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "name": "ValidationError",
+        "message": "O título não pode ser vazio.",
+        "action": "Preencha o título do guia e tente novamente.",
+        "code": 400,
+    }
+
+
+def test_with_nonexistent_job(auth_client):
+    response = auth_client.get("/api/v1/guides/jobs/3vT2Ot6aVi9glNMcIzW1")
+
+    assert response.status_code == 404
+    assert response.get_json() == {
+        "name": "NotFoundError",
+        "message": "O job não foi encontrado.",
+        "action": "Verifique o ID e tente novamente.",
+        "code": 404,
+    }
+
+
+def test_with_someone_else_job(auth_client):
+    job_id = orchestrator.create_job()  # Random owner
+
+    response = auth_client.get(f"/api/v1/guides/jobs/{job_id}")
+
+    assert response.status_code == 403
+    assert response.get_json() == {
+        "name": "ForbiddenError",
+        "message": "Você não tem permissão para acessar esse job.",
+        "action": "Verifique se o job é de sua autoria e tente novamente.",
+        "code": 403,
+    }
+
+
+def test_with_generation_longer_than_lease(auth_client, new_user, monkeypatch):
+    monkeypatch.setattr(job, "LEASE_SECONDS", 0.3)
+    recovered = metrics.counter("guide_jobs.recovered")
+
+    def slow_generation(user_prompt, model, temperature):
+        sleep(1.2)  # bem mais que o lease
+        return fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", slow_generation)
+
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json=async_guide("Slow Async Guide"),
+    )
+    job_id = response.get_json()["data"]["id"]
+
+    # as consultas durante a geração não reagendam o job: o lease é renovado
+    job_body = wait_for_job(auth_client, job_id)
+
+    assert job_body["data"]["status"] == "done"
+    assert metrics.counter("guide_jobs.recovered") == recovered
+
+    titles = [
+        saved["title"]
+        for saved in guide.find_all_by_username(new_user["username"])["guides"]
+    ]
+    assert titles.count("Slow Async Guide") == 1
+
+
+def test_with_job_taken_over(auth_client, new_user, monkeypatch):
+    superseded = metrics.counter("guide_jobs.superseded")
+
+    def generation_taken_over(user_prompt, model, temperature):
+        # outro worker assume o job enquanto este ainda está gerando
+        for job_snap in (
+            backend.db()
+            .collection("guide_jobs")
+            .where("owner", "==", new_user["username"])
+            .get()
+        ):
+            if job_snap.get("params.title") == "Taken Over Guide":
+                job_snap.reference.update({"status": "running"})
+
+        return fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation_taken_over)
+
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json=async_guide("Taken Over Guide"),
+    )
+    job_id = response.get_json()["data"]["id"]
+
+    deadline = monotonic() + 10
+    while metrics.counter("guide_jobs.superseded") == superseded:
+        assert monotonic() < deadline, "o job não foi descartado"
+        sleep(0.05)
+
+    # o resultado deste worker é descartado: o job segue com quem o assumiu
+    job_body = auth_client.get(f"/api/v1/guides/jobs/{job_id}").get_json()
+    assert job_body["data"]["status"] == "running"
+
+    titles = [
+        saved["title"]
+        for saved in guide.find_all_by_username(new_user["username"])["guides"]
+    ]
+    assert "Taken Over Guide" not in titles
+
+
+def test_with_failed_result_write(auth_client, new_user, monkeypatch):
+    failures = metrics.counter("guide_jobs.finish_failures")
+    write = job._Lease._write
+
+    def unavailable_on_done(self, fields):
+        if fields.get("status") == "done":
+            raise ServiceUnavailable("Firestore indisponível.")
+
+        return write(self, fields)
+
+    monkeypatch.setattr(job._Lease, "_write", unavailable_on_done)
+    monkeypatch.setattr(
+        guide, "generate_with_model", lambda *args, **kwargs: fake_studies(3)
+    )
+
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json=async_guide("Unwritten Async Guide"),
+    )
+    job_id = response.get_json()["data"]["id"]
+
+    deadline = monotonic() + 10
+    while metrics.counter("guide_jobs.finish_failures") == failures:
+        assert monotonic() < deadline, "a falha da escrita não foi registrada"
+        sleep(0.05)
+
+    # o job continua "running" e será refeito: o guia desta execução é descartado
+    job_body = auth_client.get(f"/api/v1/guides/jobs/{job_id}").get_json()
+    assert job_body["data"]["status"] == "running"
+
+    titles = [
+        saved["title"]
+        for saved in guide.find_all_by_username(new_user["username"])["guides"]
+    ]
+    assert "Unwritten Async Guide" not in titles
+
+
+def test_with_result_written_despite_error(auth_client, new_user, monkeypatch):
+    write = job._Lease._write
+
+    def write_then_deadline(self, fields):
+        write(self, fields)
+        if fields.get("status") == "done" and not hasattr(self, "timed_out"):
+            # a escrita foi aplicada, mas a resposta não chegou
+            self.timed_out = True
+            raise DeadlineExceeded("Prazo excedido.")
+
+    monkeypatch.setattr(job._Lease, "_write", write_then_deadline)
+    monkeypatch.setattr(
+        guide, "generate_with_model", lambda *args, **kwargs: fake_studies(3)
+    )
+
+    response = auth_client.post(
+        "/api/v1/guides",
+        headers={"Prefer": "respond-async"},
+        json=async_guide("Ambiguous Async Guide"),
+    )
+    job_body = wait_for_job(auth_client, response.get_json()["data"]["id"])
+
+    assert job_body["data"]["status"] == "done"
+    assert job_body["data"]["guide"]["title"] == "Ambiguous Async Guide"
+    assert job_body["data"]["guide"]["status"] == "studying"
@@ -1,4 +1,6 @@
 import pytest
+
+from models import guide
 from tests import orchestrator
 
 
@@ -25,11 +27,13 @@ def test_with_direct_access(auth_client, new_user):
                 "title": new_guide["title"],
                 "topic": new_guide["inputs"]["topic"],
                 "days": new_guide["inputs"]["days"],
-                "daily_studies": new_guide["daily_study"],
+                "completed_days": 0,
+                "total_days": len(new_guide["daily_study"]),
                 "created_at": response_body["data"][0]["created_at"],
                 "status": "studying",
             }
         ],
+        "pagination": {"next": None},
     }
 
 
@@ -46,6 +50,7 @@ def test_with_deleted_guides(auth_client, new_user):
     assert response_body == {
         "message": "Guias recuperados com sucesso.",
         "data": [],
+        "pagination": {"next": None},
     }
 
 
@@ -61,4 +66,74 @@ def test_with_someone_else_guides(auth_client):
     assert response_body == {
         "message": "Guias recuperados com sucesso.",
         "data": [],
+        "pagination": {"next": None},
+    }
+
+
+@pytest.mark.vcr
+def test_with_pagination(auth_client, new_user):
+    first_guide = orchestrator.create_guide(owner=new_user["username"])
+    guide_info = {
+        key: value
+        for key, value in first_guide.items()
+        if key not in ("id", "status", "created_at")
+    }
+    second_guide = guide.save({**guide_info, "title": "Second Guide"})
+    third_guide = guide.save({**guide_info, "title": "Third Guide"})
+
+    auth_client.patch(
+        f"/api/v1/guides/{third_guide['id']}/days/1", json={"completed": True}
+    )
+
+    response = auth_client.get("/api/v1/my-guides?limit=2")
+    response_body = response.get_json()
+
+    assert response.status_code == 200
+    # dos mais novos para os mais antigos
+    assert [item["id"] for item in response_body["data"]] == [
+        third_guide["id"],
+        second_guide["id"],
+    ]
+    assert response_body["data"][0]["completed_days"] == 1
+    assert response_body["data"][0]["total_days"] == len(first_guide["daily_study"])
+    assert "daily_studies" not in response_body["data"][0]
+    assert response_body["pagination"] == {"next": second_guide["id"]}
+
+    response = auth_client.get(
+        f"/api/v1/my-guides?limit=2&after={response_body['pagination']['next']}"
+    )
+    response_body = response.get_json()
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response_body["data"]] == [first_guide["id"]]
+    assert response_body["pagination"] == {"next": None}
+
+
+def test_with_invalid_limit(auth_client):
+    response = auth_client.get("/api/v1/my-guides?limit=0")
+
+    assert response.status_code == 400
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ValidationError",
+        "message": "O 'limit' precisa ser um número entre 1 e 100.",
+        "action": "Verifique o parâmetro e tente novamente.",
+        "code": 400,
+    }
+
+
+def test_with_invalid_cursor(auth_client):
+    response = auth_client.get("/api/v1/my-guides?after=unknown-guide")
+
+    assert response.status_code == 400
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ValidationError",
+        "message": "O cursor da página é inválido.",
+        "action": "Recomece a listagem sem o parâmetro 'after'.",
+        "code": 400,
     }
@@ -1,6 +1,6 @@
 import pytest
 
-from models import guide
+from models import backend, guide
 from tests import orchestrator
 
 
@@ -160,3 +160,50 @@ def test_update_studies_with_completed_guide(auth_client, new_user):
     completed_guide = guide.find_by_id(new_guide["id"])
     assert completed_guide["status"] == "completed"
     assert completed_guide["completed_at"]
+
+
+@pytest.mark.vcr
+def test_update_studies_with_concurrent_update(auth_client, new_user, monkeypatch):
+    new_guide = orchestrator.create_guide(owner=new_user["username"], days=3)
+
+    guide_ref = backend.db().collection("users_guides").document(new_guide["id"])
+    read = type(guide_ref).get
+    projections = []
+
+    def read_then_concurrent_update(self, *args, **kwargs):
+        snapshot = read(self, *args, **kwargs)
+
+        # outra aba salva o guia entre a leitura e a escrita desta requisição
+        if self.id == new_guide["id"]:
+            projections.append(kwargs.get("field_paths"))
+            self.update({"status": "studying"})
+
+        return snapshot
+
+    monkeypatch.setattr(type(guide_ref), "get", read_then_concurrent_update)
+
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}",
+        headers={"Content-Type": "application/json"},
+        json={
+            "new_studies_list": [
+                {**study, "completed": True} for study in new_guide["daily_study"]
+            ]
+        },
+    )
+
+    assert response.status_code == 409
+    # o `daily_study` guardado não é lido
+    assert projections == [["owner", "status"]]
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ConflictError",
+        "message": "O guia foi alterado por outra requisição.",
+        "action": "Recarregue o guia e tente novamente.",
+        "code": 409,
+    }
+
+    monkeypatch.undo()
+    assert guide.find_by_id(new_guide["id"])["status"] == "studying"
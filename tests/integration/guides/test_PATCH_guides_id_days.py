@@ -0,0 +1,50 @@
+import pytest
+
+from models import guide
+from tests import orchestrator
+
+
+@pytest.mark.vcr
+def test_update_days_in_bulk(auth_client, new_user):
+    new_guide = orchestrator.create_guide(owner=new_user["username"], days=3)
+
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}/days",
+        json={
+            "days": [
+                {"day": 1, "completed": True},
+                {"day": 3, "completed": True},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "message": "O progresso do guia foi atualizado com sucesso!",
+        "data": {"status": "studying", "completed_days": 2, "total_days": 3},
+    }
+
+    updated_guide = guide.find_by_id(new_guide["id"])
+    assert [study["completed"] for study in updated_guide["daily_study"]] == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_update_days_with_empty_list(auth_client):
+    response = auth_client.patch("/api/v1/guides/any-guide/days", json={"days": []})
+
+    assert response.status_code == 400
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ValidationError",
+        "message": "A lista de dias está vazia.",
+        "action": "Envie ao menos um dia e tente novamente.",
+        "code": 400,
+    }
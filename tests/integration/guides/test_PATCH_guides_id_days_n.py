@@ -0,0 +1,121 @@
+import pytest
+
+from models import guide
+from tests import orchestrator
+
+
+def test_anonymous_user(client):
+    response = client.patch("/api/v1/guides/any-guide/days/1", json={"completed": True})
+
+    assert response.status_code == 401
+
+
+@pytest.mark.vcr
+def test_complete_one_day(auth_client, new_user):
+    new_guide = orchestrator.create_guide(owner=new_user["username"], days=3)
+
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}/days/2", json={"completed": True}
+    )
+
+    assert response.status_code == 200
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "message": "O progresso do guia foi atualizado com sucesso!",
+        "data": {
+            "day": 2,
+            "completed": True,
+            "status": "studying",
+            "completed_days": 1,
+            "total_days": 3,
+        },
+    }
+
+    updated_guide = guide.find_by_id(new_guide["id"])
+    assert [study["completed"] for study in updated_guide["daily_study"]] == [
+        False,
+        True,
+        False,
+    ]
+    assert "completed_mask" not in updated_guide
+
+
+@pytest.mark.vcr
+def test_complete_all_days(auth_client, new_user):
+    new_guide = orchestrator.create_guide(owner=new_user["username"], days=3)
+
+    for day in (1, 2, 3):
+        response = auth_client.patch(
+            f"/api/v1/guides/{new_guide['id']}/days/{day}", json={"completed": True}
+        )
+
+    assert response.status_code == 200
+    assert response.get_json()["data"]["status"] == "completed"
+
+    completed_guide = guide.find_by_id(new_guide["id"])
+    assert completed_guide["status"] == "completed"
+    assert completed_guide["completed_at"]
+
+    # desmarcar um dia volta o guia para "studying"
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}/days/3", json={"completed": False}
+    )
+
+    assert response.get_json()["data"] == {
+        "day": 3,
+        "completed": False,
+        "status": "studying",
+        "completed_days": 2,
+        "total_days": 3,
+    }
+
+
+@pytest.mark.vcr
+def test_with_nonexistent_day(auth_client, new_user):
+    new_guide = orchestrator.create_guide(owner=new_user["username"], days=3)
+
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}/days/4", json={"completed": True}
+    )
+
+    assert response.status_code == 400
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ValidationError",
+        "message": "O guia não tem o dia 4.",
+        "action": "Envie dias entre 1 e 3 e tente novamente.",
+        "code": 400,
+    }
+
+
+@pytest.mark.vcr
+def test_with_unauthorized_user(auth_client):
+    new_guide = orchestrator.create_guide(days=3)  # Random owner
+
+    response = auth_client.patch(
+        f"/api/v1/guides/{new_guide['id']}/days/1", json={"completed": True}
+    )
+
+    assert response.status_code == 401
+    assert response.get_json()["message"] == "Você não tem acesso à esse guia."
+
+
+def test_with_non_boolean_completed(auth_client):
+    response = auth_client.patch(
+        "/api/v1/guides/any-guide/days/1", json={"completed": "yes"}
+    )
+
+    assert response.status_code == 400
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ValidationError",
+        "message": "A lista de dias é inválida.",
+        "action": 'Envie uma lista de {"day": número do dia, "completed": true/false}.',
+        "code": 400,
+    }
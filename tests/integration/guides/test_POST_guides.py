@@ -1,5 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+
 import pytest
 
+import metrics
+from main import app as flask_app
+from models import guide
+from schemas import DailyStudySchema
+from utils import prompts
+
 
 @pytest.mark.vcr
 def test_generate_guide_with_valid_input(auth_client):
@@ -21,6 +30,7 @@ def test_generate_guide_with_valid_input(auth_client):
     assert response_body == {
         "message": "Guia de estudos gerado com sucesso.",
         "data": {
+            "id": response_body["data"]["id"],
             "title": "Generate Valid Guide",
             "owner": response_body["data"]["owner"],
             "inputs": {
@@ -30,8 +40,10 @@ def test_generate_guide_with_valid_input(auth_client):
                 "days": 3,
             },
             "model": response_body["data"]["model"],
+            "prompt_version": prompts.get("generate_guide.md").version,
             "temperature": 2.0,
             "generation_time_seconds": response_body["data"]["generation_time_seconds"],
+            "generation": response_body["data"]["generation"],
             "daily_study": response_body["data"][
                 "daily_study"
             ],  # ! Validar pelo número de dias
@@ -39,9 +51,21 @@ def test_generate_guide_with_valid_input(auth_client):
                 "created_at"
             ],  # ! Validar se ocorreu no passado
             "is_public": False,
+            "status": "studying",
         },
     }
 
+    guide_id = response_body["data"]["id"]
+    assert response.headers["Location"] == f"/api/v1/guides/{guide_id}"
+
+    saved_guide = guide.find_by_id(guide_id)
+    assert saved_guide["title"] == "Generate Valid Guide"
+    # o `created_at` da resposta é o horário do servidor gravado no documento
+    assert (
+        saved_guide["created_at"].strftime("%a, %d %b %Y %H:%M:%S GMT")
+        == response_body["data"]["created_at"]
+    )
+
 
 @pytest.mark.vcr
 def test_generate_guide_with_specific_model(auth_client):
@@ -65,6 +89,7 @@ def test_generate_guide_with_specific_model(auth_client):
     assert response_body == {
         "message": "Guia de estudos gerado com sucesso.",
         "data": {
+            "id": response_body["data"]["id"],
             "owner": response_body["data"]["owner"],
             "title": "Use Specific Model",
             "inputs": {
@@ -74,14 +99,282 @@ def test_generate_guide_with_specific_model(auth_client):
                 "days": 3,
             },
             "model": "gemini-2.5-flash-lite",
+            "prompt_version": prompts.get("generate_guide.md").version,
             "temperature": 1.0,
             "generation_time_seconds": response_body["data"]["generation_time_seconds"],
+            "generation": response_body["data"]["generation"],
             "daily_study": response_body["data"]["daily_study"],
             "created_at": response_body["data"]["created_at"],
             "is_public": False,
+            "status": "studying",
         },
     }
 
+    generation = response_body["data"]["generation"]
+
+    assert generation == {
+        "total_ms": generation["total_ms"],
+        "prompt_build_ms": generation["prompt_build_ms"],
+        "save_ms": generation["save_ms"],
+        "cache_hit": False,
+        "attempts": [
+            {
+                "model": "gemini-2.5-flash-lite",
+                "operation": "generate",
+                "status": "ok",
+                "duration_ms": generation["attempts"][0]["duration_ms"],
+                "error_code": None,
+                "input_tokens": 783,
+                "output_tokens": 528,
+            }
+        ],
+        "input_tokens": 783,
+        "output_tokens": 528,
+    }
+    assert generation["total_ms"] >= generation["attempts"][0]["duration_ms"]
+
+
+@pytest.mark.vcr
+def test_generate_guide_with_cached_input(auth_client):
+    guide_inputs = {
+        "title": "Cached Guide",
+        "topic": "  Eu quero entender o que são os workers que eu tenho que configurar, por exemplo, no gunicorn. ",
+        "knowledge": "zero",
+        "focus_time": 60,
+        "days": 3,
+    }
+
+    first_response = auth_client.post("/api/v1/guides", json=guide_inputs)
+    assert first_response.status_code == 201
+
+    cache_hits = metrics.counter("guide.generation_cache.hits")
+
+    # mesmas entradas após a normalização: nenhuma chamada nova ao modelo
+    second_response = auth_client.post(
+        "/api/v1/guides", json={**guide_inputs, "topic": guide_inputs["topic"].strip()}
+    )
+    assert second_response.status_code == 201
+
+    first_guide = first_response.get_json()["data"]
+    second_guide = second_response.get_json()["data"]
+
+    assert metrics.counter("guide.generation_cache.hits") == cache_hits + 1
+    assert second_guide["model"] == first_guide["model"]
+    assert second_guide["daily_study"] == first_guide["daily_study"]
+    assert all(study["completed"] is False for study in second_guide["daily_study"])
+
+
+def _fake_studies(days: int) -> list[DailyStudySchema]:
+    return [
+        DailyStudySchema(
+            day=day,
+            title=f"Dia {day}",
+            goal="Meta",
+            theoretical_research=["Pesquisa"],
+            practical_activity="Prática",
+            learning_verification="Verificação",
+        )
+        for day in range(1, days + 1)
+    ]
+
+
+def test_generate_guide_with_concurrent_duplicates(session_cookie, monkeypatch):
+    coalesced = metrics.counter("guide.generations.coalesced")
+    calls = []
+
+    def slow_generation(user_prompt, model, temperature):
+        calls.append(model)
+
+        # segura a geração até a requisição duplicada se juntar a ela
+        deadline = monotonic() + 5
+        while metrics.counter("guide.generations.coalesced") == coalesced:
+            if monotonic() > deadline:
+                break
+            sleep(0.01)
+
+        return _fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", slow_generation)
+
+    guide_inputs = {
+        "title": "Double Click Guide",
+        "topic": "Eu quero entender como funciona o garbage collector do Python.",
+        "knowledge": "zero",
+        "focus_time": 30,
+        "days": 3,
+        "model": "gemini-2.5-flash-lite",
+        "use_cache": False,
+    }
+
+    def post_guide(_):
+        # um cliente por thread, como dois cliques vindos de conexões diferentes
+        request = flask_app.test_client()
+        request.set_cookie("session_id", session_cookie)
+        return request.post("/api/v1/guides", json=guide_inputs)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        responses = list(executor.map(post_guide, range(2)))
+
+    assert [response.status_code for response in responses] == [201, 201]
+    assert calls == ["gemini-2.5-flash-lite"]
+    assert metrics.counter("guide.generations.coalesced") == coalesced + 1
+
+    first_study, second_study = (
+        response.get_json()["data"]["daily_study"] for response in responses
+    )
+    assert first_study == second_study
+    assert len(first_study) == 3
+
+
+def test_generate_guide_without_cache_during_cached_generation(
+    session_cookie, monkeypatch
+):
+    coalesced = metrics.counter("guide.generations.coalesced")
+    calls = []
+    cached_generation = guide._cached_generation
+
+    def slow_cache_hit(cache_key):
+        # segura o acerto no cache enquanto a requisição sem cache chega
+        deadline = monotonic() + 1
+        while metrics.counter("guide.generations.coalesced") == coalesced:
+            if monotonic() > deadline:
+                break
+            sleep(0.01)
+
+        return cached_generation(cache_key)
+
+    def generation(user_prompt, model, temperature):
+        calls.append(model)
+        return _fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    guide_inputs = {
+        "title": "Fresh Guide",
+        "topic": "Eu quero entender como funciona o protocolo TCP.",
+        "knowledge": "zero",
+        "focus_time": 30,
+        "days": 3,
+        "model": "gemini-2.5-flash-lite",
+    }
+
+    request = flask_app.test_client()
+    request.set_cookie("session_id", session_cookie)
+    # a primeira geração fica no cache
+    assert request.post("/api/v1/guides", json=guide_inputs).status_code == 201
+    assert calls == ["gemini-2.5-flash-lite"]
+
+    monkeypatch.setattr(guide, "_cached_generation", slow_cache_hit)
+
+    def post_guide(use_cache):
+        request = flask_app.test_client()
+        request.set_cookie("session_id", session_cookie)
+        return request.post(
+            "/api/v1/guides", json={**guide_inputs, "use_cache": use_cache}
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        cached_response = executor.submit(post_guide, True)
+        sleep(0.1)
+        fresh_response = executor.submit(post_guide, False)
+
+        assert cached_response.result().status_code == 201
+        assert fresh_response.result().status_code == 201
+
+    # a requisição com "use_cache": false gerou de novo, sem se juntar ao acerto
+    assert calls == ["gemini-2.5-flash-lite"] * 2
+    assert metrics.counter("guide.generations.coalesced") == coalesced
+    assert cached_response.result().get_json()["data"]["generation"]["cache_hit"]
+    assert not fresh_response.result().get_json()["data"]["generation"]["cache_hit"]
+
+
+def test_generate_guide_with_idempotency_key(auth_client, monkeypatch):
+    calls = []
+
+    def generation(user_prompt, model, temperature):
+        calls.append(model)
+        return _fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    guide_inputs = {
+        "title": "Idempotent Guide",
+        "topic": "Eu quero entender como funcionam os índices de um banco de dados.",
+        "knowledge": "zero",
+        "focus_time": 30,
+        "days": 3,
+        "model": "gemini-2.5-flash-lite",
+        "use_cache": False,
+    }
+    headers = {"Idempotency-Key": "c0ffee-retry-1"}
+
+    first_response = auth_client.post(
+        "/api/v1/guides", json=guide_inputs, headers=headers
+    )
+    # retry do cliente após um timeout: mesma chave, mesmo corpo
+    second_response = auth_client.post(
+        "/api/v1/guides", json=guide_inputs, headers=headers
+    )
+
+    assert first_response.status_code == 201
+    assert second_response.status_code == 201
+    assert second_response.headers["Idempotent-Replayed"] == "true"
+    assert second_response.get_json() == first_response.get_json()
+    assert calls == ["gemini-2.5-flash-lite"]
+
+    # a mesma chave com outro corpo é rejeitada
+    other_response = auth_client.post(
+        "/api/v1/guides",
+        json={**guide_inputs, "days": 4},
+        headers=headers,
+    )
+
+    assert other_response.status_code == 400
+    assert other_response.get_json() == {
+        "name": "ValidationError",
+        "message": "A Idempotency-Key já foi usada com outro corpo de requisição.",
+        "action": "Use uma nova chave para uma nova requisição.",
+        "code": 400,
+    }
+
+
+def test_generate_guide_with_idempotency_key_in_progress(
+    auth_client, session_cookie, monkeypatch
+):
+    guide_inputs = {
+        "title": "Idempotent In Progress",
+        "topic": "Eu quero entender como funcionam as filas de mensagens.",
+        "knowledge": "zero",
+        "focus_time": 30,
+        "days": 3,
+        "model": "gemini-2.5-flash-lite",
+        "use_cache": False,
+    }
+    headers = {"Idempotency-Key": "c0ffee-retry-2"}
+    retries = []
+
+    def generation(user_prompt, model, temperature):
+        # o cliente repete a requisição enquanto a primeira ainda gera o guia
+        retry_client = flask_app.test_client()
+        retry_client.set_cookie("session_id", session_cookie)
+        retries.append(
+            retry_client.post("/api/v1/guides", json=guide_inputs, headers=headers)
+        )
+        return _fake_studies(3)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    response = auth_client.post("/api/v1/guides", json=guide_inputs, headers=headers)
+
+    assert response.status_code == 201
+    assert retries[0].status_code == 409
+    assert retries[0].get_json() == {
+        "name": "ConflictError",
+        "message": "Uma requisição com essa Idempotency-Key ainda está em andamento.",
+        "action": "Aguarde alguns instantes e repita a requisição para receber o resultado.",
+        "code": 409,
+    }
+
 
 def test_generate_guide_with_str_focus_time_and_days(auth_client):
     response = auth_client.post(
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from utils import prompts
+
+
+def read_events(response) -> list[tuple[str, dict]]:
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append(
+            (
+                event_line.removeprefix("event: "),
+                json.loads(data_line.removeprefix("data: ")),
+            )
+        )
+
+    return events
+
+
+@pytest.mark.vcr
+def test_stream_guide_with_valid_input(auth_client, new_user):
+    response = auth_client.post(
+        "/api/v1/guides/stream",
+        json={
+            "title": "Stream Valid Guide",
+            "topic": "Eu quero entender o que são os workers que eu tenho que configurar, por exemplo, no gunicorn.",
+            "knowledge": "zero",
+            "focus_time": 60,
+            "days": 3,
+            "use_cache": False,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = read_events(response)
+    day_events = [payload for event, payload in events if event == "day"]
+
+    assert [event for event, _ in events] == ["day"] * len(day_events) + ["done"]
+    assert [study["day"] for study in day_events] == list(range(1, len(day_events) + 1))
+    assert all(study["completed"] is False for study in day_events)
+
+    saved_guide = events[-1][1]
+
+    assert saved_guide == {
+        "id": saved_guide["id"],
+        "title": "Stream Valid Guide",
+        "owner": new_user["username"],
+        "inputs": {
+            "topic": "Eu quero entender o que são os workers que eu tenho que configurar, por exemplo, no gunicorn.",
+            "knowledge": "zero",
+            "focus_time": 60,
+            "days": 3,
+        },
+        "model": "gemini-2.5-flash",
+        "prompt_version": prompts.get("generate_guide.md").version,
+        "temperature": 2.0,
+        "generation_time_seconds": saved_guide["generation_time_seconds"],
+        "generation": saved_guide["generation"],
+        "daily_study": day_events,
+        "created_at": saved_guide["created_at"],
+        "is_public": False,
+        "status": "studying",
+    }
+
+    assert [
+        (attempt["model"], attempt["status"])
+        for attempt in saved_guide["generation"]["attempts"]
+    ] == [("gemini-2.5-flash", "ok")]
+    assert saved_guide["generation"]["output_tokens"] > 0
+    assert saved_guide["generation"]["save_ms"] >= 0
+
+    response = auth_client.get(f"/api/v1/guides/{saved_guide['id']}")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["daily_study"] == day_events
+
+
+def test_stream_guide_with_empty_title(auth_client):
+    response = auth_client.post(
+        "/api/v1/guides/stream",
+        json={
+            "title": "",
+            "topic": "Eu quero estudar sobre neurociência.",
+            "knowledge": "zero",
+            "focus_time": 60,
+            "days": 3,
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "name": "ValidationError",
+        "message": "O título não pode ser vazio.",
+        "action": "Preencha o título do guia e tente novamente.",
+        "code": 400,
+    }
+
+
+def test_stream_guide_without_session(client):
+    response = client.post("/api/v1/guides/stream", json={})
+
+    assert response.status_code == 401
+    assert response.get_json() == {
+        "name": "UnauthorizedError",
+        "message": "Cookie de sessão não encontrado.",
+        "action": "Faça login para continuar.",
+        "code": 401,
+    }
@@ -0,0 +1,48 @@
+import pytest
+
+from models import backend
+
+
+def test_get_metrics(auth_client):
+    response = auth_client.get("/api/v1/metrics")
+
+    assert response.status_code == 200
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "message": "Métricas do worker recuperadas com sucesso.",
+        "data": {
+            "counters": response_body["data"]["counters"],
+            "gauges": response_body["data"]["gauges"],
+            "histograms": response_body["data"]["histograms"],
+        },
+    }
+
+
+@pytest.mark.skipif(
+    backend.IN_MEMORY, reason="o login em memória não chama a API REST do Firebase"
+)
+def test_get_metrics_after_login(client, new_user):
+    client.post(
+        "/api/v1/sessions",
+        json={"email": new_user["email"], "password": "validpassword"},
+    )
+
+    response = client.get("/api/v1/metrics")
+    histograms = response.get_json()["data"]["histograms"]
+
+    assert histograms["http.firebase.sign_in.latency_ms"]["count"] >= 1
+
+
+def test_get_metrics_with_unauthorized_user(client):
+    response = client.get("/api/v1/metrics")
+    response_body = response.get_json()
+
+    assert response.status_code == 401
+    assert response_body == {
+        "name": "UnauthorizedError",
+        "message": "Cookie de sessão não encontrado.",
+        "action": "Faça login para continuar.",
+        "code": 401,
+    }
@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.mark.vcr
+def test_get_model_metrics_after_validation(auth_client):
+    response = auth_client.post(
+        "/api/v1/validations/topic",
+        json={"topic": "Quero aprender a montar um orçamento pessoal do zero."},
+    )
+    assert response.status_code == 200
+
+    response = auth_client.get("/api/v1/metrics/models")
+
+    assert response.status_code == 200
+
+    response_body = response.get_json()
+
+    assert response_body["message"] == "Métricas dos modelos recuperadas com sucesso."
+
+    validation = response_body["data"]["gemini-2.5-flash-lite"]["operations"][
+        "validate"
+    ]
+
+    assert validation == {
+        "attempts": validation["attempts"],
+        "successes": validation["successes"],
+        "failures": validation["failures"],
+        "success_rate": validation["success_rate"],
+        "avg_ms": validation["avg_ms"],
+        "p50_ms": validation["p50_ms"],
+        "p90_ms": validation["p90_ms"],
+    }
+    assert validation["successes"] >= 1
+    assert validation["attempts"] == validation["successes"] + validation["failures"]
+
+
+def test_get_model_metrics_with_unauthorized_user(client):
+    response = client.get("/api/v1/metrics/models")
+
+    assert response.status_code == 401
@@ -1,5 +1,9 @@
 from datetime import datetime, timezone
 from http.cookies import SimpleCookie
+from time import sleep
+
+from models import backend, session
+from tests import orchestrator
 
 
 def test_delete_session(client):
@@ -19,3 +23,46 @@ def test_delete_session(client):
     ).replace(tzinfo=timezone.utc)  # adiciona um offset ao expires que era naive
 
     assert expires < datetime.now(timezone.utc)
+
+
+def test_delete_session_with_cached_cookie(client):
+    new_user = orchestrator.create_user()
+    session_cookie = orchestrator.authenticate(new_user["email"], "validpassword")
+
+    client.set_cookie("session_id", session_cookie)
+    # a primeira requisição coloca o cookie no cache de sessões verificadas
+    assert client.get("/api/v1/user").status_code == 200
+
+    assert client.delete("/api/v1/sessions").status_code == 200
+
+    # o mesmo cookie, reenviado depois do logout, não é mais aceito
+    client.set_cookie("session_id", session_cookie)
+    response = client.get("/api/v1/user")
+
+    assert response.status_code == 401
+    assert response.get_json() == {
+        "name": "UnauthorizedError",
+        "message": "Ocorreu um erro ao verificar a sessão: sessão expirada ou revogada.",
+        "action": "Verifique os dados e tente novamente.",
+        "code": 401,
+    }
+
+
+def test_revoked_session_with_cached_cookie(client, monkeypatch):
+    monkeypatch.setattr(session, "REVOCATION_CHECK_SECONDS", 0.5)
+    new_user = orchestrator.create_user()
+    session_cookie = orchestrator.authenticate(new_user["email"], "validpassword")
+
+    # a revogação do Firebase tem resolução de segundos
+    sleep(1)
+
+    client.set_cookie("session_id", session_cookie)
+    assert client.get("/api/v1/user").status_code == 200
+
+    backend.auth().revoke_refresh_tokens(new_user["uid"])
+
+    # até a próxima checagem de revogação o cookie ainda vem do cache
+    assert client.get("/api/v1/user").status_code == 200
+
+    sleep(0.5)
+    assert client.get("/api/v1/user").status_code == 401
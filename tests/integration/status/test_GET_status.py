@@ -1,3 +1,6 @@
+from models import backend
+
+
 def test_get_status(client):
     response = client.get("/api/v1/status")
 
@@ -7,5 +10,18 @@ def test_get_status(client):
 
     assert response_body == {
         "message": "API está online.",
-        "data": {"status": "Online"},
+        "data": {
+            "status": "Online",
+            "session_certificates": response_body["data"]["session_certificates"],
+            "llm_circuits": response_body["data"]["llm_circuits"],
+            "llm_schedulers": response_body["data"]["llm_schedulers"],
+        },
     }
+
+    if backend.IN_MEMORY:  # cookies do backend em memória não usam certificados
+        return
+
+    certificates = response_body["data"]["session_certificates"]
+    assert certificates["loaded"] is True
+    assert certificates["age_seconds"] >= 0
+    assert certificates["expires_in_seconds"] > 0
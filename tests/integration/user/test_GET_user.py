@@ -1,3 +1,10 @@
+from time import sleep
+
+import metrics
+from models import backend, user
+from tests import orchestrator
+
+
 def test_get_current_user(auth_client, new_user):
     response = auth_client.get("/api/v1/user")
 
@@ -14,3 +21,72 @@ def test_get_current_user(auth_client, new_user):
             "created_at": response_body["data"]["created_at"],
         },
     }
+
+
+def test_get_current_user_from_profile_cache(auth_client, new_user):
+    user._profiles.pop(new_user["username"])
+    hits = metrics.counter("user.profile_cache.hits")
+    misses = metrics.counter("user.profile_cache.misses")
+
+    first_response = auth_client.get("/api/v1/user")
+    second_response = auth_client.get("/api/v1/user")
+
+    assert second_response.get_json() == first_response.get_json()
+    assert metrics.counter("user.profile_cache.misses") == misses + 1
+    assert metrics.counter("user.profile_cache.hits") == hits + 1
+
+
+def test_get_current_user_with_expired_profile(auth_client, new_user, monkeypatch):
+    monkeypatch.setattr(user._profiles, "ttl", 0.1)
+    user._profiles.pop(new_user["username"])
+    misses = metrics.counter("user.profile_cache.misses")
+
+    auth_client.get("/api/v1/user")
+    sleep(0.2)
+    response = auth_client.get("/api/v1/user")
+
+    assert response.status_code == 200
+    assert response.get_json()["data"]["username"] == new_user["username"]
+    assert metrics.counter("user.profile_cache.misses") == misses + 2
+
+
+def test_get_user_after_profile_is_replaced(client):
+    # perfil antigo em cache (ex.: de uma conta apagada com o mesmo nome)
+    user._profiles.set(
+        "replaced.user",
+        {
+            "username": "replaced.user",
+            "uid": "stale-uid",
+            "email": "stale@example.com",
+            "created_at": "0",
+        },
+    )
+
+    created_user = orchestrator.create_user(
+        username="replaced.user", email="replaced.user@example.com"
+    )
+
+    # a criação do perfil invalida a entrada do cache
+    assert user.find_by_username("replaced.user") == created_user
+
+
+def test_get_legacy_user_with_reserved_characters(client):
+    # nomes antigos podem ter caracteres que os novos cadastros não aceitam
+    backend.db().collection("users").document("legacy-slash-uid").set(
+        {
+            "username": "__legacy/user",
+            "email": "legacy.slash@example.com",
+            "uid": "legacy-slash-uid",
+            "created_at": "1700000000000",
+        }
+    )
+
+    assert user.find_by_username("__legacy/user")["uid"] == "legacy-slash-uid"
+
+
+def test_reservation_ids_do_not_collide():
+    usernames = ["__legacy/user", "%5F_legacy%2Fuser", "_a", "%5Fa", "a/b", "a%2Fb"]
+    reservation_ids = [user._reservation_id(username) for username in usernames]
+
+    assert len(set(reservation_ids)) == len(usernames)
+    assert all("/" not in rid and not rid.startswith("__") for rid in reservation_ids)
@@ -1,4 +1,10 @@
 import time
+from types import SimpleNamespace
+
+from google.api_core.exceptions import ServiceUnavailable
+
+import metrics
+from models import backend, user
 
 
 def test_create_user_with_valid_data(client):
@@ -174,3 +180,127 @@ def test_create_user_with_duplicated_username(client):
         "action": "Insira outro nome de usuário e tente novamente.",
         "code": 409,
     }
+
+
+def test_create_user_with_legacy_username(client):
+    # usuário criado antes do índice `usernames`: só existe o perfil em `users`
+    backend.db().collection("users").document("legacy-uid").set(
+        {
+            "username": "legacy.user",
+            "email": "legacy.user@example.com",
+            "uid": "legacy-uid",
+            "created_at": "1700000000000",
+        }
+    )
+
+    response = client.post(
+        "/api/v1/users",
+        json={
+            "username": "legacy.user",
+            "email": "legacy.user.2@example.com",
+            "password": "testpassword",
+        },
+    )
+
+    assert response.status_code == 409
+
+    assert response.get_json() == {
+        "name": "ConflictError",
+        "message": "O nome de usuário fornecido já está sendo utilizado.",
+        "action": "Insira outro nome de usuário e tente novamente.",
+        "code": 409,
+    }
+
+
+def test_create_user_with_backfilled_legacy_username(client, monkeypatch):
+    backend.db().collection("users").document("backfilled-uid").set(
+        {
+            "username": "backfilled.user",
+            "email": "backfilled.user@example.com",
+            "uid": "backfilled-uid",
+            "created_at": "1700000000000",
+        }
+    )
+
+    counts = user.backfill_reservations()
+
+    assert counts["created"] >= 1
+    assert user.backfill_reservations()["created"] == 0
+
+    # com as reservas criadas, a consulta por `username` pode ser desligada
+    monkeypatch.setattr(user, "LEGACY_LOOKUP", False)
+    user._profiles.pop("backfilled.user")
+    legacy_lookups = metrics.counter("user.legacy_lookups")
+
+    assert user.find_by_username("backfilled.user")["uid"] == "backfilled-uid"
+
+    response = client.post(
+        "/api/v1/users",
+        json={
+            "username": "backfilled.user",
+            "email": "backfilled.user.2@example.com",
+            "password": "testpassword",
+        },
+    )
+
+    assert response.status_code == 409
+    assert metrics.counter("user.legacy_lookups") == legacy_lookups
+
+
+def test_create_user_with_failed_profile_write(client, monkeypatch):
+    db = backend.db()
+
+    def unavailable():
+        raise ServiceUnavailable("Firestore indisponível.")
+
+    def failing_batch():
+        batch = db.batch()
+        batch.commit = unavailable
+        return batch
+
+    monkeypatch.setattr(
+        backend,
+        "db",
+        lambda: SimpleNamespace(collection=db.collection, batch=failing_batch),
+    )
+
+    user_data = {
+        "username": "unwritten.user",
+        "email": "unwritten.user@example.com",
+        "password": "testpassword",
+    }
+    response = client.post("/api/v1/users", json=user_data)
+
+    assert response.status_code == 503
+    assert response.get_json() == {
+        "name": "ServiceError",
+        "message": "Não foi possível criar o usuário.",
+        "action": "Entre em contado com o suporte.",
+        "code": 503,
+    }
+
+    # a conta no Auth foi desfeita: o mesmo e-mail pode ser cadastrado de novo
+    monkeypatch.undo()
+    response = client.post("/api/v1/users", json=user_data)
+
+    assert response.status_code == 201
+
+
+def test_create_user_with_slash_in_username(client):
+    response = client.post(
+        "/api/v1/users",
+        json={
+            "username": "invalid/username",
+            "email": "invalid.username@example.com",
+            "password": "testpassword",
+        },
+    )
+
+    assert response.status_code == 400
+
+    assert response.get_json() == {
+        "name": "ValidationError",
+        "message": "O nome de usuário inserido não é válido.",
+        "action": "O nome de usuário não pode conter '/' nem começar com '__'.",
+        "code": 400,
+    }
@@ -1,5 +1,11 @@
+from contextlib import ExitStack
+from types import SimpleNamespace
+
 import pytest
 
+import metrics
+from models import llm, prompt, scheduler
+
 
 def test_anonymous_user(client):
     response = client.post(
@@ -43,6 +49,33 @@ def test_validate_topic_with_valid_input(auth_client):
     }
 
 
+@pytest.mark.vcr
+def test_validate_topic_with_cached_verdict(auth_client):
+    topic = "Eu quero entender o que são os workers do gunicorn e como configurá-los."
+
+    first_response = auth_client.post(
+        "/api/v1/validations/topic", json={"topic": topic}
+    )
+    assert first_response.status_code == 200
+
+    cache_hits = metrics.counter("topic_verdict_cache.hits")
+
+    # variação de maiúsculas e espaços: mesmo veredito, sem chamar o modelo
+    second_response = auth_client.post(
+        "/api/v1/validations/topic",
+        json={
+            "topic": "eu QUERO entender o que são   os workers do gunicorn e como configurá-los."
+        },
+    )
+
+    assert second_response.status_code == 200
+    assert metrics.counter("topic_verdict_cache.hits") == cache_hits + 1
+    assert second_response.get_json()["data"]["info"] == {
+        "is_valid": True,
+        "motive": "N/A",
+    }
+
+
 @pytest.mark.vcr
 def test_validate_topic_with_invalid_topic(auth_client):
     response = auth_client.post(
@@ -62,6 +95,38 @@ def test_validate_topic_with_invalid_topic(auth_client):
     }
 
 
+def test_validate_topic_with_saturated_models(auth_client, monkeypatch):
+    saturated = {
+        model_name: scheduler.ModelScheduler(model_name, concurrency=1, queue_size=0)
+        for model_name in prompt.VALIDATION_MODELS
+    }
+    monkeypatch.setattr(scheduler, "_schedulers", saturated)
+
+    with ExitStack() as stack:
+        # ocupa a única vaga de cada modelo, sem fila de espera
+        for model_scheduler in saturated.values():
+            stack.enter_context(model_scheduler.slot(scheduler.INTERACTIVE))
+
+        response = auth_client.post(
+            "/api/v1/validations/topic",
+            json={
+                "topic": "Quero aprender como funciona o escalonador do kernel Linux."
+            },
+        )
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+    response_body = response.get_json()
+
+    assert response_body == {
+        "name": "ServiceError",
+        "message": "Muitas chamadas ao modelo em andamento.",
+        "action": "Tente novamente em alguns segundos.",
+        "code": 503,
+    }
+
+
 def test_validate_topic_without_topic(auth_client):
     response = auth_client.post(
         "/api/v1/validations/topic",
@@ -78,3 +143,29 @@ def test_validate_topic_without_topic(auth_client):
         "action": "Verifique o número de caracteres e tente novamente.",
         "code": 400,
     }
+
+
+def test_validate_topic_with_invalid_response_on_probe(auth_client, monkeypatch):
+    model_name = prompt.VALIDATION_MODELS[0]
+    circuit = llm.CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    circuit.record_failure()
+    circuit._opened_at -= 30  # cooldown passou: a próxima chamada é o teste
+    monkeypatch.setattr(llm, "_breakers", {model_name: circuit})
+
+    class InvalidJSONModels:
+        def generate_content(self, **kwargs):
+            return SimpleNamespace(text="não é JSON", usage_metadata=None)
+
+    monkeypatch.setattr(
+        llm, "client", lambda: SimpleNamespace(models=InvalidJSONModels())
+    )
+
+    response = auth_client.post(
+        "/api/v1/validations/topic",
+        json={"topic": "Quero aprender como funciona a coleta de lixo do Python."},
+    )
+
+    assert response.status_code == 500
+    # a resposta inválida não prende o teste do half_open
+    assert circuit.state == "half_open"
+    assert circuit.allow() is True
@@ -1,8 +1,8 @@
 import random
+from datetime import datetime, timedelta, timezone
 from time import sleep
-from models import auth, guide, session, user
+from models import auth, backend, guide, session, user
 from faker import Faker
-from firebase_admin import firestore
 
 fake = Faker()
 
@@ -34,6 +34,9 @@ def create_guide(owner: str | None = None, days: int | None = None):
             "focus_time": random.choice([30, 60, 120]),
             "days": days or random.randint(3, 30),
         },
+        # cada teste usa a resposta do próprio cassette, que pode ter outro
+        # número de dias: o cache de gerações não pode vazar entre testes
+        use_cache=False,
     )
 
     guide_from_db = guide.save(new_guide)
@@ -41,15 +44,34 @@ def create_guide(owner: str | None = None, days: int | None = None):
     return guide_from_db
 
 
+def create_job(owner: str | None = None, status: str = "failed"):
+    now = datetime.now(timezone.utc)
+    job_ref = backend.db().collection("guide_jobs").document()
+    job_ref.set(
+        {
+            "owner": owner or fake.name(),
+            "params": {},
+            "status": status,
+            "guide_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "lease_expires_at": now + timedelta(minutes=5),
+        }
+    )
+
+    return job_ref.id
+
+
 def delete_guide(guide_id: str, username: str):
     guide.delete(guide_id, username)
 
 
 def clear_database():
     GUIDES_BATCH_SIZE = 100
-    DELAY_SECONDS = 0.5
+    DELAY_SECONDS = 0 if backend.IN_MEMORY else 0.5
 
-    db = firestore.client()
+    db = backend.db()
     guides_collection_ref = db.collection("users_guides")
     batch = []
 
@@ -61,3 +83,15 @@ def clear_database():
             print(f"  - Removidos {len(batch)} guias.")
             batch.clear()
             sleep(DELAY_SECONDS)
+
+    for job_ref in db.collection("guide_jobs").list_documents():
+        job_ref.delete()
+
+    for verdict_ref in db.collection("topic_verdicts").list_documents():
+        verdict_ref.delete()
+
+    for key_ref in db.collection("idempotency_keys").list_documents():
+        key_ref.delete()
+
+    for revoked_ref in db.collection("revoked_sessions").list_documents():
+        revoked_ref.delete()
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from pydantic import ValidationError as PydValidationError
+
+from models import guide, llm
+
+
+def test_circuit_breaker_lifecycle():
+    circuit = llm.CircuitBreaker(failure_threshold=2, cooldown_seconds=30)
+
+    assert circuit.state == "closed"
+    assert circuit.allow() is True
+
+    circuit.record_failure()
+    assert circuit.state == "closed"
+
+    circuit.record_failure()
+    assert circuit.state == "open"
+    assert circuit.allow() is False
+    assert circuit.snapshot()["retry_in_seconds"] > 0
+
+    # passado o cooldown, só uma chamada de teste é liberada
+    circuit._opened_at -= 30
+    assert circuit.allow() is True
+    assert circuit.state == "half_open"
+    assert circuit.allow() is False
+
+    # o teste falhou: o circuito abre de novo
+    circuit.record_failure()
+    assert circuit.state == "open"
+    assert circuit.allow() is False
+
+    circuit._opened_at -= 30
+    assert circuit.allow() is True
+
+    circuit.record_success()
+    assert circuit.state == "closed"
+    assert circuit.failures == 0
+    assert circuit.allow() is True
+
+
+def test_circuit_breaker_with_released_probe():
+    circuit = llm.CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+
+    circuit.record_failure()
+    circuit._opened_at -= 30
+
+    assert circuit.allow() is True
+    assert circuit.allow() is False
+
+    # a chamada de teste não chegou a contar como sucesso nem falha
+    circuit.release()
+
+    assert circuit.state == "half_open"
+    assert circuit.allow() is True
+
+
+def fake_client(monkeypatch, error: Exception) -> None:
+    class FailingModels:
+        def generate_content(self, **kwargs):
+            raise error
+
+    monkeypatch.setattr(llm, "client", lambda: SimpleNamespace(models=FailingModels()))
+
+
+def test_circuit_opens_on_timeout(monkeypatch):
+    model = guide.GEN_MODELS[0]
+    circuit = llm.CircuitBreaker(failure_threshold=2, cooldown_seconds=30)
+    monkeypatch.setattr(llm, "_breakers", {model: circuit})
+    fake_client(monkeypatch, httpx.ReadTimeout("timed out"))
+
+    for _ in range(2):
+        with pytest.raises(httpx.ReadTimeout):
+            guide._generate(model, "prompt", "instrução")
+
+    assert circuit.state == "open"
+    assert circuit.allow() is False
+
+
+def test_circuit_ignores_invalid_response(monkeypatch):
+    model = guide.GEN_MODELS[0]
+    circuit = llm.CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    circuit.record_failure()
+    circuit._opened_at -= 30
+    monkeypatch.setattr(llm, "_breakers", {model: circuit})
+
+    class InvalidModels:
+        def generate_content(self, **kwargs):
+            return SimpleNamespace(text="não é json", usage_metadata=None)
+
+    monkeypatch.setattr(llm, "client", lambda: SimpleNamespace(models=InvalidModels()))
+
+    assert circuit.allow() is True
+    with pytest.raises(PydValidationError):
+        guide._generate(model, "prompt", "instrução")
+
+    # a resposta inválida não fecha o circuito, só libera o próximo teste
+    assert circuit.state == "half_open"
+    assert circuit.allow() is True
@@ -0,0 +1,194 @@
+import re
+from time import sleep
+
+import pytest
+
+from errors import ServiceError
+from models import guide
+from schemas import DailyStudySchema, DayOutlineSchema
+
+
+def fake_studies(first_day: int, last_day: int) -> list[DailyStudySchema]:
+    return [
+        DailyStudySchema(
+            day=day,
+            title=f"Dia {day}",
+            goal="Meta",
+            theoretical_research=["Pesquisa"],
+            practical_activity="Prática",
+            learning_verification="Verificação",
+        )
+        for day in range(first_day, last_day + 1)
+    ]
+
+
+def day_range(chunk_prompt: str) -> tuple[int, int]:
+    first_day, last_day = re.search(
+        r"numerando os dias de (\d+) a (\d+)", chunk_prompt
+    ).groups()
+    return int(first_day), int(last_day)
+
+
+@pytest.fixture(autouse=True)
+def chunked(monkeypatch):
+    monkeypatch.setattr(guide, "CHUNK_DAYS", 10)
+    monkeypatch.setattr(
+        guide,
+        "_generate_outline",
+        lambda user_prompt, model="": [
+            DayOutlineSchema(day=day, title=f"Dia {day}") for day in range(1, 26)
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "days, ranges",
+    [
+        (3, [(1, 3)]),
+        (10, [(1, 10)]),
+        (11, [(1, 6), (7, 11)]),
+        (25, [(1, 9), (10, 17), (18, 25)]),
+        (30, [(1, 10), (11, 20), (21, 30)]),
+    ],
+)
+def test_plan_chunks(days, ranges):
+    assert guide._plan_chunks(days, 10) == ranges
+
+
+def test_check_days_in_sequence():
+    guide._check_days(fake_studies(11, 20), 11, 20)
+
+
+@pytest.mark.parametrize(
+    "days",
+    [
+        [11, 12, 14],  # falta um dia
+        [11, 12, 12, 13],  # dia repetido
+        [11, 13, 12],  # fora de ordem
+        [12, 13],  # começa depois
+        [],
+    ],
+)
+def test_check_days_out_of_sequence(days):
+    studies = [study for day in days for study in fake_studies(day, day)]
+
+    with pytest.raises(ServiceError) as error:
+        guide._check_days(studies, 11, 13)
+
+    assert error.value.message == "O modelo não gerou os dias 11 a 13 em sequência."
+
+
+def test_generate_chunked_in_day_order(monkeypatch):
+    def generation(chunk_prompt, model, temperature):
+        first_day, last_day = day_range(chunk_prompt)
+        # as últimas faixas terminam antes das primeiras
+        sleep(0.1 / first_day)
+        return fake_studies(first_day, last_day)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    daily_study, model = guide.generate_chunked(
+        "prompt", 25, model="gemini-2.5-flash-lite"
+    )
+
+    assert [study.day for study in daily_study] == list(range(1, 26))
+    assert model == "gemini-2.5-flash-lite"
+
+
+def test_generate_chunked_with_retried_chunk(monkeypatch):
+    calls = []
+
+    def generation(chunk_prompt, model, temperature):
+        first_day, last_day = day_range(chunk_prompt)
+        calls.append(first_day)
+        if first_day == 10 and calls.count(10) == 1:
+            # a faixa do meio veio sem o último dia na primeira tentativa
+            return fake_studies(first_day, last_day - 1)
+
+        return fake_studies(first_day, last_day)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    daily_study, _ = guide.generate_chunked("prompt", 25, model="gemini-2.5-flash-lite")
+
+    assert [study.day for study in daily_study] == list(range(1, 26))
+    assert sorted(calls) == [1, 10, 10, 18]
+
+
+def test_generate_chunked_with_failed_chunk(monkeypatch):
+    def generation(chunk_prompt, model, temperature):
+        if chunk_prompt == "prompt":
+            # o guia inteiro, gerado a partir do prompt original
+            return fake_studies(1, 25)
+
+        first_day, last_day = day_range(chunk_prompt)
+        if first_day == 10:
+            return fake_studies(first_day, last_day - 1)
+
+        return fake_studies(first_day, last_day)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    daily_study, model = guide.generate_chunked(
+        "prompt", 25, model="gemini-2.5-flash-lite"
+    )
+
+    assert [study.day for study in daily_study] == list(range(1, 26))
+    assert model == "gemini-2.5-flash-lite"
+
+
+def test_generate_chunked_with_failed_outline(monkeypatch):
+    outlines = []
+
+    def short_outline(user_prompt, model=""):
+        outlines.append(user_prompt)
+        return [DayOutlineSchema(day=day, title=f"Dia {day}") for day in range(1, 20)]
+
+    monkeypatch.setattr(guide, "_generate_outline", short_outline)
+    monkeypatch.setattr(
+        guide, "generate_with_fallback", lambda user_prompt: (fake_studies(1, 25), "m")
+    )
+
+    daily_study, model = guide.generate_chunked("prompt", 25)
+
+    assert len(outlines) == 2
+    assert [study.day for study in daily_study] == list(range(1, 26))
+    assert model == "m"
+
+
+def test_generate_chunked_with_failed_fallback(monkeypatch):
+    def generation(chunk_prompt, model, temperature):
+        if chunk_prompt == "prompt":
+            return fake_studies(1, 24)
+
+        first_day, last_day = day_range(chunk_prompt)
+        return fake_studies(first_day, last_day - 1)
+
+    monkeypatch.setattr(guide, "generate_with_model", generation)
+
+    with pytest.raises(ServiceError) as error:
+        guide.generate_chunked("prompt", 25, model="gemini-2.5-flash-lite")
+
+    assert error.value.message == "O modelo não gerou os dias 1 a 25 em sequência."
+
+
+def test_generation_key_with_chunking(monkeypatch):
+    def key(chunked: bool) -> str:
+        return guide._generation_key("prompt", "v1", "", 2.0, chunked)
+
+    unchunked, chunked = key(False), key(True)
+    assert chunked != unchunked
+
+    monkeypatch.setattr(guide, "CHUNK_DAYS", 7)
+    assert key(True) != chunked
+    assert key(False) == unchunked
+
+    monkeypatch.setattr(guide, "CHUNK_DAYS", 10)
+    monkeypatch.setattr(guide.prompt, "CHUNK_FORMAT_VERSION", "changed")
+    assert key(True) != chunked
+    assert key(False) == unchunked
+
+
+def test_chunked_only_above_chunk_days():
+    assert guide._chunked(10) is False
+    assert guide._chunked(11) is True
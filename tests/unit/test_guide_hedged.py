@@ -0,0 +1,95 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import sleep
+
+import google.genai.errors as genai_errors
+import pytest
+
+import metrics
+from models import guide, llm
+
+
+@pytest.fixture(autouse=True)
+def hedged(monkeypatch):
+    monkeypatch.setattr(guide, "GEN_MODELS", ["model-a", "model-b"])
+    monkeypatch.setattr(guide, "HEDGE_DELAY", "0.01")
+    monkeypatch.setattr(llm, "_breakers", {})
+
+
+def fake_generate(responses: dict):
+    """Substitui `_generate`: cada modelo espera e devolve (ou levanta) a resposta."""
+
+    def generate(model_name, user_prompt, system_instruction):
+        delay, response = responses[model_name]
+        sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+
+        return [model_name]
+
+    return generate
+
+
+def test_hedged_with_first_response_winning(monkeypatch):
+    monkeypatch.setattr(
+        guide,
+        "_generate",
+        fake_generate({"model-a": (0.5, None), "model-b": (0.0, None)}),
+    )
+    wins = metrics.counter("llm.hedge.wins.model-b")
+
+    # model-a passou do delay: model-b é disparado em paralelo e responde antes
+    daily_study, model_name = guide._generate_hedged("prompt", "instrução")
+
+    assert (daily_study, model_name) == (["model-b"], "model-b")
+    assert metrics.counter("llm.hedge.wins.model-b") == wins + 1
+
+
+def test_hedged_with_failed_model(monkeypatch):
+    unavailable = genai_errors.ServerError(
+        503, {"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}}
+    )
+    monkeypatch.setattr(guide, "HEDGE_DELAY", "5")
+    monkeypatch.setattr(
+        guide,
+        "_generate",
+        fake_generate({"model-a": (0.0, unavailable), "model-b": (0.0, None)}),
+    )
+
+    # a falha dispara o próximo modelo na hora, sem esperar o delay
+    daily_study, model_name = guide._generate_hedged("prompt", "instrução")
+
+    assert (daily_study, model_name) == (["model-b"], "model-b")
+
+
+class QueueingExecutor:
+    """Executa só o model-a; as chamadas aos outros modelos ficam na fila."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, fn, model_name, *args):
+        if model_name == "model-a":
+            return self._executor.submit(fn, model_name, *args)
+
+        return Future()
+
+
+def test_hedged_with_cancelled_model(monkeypatch):
+    monkeypatch.setattr(guide, "_hedge_executor", QueueingExecutor())
+    monkeypatch.setattr(
+        guide,
+        "_generate",
+        fake_generate({"model-a": (0.2, None), "model-b": (0.0, None)}),
+    )
+    circuit = llm.breaker("model-b")
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit._opened_at -= circuit.cooldown_seconds
+
+    daily_study, model_name = guide._generate_hedged("prompt", "instrução")
+
+    assert model_name == "model-a"
+    # o teste do half_open reservado para o model-b, que foi cancelado, é devolvido
+    assert circuit.state == "half_open"
+    assert circuit.allow() is True
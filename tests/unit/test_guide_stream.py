@@ -0,0 +1,72 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from errors import ServiceError
+from models import guide, llm
+
+
+def study(day: int) -> dict:
+    return {
+        "day": day,
+        "title": f"Dia {day}",
+        "Meta do Dia": "Meta",
+        "O Quê Pesquisar (Teoria)": ["Pesquisa"],
+        "Mão na Massa (Prática)": "Prática",
+        "Verificação de Aprendizado": "Verificação",
+        "completed": False,
+    }
+
+
+@pytest.fixture
+def probing_circuit(monkeypatch):
+    """Circuito do primeiro modelo em half_open: a próxima chamada é o teste."""
+    circuit = llm.CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    circuit.record_failure()
+    circuit._opened_at -= 30
+    monkeypatch.setattr(llm, "_breakers", {guide.GEN_MODELS[0]: circuit})
+
+    return circuit
+
+
+def stream_chunks(monkeypatch, texts: list[str]) -> None:
+    class StreamingModels:
+        def generate_content_stream(self, **kwargs):
+            for text in texts:
+                yield SimpleNamespace(text=text, usage_metadata=None)
+
+    monkeypatch.setattr(
+        llm, "client", lambda: SimpleNamespace(models=StreamingModels())
+    )
+
+
+def test_stream_with_truncated_response(monkeypatch, probing_circuit):
+    # o array nunca fecha: o modelo parou no meio do guia
+    stream_chunks(monkeypatch, ["[" + json.dumps(study(1)) + ","])
+    attempts = []
+
+    with pytest.raises(ServiceError):
+        list(guide._stream_days("prompt", guide.GEN_MODELS[0], 2.0, [], attempts))
+
+    assert [attempt["status"] for attempt in attempts] == ["failed"]
+    assert attempts[0]["error_code"] == 503
+    assert probing_circuit.allow() is True
+
+
+def test_stream_with_client_disconnect(monkeypatch, probing_circuit):
+    stream_chunks(
+        monkeypatch,
+        ["[" + json.dumps(study(1)) + ",", json.dumps(study(2)) + "]"],
+    )
+    attempts = []
+
+    events = guide._stream_days("prompt", "", 2.0, [], attempts)
+    assert next(events)[0] == "day"
+
+    # o cliente fechou a conexão depois do primeiro dia
+    events.close()
+
+    assert attempts == []
+    assert probing_circuit.state == "half_open"
+    assert probing_circuit.allow() is True
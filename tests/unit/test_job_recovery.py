@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models import job
+
+
+@pytest.fixture
+def recoveries(monkeypatch):
+    calls = []
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(job, "_executor", executor)
+    monkeypatch.setattr(job, "recover", lambda: calls.append(True))
+    monkeypatch.setattr(job, "_recovered_pid", None)
+
+    yield calls
+
+    executor.shutdown(wait=True)
+
+
+def test_recover_once_per_process(recoveries, monkeypatch):
+    job._recover_once()
+    job._recover_once()
+    job._executor.shutdown(wait=True)
+
+    assert len(recoveries) == 1
+
+
+def test_recover_again_after_fork(recoveries, monkeypatch):
+    job._recover_once()
+
+    # um worker recém-criado pelo fork tem outro pid
+    monkeypatch.setattr(job.os, "getpid", lambda: -1)
+    job._recover_once()
+    job._executor.shutdown(wait=True)
+
+    assert len(recoveries) == 2
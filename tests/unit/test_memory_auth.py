@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+import pytest
+from firebase_admin import auth as firebase_auth
+
+from models import memory
+
+
+@pytest.fixture
+def memory_auth(monkeypatch):
+    monkeypatch.setattr(memory, "PRUNE_AT", 4)
+    memory_auth = memory.MemoryAuth()
+    memory_auth.create_user(
+        email="memory@example.com", password="validpassword", display_name="memory"
+    )
+
+    return memory_auth
+
+
+def login(memory_auth, expires_in: int = 3600) -> str:
+    id_token = memory_auth.sign_in_with_password("memory@example.com", "validpassword")[
+        "idToken"
+    ]
+
+    return memory_auth.create_session_cookie(id_token, expires_in)
+
+
+def test_id_token_is_dropped_after_exchange(memory_auth):
+    id_token = memory_auth.sign_in_with_password("memory@example.com", "validpassword")[
+        "idToken"
+    ]
+    memory_auth.create_session_cookie(id_token, 3600)
+
+    assert memory_auth._id_tokens == {}
+    with pytest.raises(firebase_auth.InvalidIdTokenError):
+        memory_auth.create_session_cookie(id_token, 3600)
+
+
+def test_expired_and_revoked_cookies_are_dropped(memory_auth, monkeypatch):
+    now = memory._now()
+    expired = [login(memory_auth, expires_in=60) for _ in range(2)]
+
+    monkeypatch.setattr(memory, "_now", lambda: now + timedelta(seconds=120))
+    revoked = login(memory_auth)
+    # a revogação vale para cookies emitidos antes dela, em segundos
+    monkeypatch.setattr(memory, "_now", lambda: now + timedelta(seconds=150))
+    memory_auth.revoke_refresh_tokens(memory_auth.verify_session_cookie(revoked)["uid"])
+
+    monkeypatch.setattr(memory, "_now", lambda: now + timedelta(seconds=180))
+    valid = [login(memory_auth) for _ in range(2)]
+
+    assert set(memory_auth._cookies) == set(valid)
+    assert not set(expired) & set(memory_auth._cookies)
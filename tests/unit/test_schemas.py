@@ -0,0 +1,34 @@
+from google.genai import types
+
+from schemas import DAILY_STUDIES, TOPIC_VERDICT
+
+
+def test_response_schema_of_list():
+    response_schema = DAILY_STUDIES.response_schema
+
+    assert isinstance(response_schema, types.Schema)
+    assert response_schema.type == types.Type.ARRAY
+
+    # o modelo de `$defs` é copiado para `items`, com a ordem dos campos
+    study = response_schema.items
+    assert study.type == types.Type.OBJECT
+    assert study.property_ordering == [
+        "day",
+        "title",
+        "Meta do Dia",
+        "O Quê Pesquisar (Teoria)",
+        "Mão na Massa (Prática)",
+        "Verificação de Aprendizado",
+        "completed",
+    ]
+    assert study.required == study.property_ordering[:-1]
+    assert study.properties["day"].type == types.Type.INTEGER
+    assert study.properties["O Quê Pesquisar (Teoria)"].items.type == types.Type.STRING
+
+
+def test_response_schema_of_model():
+    response_schema = TOPIC_VERDICT.response_schema
+
+    assert response_schema.type == types.Type.OBJECT
+    assert response_schema.property_ordering == ["is_valid", "motive"]
+    assert response_schema.properties["is_valid"].type == types.Type.BOOLEAN
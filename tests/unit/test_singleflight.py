@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic, sleep
+
+import pytest
+
+import metrics
+from singleflight import SingleFlight
+
+CALLERS = 5
+
+
+def wait_for_waiters(name: str, coalesced: int) -> None:
+    """Espera os CALLERS - 1 seguidores se juntarem à chamada em andamento."""
+    deadline = monotonic() + 5
+    while metrics.counter(f"{name}.coalesced") < coalesced + CALLERS - 1:
+        assert monotonic() < deadline, "as chamadas não foram agrupadas"
+        sleep(0.01)
+
+
+def test_singleflight_with_concurrent_calls():
+    flight = SingleFlight("test.singleflight.shared")
+    coalesced = metrics.counter("test.singleflight.shared.coalesced")
+    release = Event()
+    calls = []
+
+    def upstream(key):
+        calls.append(key)
+        release.wait(5)
+        return {"key": key}
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [
+            executor.submit(flight.do, "same-key", upstream, "same-key")
+            for _ in range(CALLERS)
+        ]
+        wait_for_waiters("test.singleflight.shared", coalesced)
+        release.set()
+
+        results = [future.result() for future in futures]
+
+    assert calls == ["same-key"]
+    assert results == [{"key": "same-key"}] * CALLERS
+    # todos recebem o mesmo objeto
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == 0
+
+
+def test_singleflight_with_failed_call():
+    flight = SingleFlight("test.singleflight.failed")
+    coalesced = metrics.counter("test.singleflight.failed.coalesced")
+    release = Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        raise TimeoutError("upstream")
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        futures = [
+            executor.submit(flight.do, "same-key", upstream) for _ in range(CALLERS)
+        ]
+        wait_for_waiters("test.singleflight.failed", coalesced)
+        release.set()
+
+        for future in futures:
+            with pytest.raises(TimeoutError, match="upstream"):
+                future.result()
+
+    assert calls == [1]
+    assert flight.in_flight() == 0
+
+    # a falha não fica guardada: a próxima chamada executa de novo
+    assert flight.do("same-key", lambda: "ok") == "ok"
+
+
+def test_singleflight_with_different_keys():
+    flight = SingleFlight("test.singleflight.keys")
+    calls = []
+
+    def upstream(key):
+        calls.append(key)
+        return key
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(
+            executor.map(lambda key: flight.do(key, upstream, key), ["a", "b"])
+        )
+
+    assert results == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
@@ -1,12 +1,14 @@
 # protected route example
 from functools import wraps
+import hashlib
 import os
+from pathlib import Path
 import firebase_admin
-from firebase_admin import firestore
-from flask import request, g
+import traceback
+from flask import make_response, request, g
 
 from errors import UnauthorizedError
-from models import session
+from models import backend, certificates, idempotency, session
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,6 +38,63 @@ def protected(f):
     return is_logged
 
 
+def idempotent(f):
+    """
+    Função decoradora para rotas que aceitam o header `Idempotency-Key`.
+
+    A primeira requisição com a chave é executada e, se der certo, a resposta
+    é guardada; as repetições recebem a mesma resposta (com o header
+    `Idempotent-Replayed: true`) sem executar a rota de novo. Enquanto a
+    primeira ainda executa, as repetições recebem 409. Deve vir depois de
+    `@protected`, pois as chaves são por usuário.
+    """
+
+    @wraps(f)
+    def with_idempotency_key(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+
+        if key is None:
+            return f(*args, **kwargs)
+
+        stored = idempotency.begin(g.username, key, request.get_json(silent=True))
+
+        if stored is not None:
+            response = make_response(stored["body"], stored["status_code"])
+            response.mimetype = "application/json"
+            response.headers["Idempotent-Replayed"] = "true"
+            if stored["location"]:
+                response.headers["Location"] = stored["location"]
+
+            return response
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency.release(g.username, key)
+            raise
+
+        if not 200 <= response.status_code < 300:
+            idempotency.release(g.username, key)
+            return response
+
+        try:
+            idempotency.complete(
+                g.username,
+                key,
+                response.status_code,
+                response.get_data(as_text=True),
+                response.headers.get("Location"),
+            )
+        except Exception:
+            # a resposta já foi produzida; a chave expira com o lease
+            traceback.print_exc()
+            print("🟡 Não foi possível guardar a resposta da Idempotency-Key.")
+
+        return response
+
+    return with_idempotency_key
+
+
 def _check(name: str, condition: bool, errors_list: list, error_message: str):
     """
     Função auxiliar para verificar uma condição e reportar o status.
@@ -113,9 +172,16 @@ def validate_config():
 
 
 def initialize_app():
+    if backend.IN_MEMORY:
+        backend.db().collection("_internal_status").document("health_check").set(
+            {"status": "online"}
+        )
+        print("🧪 Backend EM MEMÓRIA: Firestore e Firebase Auth não serão usados.")
+        return
+
     try:
         firebase_admin.initialize_app()
-        db = firestore.client()
+        db = backend.db()
 
         if not db.collection("_internal_status").get():
             db.collection("_internal_status").add({"status": "online"}, "health_check")
@@ -126,6 +192,8 @@ def initialize_app():
             )
 
         print("🔥 Firebase INICIALIZADO com sucesso!")
+
+        certificates.store.start()
     except Exception:
         raise Exception("❌ NÃO FOI POSSÍVEL inicializar o Firebase nesta aplicação!")
 
@@ -157,19 +225,76 @@ def format_date(date):
     return f"{date.day} de {month[date.month]} de {date.year}"
 
 
-def load_prompt(file_name: str) -> str:
-    """Carrega um arquivo de prompt da pasta /prompts."""
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+REQUIRED_PROMPTS = ("generate_guide.md", "generate_outline.md", "topic_validation.md")
 
-    current = os.getcwd()
-    prompt_path = os.path.join(current, "prompts", file_name)
 
-    try:
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        # Erro grave: o prompt não foi encontrado
-        raise RuntimeError(
-            f"Erro crítico: O arquivo de prompt '{file_name}' não foi encontrado."
-        )
-    except Exception as e:
-        raise RuntimeError(f"Erro ao ler o arquivo de prompt: {e}")
+class Prompt:
+    """Conteúdo de um arquivo de prompt e o hash (versão) desse conteúdo."""
+
+    def __init__(self, text: str, mtime: float):
+        self.text = text
+        self.mtime = mtime
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptRegistry:
+    """Carrega e valida todos os prompts uma única vez por worker.
+
+    Os caminhos são resolvidos a partir da pasta do projeto (e não do `cwd`).
+    Com `hot_reload`, um prompt é relido quando o arquivo é modificado.
+    """
+
+    def __init__(self, directory: Path, names: tuple[str, ...], hot_reload: bool):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._prompts = {name: self._read(name) for name in names}
+
+    def get(self, file_name: str) -> Prompt:
+        prompt = self._prompts.get(file_name)
+
+        if prompt is None or (
+            self.hot_reload and self._mtime(file_name) != prompt.mtime
+        ):
+            prompt = self._prompts[file_name] = self._read(file_name)
+
+        return prompt
+
+    def _mtime(self, file_name: str) -> float | None:
+        try:
+            return (self.directory / file_name).stat().st_mtime
+        except OSError:
+            return None
+
+    def _read(self, file_name: str) -> Prompt:
+        prompt_path = self.directory / file_name
+
+        try:
+            mtime = prompt_path.stat().st_mtime
+            text = prompt_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            # Erro grave: o prompt não foi encontrado
+            raise RuntimeError(
+                f"Erro crítico: O arquivo de prompt '{file_name}' não foi encontrado."
+            )
+        except Exception as e:
+            raise RuntimeError(f"Erro ao ler o arquivo de prompt: {e}")
+
+        if not text.strip():
+            raise RuntimeError(
+                f"Erro crítico: O arquivo de prompt '{file_name}' está vazio."
+            )
+
+        return Prompt(text, mtime)
+
+
+prompts = PromptRegistry(
+    PROMPTS_DIR,
+    REQUIRED_PROMPTS,
+    hot_reload=os.getenv("ENVIRONMENT", "development") == "development",
+)
+
+
+def load_prompt(file_name: str) -> str:
+    """Retorna o conteúdo de um arquivo de prompt da pasta /prompts."""
+    return prompts.get(file_name).text